@@ -0,0 +1,54 @@
+"""
+Micro-benchmark of local graph traversals, in microseconds per query, on a
+random graph of entities.
+
+    python benchmarks/bench_graph.py
+"""
+
+import random
+import time
+
+from nuclia.lib.graph import Edge, GraphIndex, Node
+
+NODES = 10_000
+EDGES = 50_000
+RESOURCES = 1_000
+QUERIES = 2_000
+LABELS = ["is friend of", "lives in", "works at", "eats", "knows"]
+
+
+def timed(name: str, func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed / len(queries) * 1_000_000:10.1f} us/query")
+
+
+def main():
+    rng = random.Random(0)
+    nodes = [Node(f"entity {index}", group="Group") for index in range(NODES)]
+    edges = [
+        Edge(rng.choice(nodes), rng.choice(LABELS), "ENTITY", rng.choice(nodes))
+        for _ in range(EDGES)
+    ]
+    index = GraphIndex()
+    start = time.perf_counter()
+    for resource in range(RESOURCES):
+        index.replace(f"rid{resource}", edges[resource::RESOURCES])
+    print(f"{EDGES} edges indexed in {time.perf_counter() - start:.2f}s")
+
+    values = [rng.choice(nodes).value for _ in range(QUERIES)]
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(QUERIES // 10)]
+    timed("neighbours, depth 1", index.neighbours, values)
+    timed("neighbours, depth 2", lambda value: index.neighbours(value, 2), values)
+    timed("shortest path", lambda pair: index.shortest_path(*pair), pairs)
+    timed(
+        "refresh of a resource",
+        lambda resource: index.replace(f"rid{resource}", edges[resource::RESOURCES]),
+        [rng.randrange(RESOURCES) for _ in range(QUERIES // 10)],
+    )
+
+
+if __name__ == "__main__":
+    main()
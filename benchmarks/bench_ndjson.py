@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of NDJSON stream decoding, in milliseconds per MB: model
+validation of every line, the shared NDJSONDecoder and raw decoding.
+
+    python benchmarks/bench_ndjson.py
+"""
+
+import json
+import time
+
+from nuclia_models.predict.generative_responses import GenerativeChunk
+from nucliadb_models import Notification
+from nucliadb_models.search import AskResponseItem
+
+from nuclia.lib.ndjson import NDJSONDecoder, decode_raw
+
+LINES = 100_000
+
+STREAMS = {
+    "ask": (
+        AskResponseItem,
+        json.dumps({"item": {"type": "answer", "text": "token "}}),
+    ),
+    "generate": (
+        GenerativeChunk,
+        json.dumps({"chunk": {"type": "text", "text": "token "}}),
+    ),
+    "notifications": (
+        Notification,
+        json.dumps(
+            {
+                "type": "resource_processed",
+                "data": {
+                    "resource_uuid": "a" * 32,
+                    "resource_title": "title",
+                    "seqid": 1,
+                    "ingestion_succeeded": True,
+                    "processing_errors": False,
+                },
+            }
+        ),
+    ),
+}
+
+
+def timed(name: str, lines, func):
+    size = sum(len(line) for line in lines) / (1024 * 1024)
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed / size * 1000:8.1f} ms/MB")
+
+
+def main():
+    for name, (model, line) in STREAMS.items():
+        lines = [line] * LINES
+        decoder = NDJSONDecoder(model)
+        print(f"{name}: {LINES} lines")
+        timed("  model_validate_json", lines, model.model_validate_json)
+        timed("  NDJSONDecoder", lines, decoder.decode)
+        timed("  decode_raw", lines, decode_raw)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of request building, in microseconds per request: building,
+validating and serializing the whole request on every call, as `find` and
+`ask` do, against binding a prepared template.
+
+    python benchmarks/bench_prepared.py
+"""
+
+import time
+
+from nucliadb_models.search import AskRequest, FindRequest
+
+from nuclia.lib.prepared import QueryTemplate
+from nuclia.sdk.resource import RagStrategiesParse
+
+CALLS = 20_000
+
+STATIC = {
+    "find": (
+        FindRequest,
+        {
+            "features": ["keyword", "semantic", "relations"],
+            "show": ["basic", "values", "origin"],
+            "extracted": ["text", "metadata"],
+            "min_score": {"bm25": 0.5, "semantic": 0.3},
+            "rank_fusion": "rrf",
+            "reranker": "predict",
+        },
+    ),
+    "ask": (
+        AskRequest,
+        {
+            "features": ["keyword", "semantic"],
+            "show": ["basic", "values"],
+            "citations": True,
+            "prefer_markdown": True,
+            "max_tokens": 2000,
+            "prompt": {"system": "You are a helpful assistant."},
+        },
+    ),
+}
+
+RAG_STRATEGIES = [
+    {"name": "hierarchy", "count": 2},
+    {"name": "neighbouring_paragraphs"},
+]
+
+
+def timed(name: str, func):
+    start = time.perf_counter()
+    for index in range(CALLS):
+        func(f"question {index}")
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed / CALLS * 1_000_000:8.1f} us/request")
+
+
+def main():
+    for kind, (model, static) in STATIC.items():
+        print(f"{kind}: {CALLS} requests")
+
+        def build(query: str):
+            request = model(query=query, filters=["/l/a/b"], top_k=20, **static)
+            if kind == "ask":
+                request.rag_strategies = RagStrategiesParse.model_validate(
+                    {"rag_strategies": RAG_STRATEGIES}
+                ).rag_strategies
+            request.model_dump_json(by_alias=True, exclude_unset=True)
+
+        params = dict(static)
+        if kind == "ask":
+            params["rag_strategies"] = RAG_STRATEGIES
+        template = QueryTemplate(model, params)
+
+        timed("  build and serialize", build)
+        timed(
+            "  QueryTemplate.bind",
+            lambda query: template.bind(query=query, filters=["/l/a/b"], top_k=20),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of the stream assemblers against the previous
+concatenation approach, over synthetic streams of 100k chunks.
+
+    python benchmarks/bench_stream_assembler.py
+"""
+
+import time
+
+from nuclia_models.predict.generative_responses import (
+    GenerativeChunk,
+    GenerativeFullResponse,
+    TextGenerativeResponse,
+)
+from nucliadb_models.search import AskResponseItem
+
+from nuclia.lib.stream import GenerativeAssembler
+from nuclia.sdk.search import AskAnswerAssembler
+
+CHUNKS = 100_000
+TOKEN = "token "
+
+
+def timed(name: str, func):
+    start = time.perf_counter()
+    func()
+    print(f"{name:<40} {time.perf_counter() - start:8.3f}s")
+
+
+def concat_generative(chunks):
+    result = GenerativeFullResponse(answer="")
+    for chunk in chunks:
+        if isinstance(chunk.chunk, TextGenerativeResponse):
+            result.answer += chunk.chunk.text
+    return result
+
+
+def concat_ask(items):
+    answer = b""
+    for item in items:
+        if item.type == "answer":
+            answer += item.text.encode()
+    return answer
+
+
+def main():
+    chunks = [
+        GenerativeChunk(chunk=TextGenerativeResponse(text=TOKEN)) for _ in range(CHUNKS)
+    ]
+    items = [
+        AskResponseItem.model_validate({"item": {"type": "answer", "text": TOKEN}}).item
+        for _ in range(CHUNKS)
+    ]
+    print(f"{CHUNKS} chunks")
+    timed("generate: concatenation", lambda: concat_generative(chunks))
+    timed(
+        "generate: GenerativeAssembler", lambda: GenerativeAssembler().consume(chunks)
+    )
+    timed("ask: bytes concatenation", lambda: concat_ask(items))
+    timed(
+        "ask: AskAnswerAssembler",
+        lambda: AskAnswerAssembler(learning_id="").consume(items),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import asyncio
 import inspect
+from contextlib import aclosing
 from functools import wraps
 
 import yaml
@@ -12,7 +13,12 @@ from nuclia.data import (
     get_auth,
     get_client,
 )
-from nuclia.exceptions import NeedUserToken, NotDefinedDefault, NucliaConnectionError
+from nuclia.exceptions import (
+    NeedUserToken,
+    NotDefinedDefault,
+    NucliaConnectionError,
+    NucliaTimeoutError,
+)
 from nuclia.lib.agent import AgentClient, AsyncAgentClient
 from nuclia.lib.kb import AsyncNucliaDBClient, Environment, NucliaDBClient
 from nuclia.lib.nua import AsyncNuaClient, NuaClient
@@ -123,8 +129,9 @@ def kb(func):
     @wraps(func)
     async def async_generative_wrapper_checkout(*args, **kwargs):
         if "ndb" in kwargs:
-            async for value in func(*args, **kwargs):
-                yield value
+            async with aclosing(func(*args, **kwargs)) as values:
+                async for value in values:
+                    yield value
         else:
             url = kwargs.get("url")
             api_key = kwargs.get("api_key")
@@ -152,8 +159,9 @@ def kb(func):
             else:
                 ndb = AsyncNucliaDBClient(environment=Environment.OSS, url=url)
             kwargs["ndb"] = ndb
-            async for value in func(*args, **kwargs):
-                yield value
+            async with aclosing(func(*args, **kwargs)) as values:
+                async for value in values:
+                    yield value
 
     if inspect.isasyncgenfunction(func):
         return async_generative_wrapper_checkout
@@ -163,6 +171,55 @@ def kb(func):
         return wrapper_checkout
 
 
+def deadline(func):
+    """
+    Give an async method a `deadline` parameter: the number of seconds the
+    whole call may take, including what the decorators below it do, such as
+    building the client. When it is exceeded, the call is cancelled and
+    `NucliaTimeoutError` is raised. Async generators get the deadline for the
+    whole iteration, and are closed when it is exceeded.
+    """
+
+    def timeout_error(seconds: float) -> NucliaTimeoutError:
+        return NucliaTimeoutError(f"{func.__name__} did not complete in {seconds}s")
+
+    @wraps(func)
+    async def async_wrapper_deadline(*args, **kwargs):
+        seconds = kwargs.pop("deadline", None)
+        if seconds is None:
+            return await func(*args, **kwargs)
+        try:
+            return await asyncio.wait_for(func(*args, **kwargs), seconds)
+        except asyncio.TimeoutError:
+            raise timeout_error(seconds) from None
+
+    @wraps(func)
+    async def async_generative_wrapper_deadline(*args, **kwargs):
+        seconds = kwargs.pop("deadline", None)
+        generator = func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        end = None if seconds is None else loop.time() + seconds
+        try:
+            while True:
+                step = generator.__anext__()
+                try:
+                    if end is None:
+                        value = await step
+                    else:
+                        value = await asyncio.wait_for(step, max(end - loop.time(), 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise timeout_error(seconds) from None
+                yield value
+        finally:
+            await generator.aclose()
+
+    if inspect.isasyncgenfunction(func):
+        return async_generative_wrapper_deadline
+    return async_wrapper_deadline
+
+
 def nucliadb(func):
     @wraps(func)
     def wrapper_checkout_nucliadb(*args, **kwargs):
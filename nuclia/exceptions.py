@@ -66,6 +66,14 @@ class NucliaConnectionError(Exception):
     pass
 
 
+class DownloadError(ValueError):
+    """A file could not be downloaded, or did not match its size or md5."""
+
+
+class NucliaTimeoutError(TimeoutError):
+    """A call did not complete before its deadline."""
+
+
 class KBNotAvailable(Exception):
     pass
 
@@ -0,0 +1,170 @@
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+DEFAULT_CONCURRENCY = 8
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchResult(Generic[T, R]):
+    """
+    Outcome of one item of a batch operation.
+
+    Errors are captured per item, so one failure does not abort the batch.
+    """
+
+    index: int
+    item: T
+    value: Optional[R] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_batch(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = True,
+) -> Iterator[BatchResult[T, R]]:
+    """
+    Run `func` over `items` in a thread pool, with at most `concurrency`
+    calls in flight. Items are consumed lazily.
+
+    :param ordered: yield results in input order. Otherwise they are yielded
+        as soon as they complete.
+    """
+    concurrency = max(1, concurrency)
+    source = enumerate(items)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    in_flight: Deque[Tuple[int, T, Future]] = deque()
+
+    def submit_next() -> bool:
+        try:
+            index, item = next(source)
+        except StopIteration:
+            return False
+        in_flight.append((index, item, executor.submit(func, item)))
+        return True
+
+    def to_result(index: int, item: T, future: Future) -> BatchResult[T, R]:
+        error = future.exception()
+        if error is not None:
+            return BatchResult(index=index, item=item, error=error)
+        return BatchResult(index=index, item=item, value=future.result())
+
+    try:
+        while len(in_flight) < concurrency and submit_next():
+            pass
+        while in_flight:
+            if ordered:
+                index, item, future = in_flight.popleft()
+                yield to_result(index, item, future)
+            else:
+                done, _ = wait(
+                    [f for _, _, f in in_flight], return_when=FIRST_COMPLETED
+                )
+                for entry in [e for e in in_flight if e[2] in done]:
+                    in_flight.remove(entry)
+                    yield to_result(*entry)
+            while len(in_flight) < concurrency and submit_next():
+                pass
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def async_run_batch(
+    func: Callable[[T], Awaitable[R]],
+    items: Union[Iterable[T], AsyncIterable[T]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = True,
+) -> AsyncIterator[BatchResult[T, R]]:
+    """
+    Async version of `run_batch`: run `func` over `items` as tasks, with at
+    most `concurrency` of them in flight. `items` can be an async iterable.
+    """
+    concurrency = max(1, concurrency)
+    source = _async_enumerate(items)
+    in_flight: Deque[asyncio.Task] = deque()
+    inputs: Dict[asyncio.Task, Tuple[int, T]] = {}
+
+    async def submit_next() -> bool:
+        try:
+            index, item = await source.__anext__()
+        except StopAsyncIteration:
+            return False
+        task = asyncio.ensure_future(func(item))
+        in_flight.append(task)
+        inputs[task] = (index, item)
+        return True
+
+    def to_result(task: asyncio.Task) -> BatchResult[T, R]:
+        index, item = inputs.pop(task)
+        if task.cancelled():
+            return BatchResult(index=index, item=item, error=asyncio.CancelledError())
+        error = task.exception()
+        if error is not None:
+            return BatchResult(index=index, item=item, error=error)
+        return BatchResult(index=index, item=item, value=task.result())
+
+    try:
+        while len(in_flight) < concurrency and await submit_next():
+            pass
+        while in_flight:
+            if ordered:
+                task = in_flight.popleft()
+                await asyncio.wait([task])
+                yield to_result(task)
+            else:
+                done: Set[asyncio.Task]
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in [t for t in in_flight if t in done]:
+                    in_flight.remove(task)
+                    yield to_result(task)
+            while len(in_flight) < concurrency and await submit_next():
+                pass
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await source.aclose()
+
+
+async def _async_enumerate(
+    items: Union[Iterable[T], AsyncIterable[T]],
+) -> AsyncGenerator[Tuple[int, T], None]:
+    index = 0
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield index, item
+            index += 1
+    else:
+        for item in items:
+            yield index, item
+            index += 1
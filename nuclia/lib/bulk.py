@@ -0,0 +1,242 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from nucliadb_models.search import CatalogRequest
+from tqdm import tqdm
+
+from nuclia.lib.batch import BatchResult
+from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.pagination import (
+    async_prefetch_pages,
+    next_catalog_page,
+    prefetch_pages,
+)
+
+BULK_PAGE_SIZE = 200
+# Catalog request parameters that do not restrict the resources it matches
+NOT_SELECTIVE = {"faceted", "sort", "page_number", "page_size", "show", "debug"}
+
+
+@dataclass
+class BulkResult:
+    # Resources matching the query
+    matched: int = 0
+    # Resources processed, including by previous runs of a checkpoint
+    done: int = 0
+    dry_run: bool = False
+    # Errors by resource id. These resources are retried when resuming.
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+
+def bulk_request(
+    query: Union[str, dict, CatalogRequest],
+    filters: Optional[List[Any]],
+    all: bool = False,
+) -> CatalogRequest:
+    """
+    Catalog request listing the resources a bulk operation applies to. A
+    request that matches the whole KB must be asked for with `all`.
+    """
+    if isinstance(query, CatalogRequest):
+        req = query.model_copy(deep=True)
+    elif isinstance(query, dict):
+        req = CatalogRequest.model_validate(query)
+    elif isinstance(query, str):
+        req = CatalogRequest(query=query, filters=filters or [])
+    else:
+        raise TypeError("query must be 'str', 'dict', or 'CatalogRequest'")
+    selection = req.model_dump(include=req.model_fields_set - NOT_SELECTIVE)
+    if not all and not any(value not in (None, "", []) for value in selection.values()):
+        raise ValueError(
+            "The query matches every resource of the KB: "
+            "pass all=True to apply the operation to all of them"
+        )
+    if "page_size" not in req.model_fields_set:
+        req.page_size = BULK_PAGE_SIZE
+    # Only the ids are needed
+    req.show = []
+    return req
+
+
+def iter_rids(ndb: NucliaDBClient, req: CatalogRequest) -> Iterator[str]:
+    def fetch(page_number: int):
+        return ndb.ndb.catalog(
+            req.model_copy(update={"page_number": page_number}), kbid=ndb.kbid
+        )
+
+    for page in prefetch_pages(fetch, req.page_number, next_catalog_page):
+        yield from page.resources
+
+
+async def async_iter_rids(
+    ndb: AsyncNucliaDBClient, req: CatalogRequest
+) -> AsyncIterator[str]:
+    def fetch(page_number: int):
+        return ndb.ndb.catalog(
+            req.model_copy(update={"page_number": page_number}), kbid=ndb.kbid
+        )
+
+    async for page in async_prefetch_pages(fetch, req.page_number, next_catalog_page):
+        for rid in page.resources:
+            yield rid
+
+
+class Checkpoint:
+    """
+    Progress of a bulk operation, in a JSON lines file: a header with the
+    operation and the number of matching resources, their ids, then the
+    ids done so far. Lines are appended as resources are processed, so the
+    operation can be resumed after an interruption.
+    """
+
+    def __init__(self, path: str, operation: str):
+        self.path = path
+        self.operation = operation
+        self._file: Optional[IO[str]] = None
+
+    def load(self) -> Optional[Tuple[int, List[str]]]:
+        """
+        Number of matching resources and ids of those not done yet, or None
+        if there is no complete checkpoint to resume.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as file:
+            lines = file.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+        if header["operation"] != self.operation:
+            raise ValueError(
+                f"Checkpoint {self.path} is for a {header['operation']} operation"
+            )
+        rids: List[str] = []
+        done: Set[str] = set()
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Line cut by an interruption
+                break
+            if "rid" in entry:
+                rids.append(entry["rid"])
+            else:
+                done.add(entry["done"])
+        if len(rids) != header["total"]:
+            # Interrupted while saving the resources
+            return None
+        return len(rids), [rid for rid in rids if rid not in done]
+
+    def start(self, rids: List[str]):
+        self.close()
+        self._file = open(self.path, "w")
+        self._write({"operation": self.operation, "total": len(rids)})
+        for rid in rids:
+            self._write({"rid": rid})
+
+    def done(self, rid: str):
+        self._write({"done": rid})
+
+    def close(self, remove: bool = False):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write(self, entry: Dict[str, Any]):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+
+class BulkRun:
+    """
+    Bookkeeping of a bulk operation: its checkpoint, progress bar and
+    result. The checkpoint is removed once every resource is done.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        checkpoint: Optional[str] = None,
+        progress: bool = True,
+        dry_run: bool = False,
+    ):
+        self.operation = operation
+        self.checkpoint = (
+            None if checkpoint is None else Checkpoint(checkpoint, operation)
+        )
+        self.progress = progress and not dry_run
+        self.result = BulkResult(dry_run=dry_run)
+        self._bar: Optional[tqdm] = None
+        self._completed = False
+
+    def resume(self) -> Optional[List[str]]:
+        """Resources left by an interrupted run, if there is a checkpoint"""
+        if self.checkpoint is None:
+            return None
+        loaded = self.checkpoint.load()
+        if loaded is None:
+            return None
+        total, pending = loaded
+        self._begin(total, pending)
+        return pending
+
+    def start(self, rids: List[str]) -> List[str]:
+        """Start processing all the resources matching the query"""
+        if self.checkpoint is not None and not self.result.dry_run:
+            self.checkpoint.start(rids)
+        self._begin(len(rids), rids)
+        return rids
+
+    def record(self, result: BatchResult[str, Any]):
+        if result.error is not None:
+            self.result.errors[result.item] = result.error
+        else:
+            self.result.done += 1
+            if self.checkpoint is not None:
+                self.checkpoint.done(result.item)
+        if self._bar is not None:
+            self._bar.update(1)
+
+    def complete(self) -> BulkResult:
+        self._completed = True
+        return self.result
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+        if self.checkpoint is not None:
+            # Kept after an interruption, or while some resources failed
+            self.checkpoint.close(
+                remove=self._completed
+                and not self.result.dry_run
+                and not self.result.errors
+            )
+
+    def _begin(self, total: int, pending: List[str]):
+        self.result.matched = total
+        self.result.done = total - len(pending)
+        if self.progress:
+            self._bar = tqdm(
+                desc=self.operation.capitalize(),
+                total=total,
+                initial=self.result.done,
+                unit="resource",
+            )
@@ -0,0 +1,336 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import backoff
+import httpx
+from nucliadb_models.notifications import NotificationType
+from pydantic import BaseModel
+
+from nuclia.lib.ndjson import decode_raw
+from nuclia.lib.notifications import (
+    RECONNECT_MAX_DELAY_S,
+    NotificationsService,
+    OverflowPolicy,
+)
+from nuclia.lib.slugs import SLUG_CACHE
+
+logger = logging.getLogger("nuclia-sdk")
+
+CACHE_MAX_ENTRIES = 1024
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_TTL_S = 60
+
+# Notifications after which cached results of the KB may be stale
+INVALIDATING_NOTIFICATIONS = (
+    NotificationType.RESOURCE_WRITTEN,
+    NotificationType.RESOURCE_INDEXED,
+)
+
+CacheKey = Tuple[str, str]
+
+
+@dataclass
+class QueryCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size: int = 0
+    # Time the cached queries took when they were sent to the server
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    latency: float
+
+
+def request_hash(kind: str, request: BaseModel) -> str:
+    """Hash of a validated request, independent of the order of its fields"""
+    canonical = json.dumps(
+        request.model_dump(mode="json"), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(f"{kind}:{canonical}".encode()).hexdigest()
+
+
+# Items of a collection measured to estimate its size
+SIZE_SAMPLE = 8
+
+
+def _size_of(value: Any) -> int:
+    """
+    Estimated size of a result, without serializing it: strings count for
+    their length, and the size of large collections is extrapolated from
+    their first items.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, BaseModel):
+        value = value.__dict__
+    if isinstance(value, dict):
+        items = list(islice(value.items(), SIZE_SAMPLE))
+        sample = sum(_size_of(k) + _size_of(v) for k, v in items)
+    elif isinstance(value, (list, tuple, set)):
+        items = list(islice(value, SIZE_SAMPLE))
+        sample = sum(_size_of(item) for item in items)
+    else:
+        return sys.getsizeof(value)
+    return sample * len(value) // len(items) if items else 0
+
+
+class QueryCache:
+    """
+    LRU cache of query results, bounded by number of entries and size in
+    bytes, whose entries expire after `ttl` seconds.
+
+    Cached results are shared between callers: do not modify them.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl: float = CACHE_TTL_S,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = QueryCacheMetrics()
+        # Bumped by invalidations, by KB and for all of them, so that
+        # results fetched before are not stored
+        self._generations: Dict[str, int] = {}
+        self._generation = 0
+
+    @property
+    def metrics(self) -> QueryCacheMetrics:
+        with self._lock:
+            self._metrics.entries = len(self._entries)
+            return QueryCacheMetrics(**self._metrics.__dict__)
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._metrics.expirations += 1
+                entry = None
+            if entry is None:
+                self._metrics.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._metrics.hits += 1
+            self._metrics.saved_seconds += entry.latency
+            return True, entry.value
+
+    def generation(self, kbid: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._generation, self._generations.get(kbid, 0)
+
+    def put(
+        self,
+        key: CacheKey,
+        value: Any,
+        latency: float = 0.0,
+        generation: Optional[Tuple[int, int]] = None,
+    ):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != (
+                self._generation,
+                self._generations.get(key[0], 0),
+            ):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(
+                value=value,
+                size=size,
+                expires_at=time.monotonic() + self.ttl,
+                latency=latency,
+            )
+            self._metrics.size += size
+            while (
+                len(self._entries) > self.max_entries
+                or self._metrics.size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._metrics.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key)
+        self._metrics.size -= entry.size
+
+    def invalidate(self, kbid: Optional[str] = None):
+        """Drop the cached results of `kbid`, or all of them"""
+        with self._lock:
+            if kbid is None:
+                self._generation += 1
+            else:
+                self._generations[kbid] = self._generations.get(kbid, 0) + 1
+            for key in [k for k in self._entries if kbid is None or k[0] == kbid]:
+                self._remove(key)
+            self._metrics.invalidations += 1
+
+    def on_notification(self, kbid: str, notification_type: Optional[str]):
+        if notification_type in INVALIDATING_NOTIFICATIONS:
+            self.invalidate(kbid)
+
+    def get_or_call(
+        self, kbid: str, kind: str, request: BaseModel, call: Callable[[], Any]
+    ) -> Any:
+        key = (kbid, request_hash(kind, request))
+        found, value = self.get(key)
+        if found:
+            return value
+        start, generation = time.monotonic(), self.generation(kbid)
+        value = call()
+        self.put(key, value, latency=time.monotonic() - start, generation=generation)
+        return value
+
+    async def aget_or_call(
+        self,
+        kbid: str,
+        kind: str,
+        request: BaseModel,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        key = (kbid, request_hash(kind, request))
+        found, value = self.get(key)
+        if found:
+            return value
+        start, generation = time.monotonic(), self.generation(kbid)
+        value = await call()
+        self.put(key, value, latency=time.monotonic() - start, generation=generation)
+        return value
+
+
+class CacheInvalidator:
+    """
+    Follows the notifications of a KB in a background thread, invalidating
+    its cached results whenever its resources change. The slugs of changed
+    resources are dropped from `SLUG_CACHE` too.
+
+    :param connect: function opening the notifications stream.
+    """
+
+    def __init__(self, cache: QueryCache, kbid: str, connect: Callable[[], Any]):
+        self.cache = cache
+        self.kbid = kbid
+        self._connect = connect
+        self._stopped = threading.Event()
+        self._response: Any = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._response is not None:
+            self._response.close()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        delays = backoff.expo(max_value=RECONNECT_MAX_DELAY_S)
+        next(delays)
+        while not self._stopped.is_set():
+            try:
+                self._response = self._connect()
+                # Changes may have been missed while disconnected
+                self.cache.invalidate(self.kbid)
+                SLUG_CACHE.invalidate(self.kbid)
+                for line in self._response.iter_lines():
+                    data = decode_raw(line)
+                    if isinstance(data, dict):
+                        self.cache.on_notification(self.kbid, data.get("type"))
+                        SLUG_CACHE.on_notification(
+                            self.kbid, data.get("type"), data.get("data")
+                        )
+                delays = backoff.expo(max_value=RECONNECT_MAX_DELAY_S)
+                next(delays)
+            except Exception as exc:
+                if self._stopped.is_set():
+                    return
+                delay = backoff.full_jitter(next(delays))
+                logger.warning(
+                    f"Cache invalidation stream failed ({exc}), "
+                    f"reconnecting in {delay:.1f}s"
+                )
+                self._stopped.wait(delay)
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+
+
+class AsyncCacheInvalidator:
+    """
+    Async version of `CacheInvalidator`, built on a `NotificationsService`.
+    """
+
+    def __init__(
+        self,
+        cache: QueryCache,
+        kbid: str,
+        connect: Callable[[], Awaitable[httpx.Response]],
+    ):
+        self.cache = cache
+        self.kbid = kbid
+        self.service = NotificationsService(connect, on_connect=self._on_connect)
+        # Any change invalidates the whole KB: there is no need to queue them
+        self._subscription = self.service.subscribe(
+            maxsize=1, types=INVALIDATING_NOTIFICATIONS
+        )
+        # Slugs are dropped by resource
+        self._slug_subscription = self.service.subscribe(
+            overflow=OverflowPolicy.COALESCE,
+            types=[NotificationType.RESOURCE_WRITTEN],
+        )
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self.service.start()
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._run_slugs()),
+        ]
+
+    async def stop(self):
+        await self.service.stop()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_connect(self):
+        self.cache.invalidate(self.kbid)
+        SLUG_CACHE.invalidate(self.kbid)
+
+    async def _run(self):
+        async for notification in self._subscription:
+            self.cache.on_notification(self.kbid, notification.type)
+
+    async def _run_slugs(self):
+        async for notification in self._slug_subscription:
+            data = notification.data if isinstance(notification.data, dict) else None
+            SLUG_CACHE.on_notification(self.kbid, notification.type, data)
@@ -0,0 +1,78 @@
+from typing import Any, Dict
+
+from nucliadb_models.resource import Resource
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+# Resource attributes holding fields, by field id
+FIELD_ATTRIBUTES = ("texts", "links", "files", "conversations")
+
+# Update parameters that are not part of the resource
+NOT_DIFFED = ("wait_for_commit",)
+
+# What has to be shown of a resource to diff it
+DIFF_SHOW = ["basic", "values", "origin", "extra", "security"]
+
+
+def _requested(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # Only what the caller did set: defaults are not requested changes
+        return value.model_dump(mode="json", exclude_unset=True)
+    return to_jsonable_python(value)
+
+
+def _current(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return to_jsonable_python(value)
+
+
+def differs(requested: Any, current: Any) -> bool:
+    """
+    Whether `requested` is not already part of `current`. Both are plain
+    JSON values, and keys of `current` that are not in `requested` are
+    ignored, as they are not changed by an update.
+    """
+    if isinstance(requested, dict):
+        if not isinstance(current, dict):
+            return True
+        return any(
+            key not in current or differs(value, current[key])
+            for key, value in requested.items()
+        )
+    if isinstance(requested, list):
+        if not isinstance(current, list) or len(requested) != len(current):
+            return True
+        return any(differs(r, c) for r, c in zip(requested, current))
+    return requested != current
+
+
+def resource_changes(resource: Resource, updates: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Part of the `updates` of `resource` that would change it: fields whose
+    value is not the current one and other attributes that differ.
+
+    Values that cannot be compared with what the resource exposes, like
+    the binary content of files or the messages of conversations, are
+    always considered changed.
+    """
+    changes: Dict[str, Any] = {}
+    for attribute, value in updates.items():
+        if attribute in NOT_DIFFED:
+            continue
+        if attribute in FIELD_ATTRIBUTES and value is not None:
+            current_fields = (
+                getattr(resource.data, attribute, None) if resource.data else None
+            ) or {}
+            changed = {}
+            for field_id, field in value.items():
+                current_field = current_fields.get(field_id)
+                if current_field is None or differs(
+                    _requested(field), _current(current_field.value)
+                ):
+                    changed[field_id] = field
+            if changed:
+                changes[attribute] = changed
+        elif differs(_requested(value), _current(getattr(resource, attribute, None))):
+            changes[attribute] = value
+    return changes
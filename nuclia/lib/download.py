@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import requests
+
+from nuclia.exceptions import DownloadError
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Files are only split in segments of at least this size
+MIN_SEGMENT_SIZE = 16 * 1024 * 1024
+MAX_SEGMENTS = 8
+PART_SUFFIX = ".part"
+
+
+class _RangesNotSupported(Exception):
+    pass
+
+
+def segment_ranges(size: int, segments: int) -> List[Tuple[int, int]]:
+    """Inclusive byte ranges splitting `size` bytes in up to `segments` parts"""
+    segments = max(1, min(segments, MAX_SEGMENTS, size // MIN_SEGMENT_SIZE))
+    step = -(-size // segments)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def download(
+    session: requests.Session,
+    url: str,
+    output: str,
+    headers: Optional[Dict[str, str]] = None,
+    size: Optional[int] = None,
+    md5: Optional[str] = None,
+    segments: int = 1,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+):
+    """
+    Download `url` to `output` through a `.part` file, resuming it if a
+    previous download was interrupted.
+
+    :param size: expected size. Required to split the download in segments.
+    :param md5: expected md5 hex digest.
+    :param segments: number of ranges downloaded concurrently, for files
+        large enough.
+    """
+    headers = headers or {}
+    part = output + PART_SUFFIX
+    digest = hashlib.md5() if md5 else None
+    ranges = segment_ranges(size, segments) if size else []
+    if len(ranges) > 1:
+        paths = _segment_paths(part, len(ranges))
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [
+                    executor.submit(
+                        _download_part,
+                        session,
+                        url,
+                        headers,
+                        path,
+                        first,
+                        last,
+                        chunk_size,
+                    )
+                    for path, (first, last) in zip(paths, ranges)
+                ]
+                for future in futures:
+                    future.result()
+        except _RangesNotSupported:
+            _remove(paths)
+            ranges = []
+        else:
+            _concat(paths, part, chunk_size, digest)
+    if len(ranges) <= 1:
+        _download_part(session, url, headers, part, 0, None, chunk_size, digest)
+    _verify(part, size, md5, digest)
+    os.replace(part, output)
+
+
+async def async_download(
+    client: httpx.AsyncClient,
+    url: str,
+    output: str,
+    headers: Optional[Dict[str, str]] = None,
+    size: Optional[int] = None,
+    md5: Optional[str] = None,
+    segments: int = 1,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+):
+    """Async version of `download`"""
+    headers = headers or {}
+    part = output + PART_SUFFIX
+    digest = hashlib.md5() if md5 else None
+    ranges = segment_ranges(size, segments) if size else []
+    if len(ranges) > 1:
+        paths = _segment_paths(part, len(ranges))
+        tasks = [
+            asyncio.ensure_future(
+                _async_download_part(
+                    client, url, headers, path, first, last, chunk_size
+                )
+            )
+            for path, (first, last) in zip(paths, ranges)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except _RangesNotSupported:
+            ranges = []
+        finally:
+            # Stop the other segments when one fails
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if ranges:
+            _concat(paths, part, chunk_size, digest)
+        else:
+            _remove(paths)
+    if len(ranges) <= 1:
+        await _async_download_part(
+            client, url, headers, part, 0, None, chunk_size, digest
+        )
+    _verify(part, size, md5, digest)
+    os.replace(part, output)
+
+
+def _download_part(
+    session: requests.Session,
+    url: str,
+    headers: Dict[str, str],
+    path: str,
+    first: int,
+    last: Optional[int],
+    chunk_size: int,
+    digest=None,
+):
+    """Download bytes `first` to `last` of `url` to `path`, resuming it"""
+    existing = _size(path)
+    if last is not None and first + existing > last:
+        _hash_file(path, digest, chunk_size)
+        return
+    with session.get(
+        url, headers=_range_headers(headers, first + existing, last), stream=True
+    ) as response:
+        if response.status_code == 416 and last is None and existing > 0:
+            # The part already holds the whole file
+            _hash_file(path, digest, chunk_size)
+            return
+        if response.status_code >= 400:
+            raise DownloadError(
+                f"Error downloading file: {response.status_code} {response.text}"
+            )
+        mode = _write_mode(response.status_code, last)
+        if mode == "ab":
+            _hash_file(path, digest, chunk_size)
+        with open(path, mode) as file:
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+
+
+async def _async_download_part(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    path: str,
+    first: int,
+    last: Optional[int],
+    chunk_size: int,
+    digest=None,
+):
+    existing = _size(path)
+    if last is not None and first + existing > last:
+        _hash_file(path, digest, chunk_size)
+        return
+    async with client.stream(
+        "GET", url, headers=_range_headers(headers, first + existing, last)
+    ) as response:
+        if response.status_code == 416 and last is None and existing > 0:
+            _hash_file(path, digest, chunk_size)
+            return
+        if response.status_code >= 400:
+            await response.aread()
+            raise DownloadError(
+                f"Error downloading file: {response.status_code} {response.text}"
+            )
+        mode = _write_mode(response.status_code, last)
+        if mode == "ab":
+            _hash_file(path, digest, chunk_size)
+        with open(path, mode) as file:
+            async for chunk in response.aiter_bytes(chunk_size):
+                file.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+
+
+def _range_headers(
+    headers: Dict[str, str], start: int, last: Optional[int]
+) -> Dict[str, str]:
+    if start == 0 and last is None:
+        return headers
+    end = "" if last is None else str(last)
+    return {**headers, "Range": f"bytes={start}-{end}"}
+
+
+def _write_mode(status_code: int, last: Optional[int]) -> str:
+    if status_code == 206:
+        return "ab"
+    if last is None:
+        # The server sent the whole file: start over
+        return "wb"
+    raise _RangesNotSupported()
+
+
+def _segment_paths(part: str, count: int) -> List[str]:
+    return [f"{part}{index}" for index in range(count)]
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _hash_file(path: str, digest, chunk_size: int):
+    """Feed the bytes already downloaded to `digest`"""
+    if digest is None or not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+
+
+def _concat(paths: List[str], part: str, chunk_size: int, digest):
+    with open(part, "wb") as output:
+        for path in paths:
+            with open(path, "rb") as segment:
+                while chunk := segment.read(chunk_size):
+                    output.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+    _remove(paths)
+
+
+def _remove(paths: List[str]):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _verify(part: str, size: Optional[int], md5: Optional[str], digest):
+    """Check the downloaded file, dropping it if it is corrupted"""
+    actual = _size(part)
+    if size is not None and actual != size:
+        os.remove(part)
+        raise DownloadError(f"Downloaded {actual} bytes, expected {size}")
+    if md5 and digest is not None and digest.hexdigest() != md5.lower():
+        os.remove(part)
+        raise DownloadError(
+            f"Downloaded file md5 is {digest.hexdigest()}, expected {md5}"
+        )
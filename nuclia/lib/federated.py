@@ -0,0 +1,125 @@
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from enum import Enum
+from operator import attrgetter
+from typing import Dict, Iterable, List
+
+from nucliadb_models.search import FindParagraph, KnowledgeboxFindResults
+
+FEDERATED_TIMEOUT_S = 10
+FEDERATED_MAX_CONCURRENCY = 32
+# Clients of the KBs last queried, kept to be reused by the next queries
+FEDERATED_MAX_CLIENTS = 64
+
+# Smoothing constant of reciprocal rank scores, as in reciprocal rank fusion
+RANK_CONSTANT = 60
+# Min-max score of the paragraphs of a KB whose scores are all equal: their
+# relevance is unknown, so they are ranked between the best and the worst
+# paragraphs of the other KBs
+MINMAX_NEUTRAL_SCORE = 0.5
+
+
+class ScoreNormalization(str, Enum):
+    """
+    How the scores of each KB are made comparable before merging them.
+
+    - `minmax`: scale the scores of each KB to [0, 1]. Paragraphs of a KB
+        whose scores are all equal, like a KB with a single result, get
+        `MINMAX_NEUTRAL_SCORE`.
+    - `rank`: score paragraphs by their rank in their KB, `1 / (60 + rank)`.
+    - `none`: keep the scores as they are.
+    """
+
+    MINMAX = "minmax"
+    RANK = "rank"
+    NONE = "none"
+
+
+@dataclass
+class FederatedParagraph:
+    kbid: str
+    rid: str
+    field: str
+    # Normalized score, used to merge the paragraphs of all the KBs
+    score: float
+    paragraph: FindParagraph
+
+
+@dataclass
+class FederatedFindResults:
+    """
+    Merged results of a find query over many KBs.
+
+    KBs that failed or did not answer in time are in `errors`, and are left
+    out of the results.
+    """
+
+    paragraphs: List[FederatedParagraph] = field(default_factory=list)
+    results: Dict[str, KnowledgeboxFindResults] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+
+def kb_paragraphs(
+    kbid: str,
+    results: KnowledgeboxFindResults,
+    normalization: ScoreNormalization = ScoreNormalization.MINMAX,
+) -> List[FederatedParagraph]:
+    """Paragraphs of the results of one KB, with normalized scores"""
+    paragraphs = [
+        FederatedParagraph(
+            kbid=kbid,
+            rid=rid,
+            field=field_id,
+            score=paragraph.score,
+            paragraph=paragraph,
+        )
+        for rid, resource in results.resources.items()
+        for field_id, find_field in resource.fields.items()
+        for paragraph in find_field.paragraphs.values()
+    ]
+    if not paragraphs or normalization == ScoreNormalization.NONE:
+        return paragraphs
+    if normalization == ScoreNormalization.RANK:
+        paragraphs.sort(key=lambda item: item.paragraph.order)
+        for rank, item in enumerate(paragraphs, start=1):
+            item.score = 1 / (RANK_CONSTANT + rank)
+        return paragraphs
+    low = min(item.score for item in paragraphs)
+    high = max(item.score for item in paragraphs)
+    for item in paragraphs:
+        item.score = (
+            (item.score - low) / (high - low) if high > low else MINMAX_NEUTRAL_SCORE
+        )
+    return paragraphs
+
+
+def merge_top_k(
+    paragraphs: Iterable[List[FederatedParagraph]], top_k: int
+) -> List[FederatedParagraph]:
+    """
+    Best `top_k` paragraphs out of those of every KB, selected with a heap of
+    `top_k` items instead of sorting all of them.
+    """
+    return heapq.nlargest(
+        top_k, itertools.chain.from_iterable(paragraphs), key=attrgetter("score")
+    )
+
+
+def merge_results(
+    results: Dict[str, KnowledgeboxFindResults],
+    errors: Dict[str, BaseException],
+    top_k: int,
+    normalization: ScoreNormalization,
+) -> FederatedFindResults:
+    return FederatedFindResults(
+        paragraphs=merge_top_k(
+            (
+                kb_paragraphs(kbid, kb_results, normalization)
+                for kbid, kb_results in results.items()
+            ),
+            top_k,
+        ),
+        results=results,
+        errors=errors,
+    )
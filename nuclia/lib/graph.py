@@ -0,0 +1,390 @@
+import threading
+from array import array
+from collections import deque
+from enum import Enum
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from nucliadb_models.graph.responses import GraphPath
+from nucliadb_models.metadata import Relation, RelationNodeType
+
+# (source, relation, destination) ids of an edge
+EdgeIds = Tuple[int, int, int]
+
+
+class Node(NamedTuple):
+    value: str
+    type: str = RelationNodeType.ENTITY.value
+    group: str = ""
+
+
+class Edge(NamedTuple):
+    source: Node
+    label: str
+    relation: str
+    destination: Node
+
+
+class Direction(str, Enum):
+    OUT = "out"
+    IN = "in"
+    ANY = "any"
+
+
+def relation_edges(
+    relations: Iterable[Relation], rid: Optional[str] = None
+) -> Iterator[Edge]:
+    """
+    Edges of the relations of a resource, as returned by `get_graph`.
+    Relations without a source start from the resource `rid`.
+    """
+    for relation in relations:
+        if relation.from_ is not None:
+            source = Node(
+                relation.from_.value,
+                relation.from_.type.value,
+                relation.from_.group or "",
+            )
+        elif rid is not None:
+            source = Node(rid, RelationNodeType.RESOURCE.value)
+        else:
+            continue
+        yield Edge(
+            source,
+            relation.label or "",
+            relation.relation.value,
+            Node(relation.to.value, relation.to.type.value, relation.to.group or ""),
+        )
+
+
+def path_edges(paths: Iterable[GraphPath]) -> Iterator[Edge]:
+    """Edges of the paths of a graph search"""
+    for path in paths:
+        yield Edge(
+            Node(path.source.value, path.source.type.value, path.source.group),
+            path.relation.label,
+            path.relation.type.value,
+            Node(
+                path.destination.value,
+                path.destination.type.value,
+                path.destination.group,
+            ),
+        )
+
+
+class GraphIndex:
+    """
+    In-memory index of a knowledge graph, to traverse it without querying the
+    server.
+
+    Nodes and relations are interned to integer ids, and the edges of each
+    node are kept in compact arrays of ids. Edges are added under a `source`,
+    usually the id of the resource they come from, so the edges of a source
+    can be refreshed without rebuilding the index.
+
+    Queries take a `Node`, or a value matching the nodes of any type and group.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: List[Node] = []
+        self._node_ids: Dict[Node, int] = {}
+        self._by_value: Dict[str, List[int]] = {}
+        self._relations: List[Tuple[str, str]] = []
+        self._relation_ids: Dict[Tuple[str, str], int] = {}
+        self._out_nodes: List[array] = []
+        self._out_relations: List[array] = []
+        self._in_nodes: List[array] = []
+        self._in_relations: List[array] = []
+        # Number of sources of each edge
+        self._edges: Dict[EdgeIds, int] = {}
+        self._sources: Dict[str, Set[EdgeIds]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    def add(self, edges: Iterable[Edge], source: str = ""):
+        """Add edges to those of `source`"""
+        with self._lock:
+            owned = self._sources.setdefault(source, set())
+            for edge in edges:
+                ids = self._intern(edge)
+                if ids not in owned:
+                    owned.add(ids)
+                    self._acquire(ids)
+
+    def replace(self, source: str, edges: Iterable[Edge]):
+        """
+        Replace the edges of `source`. Only the edges that changed are
+        linked or unlinked.
+        """
+        with self._lock:
+            new = {self._intern(edge) for edge in edges}
+            old = self._sources.pop(source, set())
+            for ids in old - new:
+                self._release(ids)
+            for ids in new - old:
+                self._acquire(ids)
+            if new:
+                self._sources[source] = new
+
+    def remove(self, source: str):
+        """Remove the edges of `source`, unless other sources have them"""
+        self.replace(source, ())
+
+    def nodes(self, value: str) -> List[Node]:
+        """Nodes with this value"""
+        with self._lock:
+            return [self._nodes[node] for node in self._by_value.get(value, ())]
+
+    def edges(
+        self, node: Union[str, Node], direction: Direction = Direction.OUT
+    ) -> List[Edge]:
+        """Edges of a node"""
+        with self._lock:
+            edges = []
+            for start in self._resolve(node):
+                for other, relation, forward in self._adjacent(start, direction):
+                    if forward:
+                        edges.append(self._edge(start, relation, other))
+                    else:
+                        edges.append(self._edge(other, relation, start))
+            return edges
+
+    def neighbours(
+        self,
+        node: Union[str, Node],
+        depth: int = 1,
+        direction: Direction = Direction.ANY,
+        labels: Optional[Iterable[str]] = None,
+    ) -> Dict[Node, int]:
+        """
+        Nodes reachable from `node` in at most `depth` hops, with their
+        distance, in breadth-first order.
+
+        :param labels: only follow relations with these labels.
+        """
+        with self._lock:
+            allowed = self._allowed_relations(labels)
+            distances = {start: 0 for start in self._resolve(node)}
+            frontier: Deque[int] = deque(distances)
+            while frontier:
+                current = frontier.popleft()
+                distance = distances[current]
+                if distance >= depth:
+                    continue
+                for other, relation, _ in self._adjacent(current, direction):
+                    if other in distances:
+                        continue
+                    if allowed is not None and relation not in allowed:
+                        continue
+                    distances[other] = distance + 1
+                    frontier.append(other)
+            return {
+                self._nodes[other]: distance
+                for other, distance in distances.items()
+                if distance > 0
+            }
+
+    def shortest_path(
+        self,
+        source: Union[str, Node],
+        destination: Union[str, Node],
+        direction: Direction = Direction.ANY,
+        max_depth: Optional[int] = None,
+        labels: Optional[Iterable[str]] = None,
+    ) -> Optional[List[Edge]]:
+        """
+        Edges of a shortest path from `source` to `destination`, or None if
+        they are not connected. Edges keep their own direction, even when
+        followed backwards.
+
+        The search runs from both ends at once, expanding the smaller
+        frontier first.
+        """
+        with self._lock:
+            allowed = self._allowed_relations(labels)
+            forward = _Search(self._resolve(source), direction)
+            backward = _Search(self._resolve(destination), _REVERSE[direction])
+            meeting = forward.parents.keys() & backward.parents.keys()
+            while not meeting and forward.frontier and backward.frontier:
+                if (
+                    max_depth is not None
+                    and forward.depth + backward.depth >= max_depth
+                ):
+                    return None
+                if len(forward.frontier) <= len(backward.frontier):
+                    meeting = self._expand(forward, backward, allowed)
+                else:
+                    meeting = self._expand(backward, forward, allowed)
+            if not meeting:
+                return None
+            middle = min(
+                meeting,
+                key=lambda node: forward.depths[node] + backward.depths[node],
+            )
+            path = self._steps(forward.parents, middle)
+            path.reverse()
+            path.extend(self._steps(backward.parents, middle))
+            return path
+
+    def _expand(
+        self, search: "_Search", other: "_Search", allowed: Optional[Set[int]]
+    ) -> Set[int]:
+        """Expand a level of `search`, returning the nodes reached by `other`"""
+        search.depth += 1
+        frontier = []
+        meeting = set()
+        for current in search.frontier:
+            for node, relation, forward in self._adjacent(current, search.direction):
+                if node in search.parents:
+                    continue
+                if allowed is not None and relation not in allowed:
+                    continue
+                search.parents[node] = (current, relation, forward)
+                search.depths[node] = search.depth
+                frontier.append(node)
+                if node in other.parents:
+                    meeting.add(node)
+        search.frontier = frontier
+        return meeting
+
+    def _steps(
+        self, parents: Dict[int, Optional[Tuple[int, int, bool]]], node: int
+    ) -> List[Edge]:
+        """Edges from `node` back to the start of a search"""
+        edges = []
+        step = parents[node]
+        while step is not None:
+            previous, relation, forward = step
+            if forward:
+                edges.append(self._edge(previous, relation, node))
+            else:
+                edges.append(self._edge(node, relation, previous))
+            node = previous
+            step = parents[node]
+        return edges
+
+    def _node_id(self, node: Node) -> int:
+        node_id = self._node_ids.get(node)
+        if node_id is None:
+            node_id = self._node_ids[node] = len(self._nodes)
+            self._nodes.append(node)
+            self._by_value.setdefault(node.value, []).append(node_id)
+            for adjacency in (
+                self._out_nodes,
+                self._out_relations,
+                self._in_nodes,
+                self._in_relations,
+            ):
+                adjacency.append(array("I"))
+        return node_id
+
+    def _intern(self, edge: Edge) -> EdgeIds:
+        key = (edge.label, edge.relation)
+        relation = self._relation_ids.get(key)
+        if relation is None:
+            relation = self._relation_ids[key] = len(self._relations)
+            self._relations.append(key)
+        return (self._node_id(edge.source), relation, self._node_id(edge.destination))
+
+    def _acquire(self, ids: EdgeIds):
+        count = self._edges.get(ids, 0)
+        self._edges[ids] = count + 1
+        if count == 0:
+            source, relation, destination = ids
+            self._out_nodes[source].append(destination)
+            self._out_relations[source].append(relation)
+            self._in_nodes[destination].append(source)
+            self._in_relations[destination].append(relation)
+
+    def _release(self, ids: EdgeIds):
+        count = self._edges.pop(ids) - 1
+        if count > 0:
+            self._edges[ids] = count
+            return
+        source, relation, destination = ids
+        _unlink(
+            self._out_nodes[source], self._out_relations[source], destination, relation
+        )
+        _unlink(
+            self._in_nodes[destination],
+            self._in_relations[destination],
+            source,
+            relation,
+        )
+
+    def _resolve(self, node: Union[str, Node]) -> List[int]:
+        if isinstance(node, Node):
+            node_id = self._node_ids.get(node)
+            return [] if node_id is None else [node_id]
+        return list(self._by_value.get(node, ()))
+
+    def _allowed_relations(self, labels: Optional[Iterable[str]]) -> Optional[Set[int]]:
+        if labels is None:
+            return None
+        labels = set(labels)
+        return {
+            relation
+            for relation, (label, _) in enumerate(self._relations)
+            if label in labels
+        }
+
+    def _adjacent(
+        self, node: int, direction: Direction
+    ) -> Iterator[Tuple[int, int, bool]]:
+        """(node, relation, followed forward) of the edges of a node"""
+        if direction != Direction.IN:
+            for other, relation in zip(
+                self._out_nodes[node], self._out_relations[node]
+            ):
+                yield other, relation, True
+        if direction != Direction.OUT:
+            for other, relation in zip(self._in_nodes[node], self._in_relations[node]):
+                yield other, relation, False
+
+    def _edge(self, source: int, relation: int, destination: int) -> Edge:
+        label, relation_type = self._relations[relation]
+        return Edge(self._nodes[source], label, relation_type, self._nodes[destination])
+
+
+_REVERSE = {
+    Direction.OUT: Direction.IN,
+    Direction.IN: Direction.OUT,
+    Direction.ANY: Direction.ANY,
+}
+
+
+class _Search:
+    """State of one side of a bidirectional breadth-first search"""
+
+    def __init__(self, starts: List[int], direction: Direction):
+        self.direction = direction
+        self.depth = 0
+        self.frontier = starts
+        # Node -> (previous node, relation, edge followed forward)
+        self.parents: Dict[int, Optional[Tuple[int, int, bool]]] = dict.fromkeys(starts)
+        self.depths: Dict[int, int] = dict.fromkeys(starts, 0)
+
+
+def _unlink(nodes: array, relations: array, node: int, relation: int):
+    for index in range(len(nodes)):
+        if nodes[index] == node and relations[index] == relation:
+            del nodes[index]
+            del relations[index]
+            return
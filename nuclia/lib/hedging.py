@@ -0,0 +1,270 @@
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, List, Optional, TypeVar
+
+R = TypeVar("R")
+
+HEDGE_PERCENTILE = 95
+HEDGE_BUDGET = 0.1
+HEDGE_INITIAL_DELAY_S = 1.0
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 1000
+HEDGE_MAX_WORKERS = 32
+# Hedges that can be sent in a row after a run of fast requests
+HEDGE_MAX_BURST = 2
+
+# The hedge delay is recomputed after this many new latency samples
+DELAY_REFRESH_SAMPLES = 16
+
+
+@dataclass
+class HedgingMetrics:
+    requests: int = 0
+    hedged: int = 0
+    # Hedges that answered before the original request
+    hedge_wins: int = 0
+    # Hedges not sent because the budget was exhausted
+    budget_exhausted: int = 0
+    # Requests of the sync client run without hedging because all the
+    # workers were busy
+    workers_exhausted: int = 0
+    # Estimated time saved by winning hedges, out of the observed latencies
+    latency_gain: float = 0.0
+    # Current delay before sending a hedge
+    delay: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class HedgingPolicy:
+    """
+    Sends a duplicate of a read request that has not answered within the
+    `percentile` of the observed latencies. The first response wins, and the
+    other request is cancelled or its response discarded.
+
+    :param percentile: percentile of the observed latencies after which a
+        request is hedged.
+    :param budget: maximum ratio of hedged requests, so hedging increases the
+        load by at most this ratio. Must be in (0, 1].
+    :param initial_delay: delay before hedging while there are less than
+        `min_samples` observed latencies.
+    :param window: number of latencies kept to compute the percentile.
+    :param max_workers: threads running the requests of the sync client.
+        When all of them are busy, requests run in the calling thread and
+        are not hedged: size it from the number of concurrent callers.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        budget: float = HEDGE_BUDGET,
+        initial_delay: float = HEDGE_INITIAL_DELAY_S,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        window: int = HEDGE_WINDOW,
+        max_workers: int = HEDGE_MAX_WORKERS,
+    ):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not 0 < budget <= 1:
+            raise ValueError("budget must be between 0 and 1")
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._sorted: List[float] = []
+        self._new_samples = 0
+        self._delay = initial_delay
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._busy_workers = 0
+        self._metrics = HedgingMetrics(delay=initial_delay)
+
+    @property
+    def metrics(self) -> HedgingMetrics:
+        with self._lock:
+            self._metrics.delay = self._delay
+            return HedgingMetrics(**self._metrics.__dict__)
+
+    def _start(self) -> float:
+        """Count a new request, and return the delay before hedging it"""
+        with self._lock:
+            self._metrics.requests += 1
+            # Every request earns a fraction of a hedge, up to a small burst
+            self._tokens = min(
+                self._tokens + self.budget,
+                min(max(1.0, self.budget * 10), HEDGE_MAX_BURST),
+            )
+            return self._delay
+
+    def _return_token(self):
+        with self._lock:
+            self._tokens += 1
+            self._metrics.hedged -= 1
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self._metrics.budget_exhausted += 1
+                return False
+            self._tokens -= 1
+            self._metrics.hedged += 1
+            return True
+
+    def _submit(self, func: Callable[[], R]) -> Optional["Future[R]"]:
+        """Run `func` in a worker, or return None if all of them are busy"""
+        with self._lock:
+            if self._busy_workers >= self.max_workers:
+                self._metrics.workers_exhausted += 1
+                return None
+            self._busy_workers += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="nuclia-hedging",
+                )
+            future = self._executor.submit(func)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _release_worker(self, future: Future):
+        with self._lock:
+            self._busy_workers -= 1
+
+    def _record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self._new_samples += 1
+            if (
+                len(self._latencies) >= self.min_samples
+                and self._new_samples >= DELAY_REFRESH_SAMPLES
+            ):
+                self._new_samples = 0
+                self._sorted = sorted(self._latencies)
+                index = int(len(self._sorted) * self.percentile / 100)
+                self._delay = self._sorted[min(index, len(self._sorted) - 1)]
+
+    def _hedge_won(self, elapsed: float):
+        """
+        Estimate the latency the original request would have had as the mean
+        of the observed latencies above `elapsed`.
+        """
+        with self._lock:
+            self._metrics.hedge_wins += 1
+            slower = self._sorted[bisect.bisect_right(self._sorted, elapsed) :]
+            if slower:
+                self._metrics.latency_gain += sum(slower) / len(slower) - elapsed
+
+    def _finish(self, hedged: bool, start: float, hedge_start: float):
+        now = time.monotonic()
+        if hedged:
+            self._record(now - hedge_start)
+            self._hedge_won(now - start)
+        else:
+            self._record(now - start)
+
+    def call(
+        self,
+        func: Callable[[], R],
+        discard: Optional[Callable[[R], Any]] = None,
+    ) -> R:
+        """
+        Call `func`, hedging it if it is slow. The losing request keeps
+        running in its thread, and its result is discarded.
+
+        :param discard: called with the result of the losing request, if it
+            completes, to release it.
+        """
+        delay = self._start()
+        start = hedge_start = time.monotonic()
+        primary = self._submit(func)
+        if primary is None:
+            result = func()
+            self._finish(False, start, hedge_start)
+            return result
+        futures = [primary]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._take_token():
+            hedge_start = time.monotonic()
+            hedge = self._submit(func)
+            if hedge is None:
+                self._return_token()
+            else:
+                futures.append(hedge)
+        winner = _first_success(futures)
+        for loser in futures:
+            if loser is not winner:
+                loser.cancel()
+                if discard is not None:
+                    loser.add_done_callback(_discard_result(discard))
+        if winner is None:
+            # All failed: raise the error of the original request
+            return primary.result()
+        self._finish(winner is not primary, start, hedge_start)
+        return winner.result()
+
+    async def acall(
+        self,
+        func: Callable[[], Awaitable[R]],
+        discard: Optional[Callable[[R], Awaitable[Any]]] = None,
+    ) -> R:
+        """
+        Async version of `call`: the losing request is cancelled.
+        """
+        delay = self._start()
+        start = hedge_start = time.monotonic()
+        primary = asyncio.ensure_future(func())
+        tasks = [primary]
+        winner: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._take_token():
+                hedge_start = time.monotonic()
+                tasks.append(asyncio.ensure_future(func()))
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = next((t for t in done if t.exception() is None), None)
+        finally:
+            losers = [task for task in tasks if task is not winner]
+            for loser in losers:
+                loser.cancel()
+            results = await asyncio.gather(*losers, return_exceptions=True)
+            if discard is not None:
+                # Losers that completed before being cancelled
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+        if winner is None:
+            return primary.result()
+        self._finish(winner is not primary, start, hedge_start)
+        return winner.result()
+
+
+def _first_success(futures: List[Future]) -> Optional[Future]:
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future
+    return None
+
+
+def _discard_result(discard: Callable[[Any], Any]) -> Callable[[Future], None]:
+    def callback(future: Future):
+        if not future.cancelled() and future.exception() is None:
+            discard(future.result())
+
+    return callback
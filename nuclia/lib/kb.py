@@ -215,19 +215,44 @@ class NucliaDBClient(BaseNucliaDBClient):
         handle_http_sync_errors(response)
         return response
 
-    def ask(self, request: AskRequest, timeout: int = 1000):
+    def ask(
+        self,
+        request: AskRequest,
+        extra_headers: Optional[dict[str, str]] = None,
+        timeout: int = 1000,
+    ):
         if self.url is None or self.stream_session is None:
             raise Exception("KB not configured")
         url = f"{self.url}{ASK_URL}"
         response: requests.Response = self.stream_session.post(
             url,
             data=request.model_dump_json(),
+            headers=extra_headers,
             stream=True,
             timeout=timeout,
         )
         handle_http_sync_errors(response)
         return response
 
+    def query(
+        self,
+        path: str,
+        body: bytes,
+        extra_headers: Optional[dict[str, str]] = None,
+        timeout: int = 1000,
+    ) -> httpx.Response:
+        """Send a query whose JSON body is already serialized"""
+        if self.url is None or self.reader_session is None:
+            raise Exception("KB not configured")
+        response: httpx.Response = self.reader_session.post(
+            f"{self.url}{path}",
+            content=body,
+            headers={"content-type": "application/json", **(extra_headers or {})},
+            timeout=timeout,
+        )
+        handle_http_sync_errors(response)
+        return response
+
     def download_export(self, export_id: str, path: str, chunk_size: int):
         if self.reader_session is None:
             raise Exception("KB not configured")
@@ -653,6 +678,25 @@ class AsyncNucliaDBClient(BaseNucliaDBClient):
         await handle_http_async_errors(response)
         return response
 
+    async def query(
+        self,
+        path: str,
+        body: bytes,
+        extra_headers: Optional[dict[str, str]] = None,
+        timeout: int = 1000,
+    ) -> httpx.Response:
+        """Send a query whose JSON body is already serialized"""
+        if self.url is None or self.reader_session is None:
+            raise Exception("KB not configured")
+        response: httpx.Response = await self.reader_session.post(
+            f"{self.url}{path}",
+            content=body,
+            headers={"content-type": "application/json", **(extra_headers or {})},
+            timeout=timeout,
+        )
+        await handle_http_async_errors(response)
+        return response
+
     async def download_export(self, export_id: str, path: str, chunk_size: int):
         if self.reader_session is None:
             raise Exception("KB not configured")
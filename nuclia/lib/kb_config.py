@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from nucliadb_models.kv_schemas import KBKVSchemas
+from nucliadb_models.labels import KnowledgeBoxLabels
+
+from nuclia.lib.batch import run_batch
+from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.labels import LABELSETS
+
+# Configuration changed by other processes is loaded again after this
+KB_CONFIG_TTL_S = 300
+
+
+@dataclass
+class KBConfig:
+    """Snapshot of the configuration of a KB"""
+
+    kbid: str
+    labelsets: KnowledgeBoxLabels
+    # Strategy configurations, by id
+    extract_strategies: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    split_strategies: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    kv_schemas: KBKVSchemas = field(default_factory=KBKVSchemas)
+    # Learning configuration, as returned by `get_configuration`
+    configuration: Any = None
+
+    def extract_strategy_id(self, name_or_id: str) -> Optional[str]:
+        """Id of the extract strategy with this id or name"""
+        return _strategy_id(self.extract_strategies, name_or_id)
+
+    def split_strategy_id(self, name_or_id: str) -> Optional[str]:
+        """Id of the split strategy with this id or name"""
+        return _strategy_id(self.split_strategies, name_or_id)
+
+
+def _strategy_id(
+    strategies: Dict[str, Dict[str, Any]], name_or_id: str
+) -> Optional[str]:
+    if name_or_id in strategies:
+        return name_or_id
+    for strategy_id, config in strategies.items():
+        if config.get("name") == name_or_id:
+            return strategy_id
+    return None
+
+
+def _snapshot(kbid: str, values: List[Any]) -> KBConfig:
+    labelsets, extract_strategies, split_strategies, kv_schemas, configuration = values
+    # Labelsets read as part of the snapshot are not fetched again by
+    # `add_labels`
+    LABELSETS.put_all(kbid, labelsets)
+    return KBConfig(
+        kbid=kbid,
+        labelsets=labelsets,
+        extract_strategies=extract_strategies,
+        split_strategies=split_strategies,
+        kv_schemas=kv_schemas,
+        configuration=configuration,
+    )
+
+
+def load_kb_config(ndb: NucliaDBClient) -> KBConfig:
+    """Fetch every part of the configuration of the KB concurrently"""
+    fetches: List[Callable[[], Any]] = [
+        lambda: ndb.ndb.get_labelsets(kbid=ndb.kbid),
+        lambda: ndb.list_extract_strategies().json(),
+        lambda: ndb.list_split_strategies().json(),
+        lambda: ndb.ndb.list_kv_schemas(kbid=ndb.kbid),
+        lambda: ndb.ndb.get_configuration(kbid=ndb.kbid),
+    ]
+    values = []
+    for result in run_batch(lambda fetch: fetch(), fetches, len(fetches)):
+        if result.error is not None:
+            raise result.error
+        values.append(result.value)
+    return _snapshot(ndb.kbid, values)
+
+
+async def async_load_kb_config(ndb: AsyncNucliaDBClient) -> KBConfig:
+    async def json(response: Awaitable[Any]) -> Any:
+        return (await response).json()
+
+    values = await asyncio.gather(
+        ndb.ndb.get_labelsets(kbid=ndb.kbid),
+        json(ndb.list_extract_strategies()),
+        json(ndb.list_split_strategies()),
+        ndb.ndb.list_kv_schemas(kbid=ndb.kbid),
+        ndb.ndb.get_configuration(kbid=ndb.kbid),
+    )
+    return _snapshot(ndb.kbid, list(values))
+
+
+class KBConfigCache:
+    """
+    Configuration snapshots by KB, loaded on first use and again after
+    `ttl` seconds, or after the configuration is changed through the SDK.
+    """
+
+    def __init__(self, ttl: float = KB_CONFIG_TTL_S):
+        self.ttl = ttl
+        self._snapshots: Dict[str, Tuple[KBConfig, float]] = {}
+        # Bumped by invalidations, so that snapshots loaded before are
+        # not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, kbid: str) -> Optional[KBConfig]:
+        with self._lock:
+            cached = self._snapshots.get(kbid)
+            if cached is None:
+                return None
+            snapshot, expires_at = cached
+            if expires_at <= time.monotonic():
+                del self._snapshots[kbid]
+                return None
+            return snapshot
+
+    def put(
+        self, snapshot: KBConfig, loaded_at: float, generation: Optional[int] = None
+    ):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._snapshots[snapshot.kbid] = (snapshot, loaded_at + self.ttl)
+
+    def invalidate(self, kbid: Optional[str] = None):
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._snapshots if kbid is None or k == kbid]:
+                del self._snapshots[key]
+
+    def get_or_load(self, ndb: NucliaDBClient) -> KBConfig:
+        snapshot = self.get(ndb.kbid)
+        if snapshot is None:
+            loaded_at, generation = time.monotonic(), self._generation
+            snapshot = load_kb_config(ndb)
+            self.put(snapshot, loaded_at, generation)
+        return snapshot
+
+    async def aget_or_load(self, ndb: AsyncNucliaDBClient) -> KBConfig:
+        snapshot = self.get(ndb.kbid)
+        if snapshot is None:
+            loaded_at, generation = time.monotonic(), self._generation
+            snapshot = await async_load_kb_config(ndb)
+            self.put(snapshot, loaded_at, generation)
+        return snapshot
+
+
+# Shared by all the clients of the process
+KB_CONFIGS = KBConfigCache()
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from nucliadb_models.labels import KnowledgeBoxLabels, LabelSet
+from nucliadb_models.metadata import UserClassification, UserMetadata
+
+# Labelsets changed by other processes are fetched again after this
+LABELSET_CACHE_TTL_S = 300
+
+# (resource id or slug, labelset, label)
+LabelAssignment = Tuple[str, str, str]
+
+
+@dataclass
+class LabelResult:
+    # Resources with assignments
+    resources: int = 0
+    # Resources written, as some of their labels were missing
+    labelled: int = 0
+    # Resources that already had all their labels
+    unchanged: int = 0
+    # Errors by resource id or slug
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+
+class LabelSetCache:
+    """
+    Labelset definitions by KB, so that adding labels that are already
+    defined does not fetch the labelset again.
+
+    Entries are replaced when labelsets are written through the SDK, and
+    dropped when they are deleted or after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = LABELSET_CACHE_TTL_S):
+        self.ttl = ttl
+        self._labelsets: Dict[Tuple[str, str], Tuple[LabelSet, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kbid: str, labelset: str) -> Optional[LabelSet]:
+        with self._lock:
+            cached = self._labelsets.get((kbid, labelset))
+            if cached is None:
+                return None
+            value, expires_at = cached
+            if expires_at <= time.monotonic():
+                del self._labelsets[(kbid, labelset)]
+                return None
+            # Callers may modify it
+            return value.model_copy(deep=True)
+
+    def put(self, kbid: str, labelset: str, value: LabelSet):
+        with self._lock:
+            self._labelsets[(kbid, labelset)] = (
+                value.model_copy(deep=True),
+                time.monotonic() + self.ttl,
+            )
+
+    def put_all(self, kbid: str, labels: KnowledgeBoxLabels):
+        for labelset, value in labels.labelsets.items():
+            self.put(kbid, labelset, value)
+
+    def forget(self, kbid: str, labelset: str):
+        with self._lock:
+            self._labelsets.pop((kbid, labelset), None)
+
+    def invalidate(self, kbid: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._labelsets if kbid is None or k[0] == kbid]:
+                del self._labelsets[key]
+
+
+def has_labels(labelset: LabelSet, labels: Iterable[str]) -> bool:
+    existing = {label.title for label in labelset.labels}
+    return all(label in existing for label in labels)
+
+
+def group_assignments(
+    assignments: Iterable[LabelAssignment],
+) -> Dict[str, List[Tuple[str, str]]]:
+    """Labels of each resource, without duplicates, in order of assignment"""
+    grouped: Dict[str, Dict[Tuple[str, str], None]] = defaultdict(dict)
+    for id_or_slug, labelset, label in assignments:
+        grouped[id_or_slug][(labelset, label)] = None
+    return {key: list(labels) for key, labels in grouped.items()}
+
+
+def labels_by_labelset(
+    assignments: Dict[str, List[Tuple[str, str]]],
+) -> Dict[str, List[str]]:
+    labelsets: Dict[str, Dict[str, None]] = defaultdict(dict)
+    for labels in assignments.values():
+        for labelset, label in labels:
+            labelsets[labelset][label] = None
+    return {labelset: list(labels) for labelset, labels in labelsets.items()}
+
+
+def merge_classifications(
+    usermetadata: Optional[UserMetadata], labels: List[Tuple[str, str]]
+) -> Optional[UserMetadata]:
+    """
+    `usermetadata` with `labels` added to its classifications, or None if
+    it already has all of them. Labels cancelled by a user are not added
+    back, and relations are kept, as an update replaces the whole user
+    metadata.
+    """
+    current = usermetadata or UserMetadata()
+    classifications = list(current.classifications or [])
+    existing = {(c.labelset, c.label) for c in classifications}
+    missing = [
+        UserClassification(labelset=labelset, label=label)
+        for labelset, label in labels
+        if (labelset, label) not in existing
+    ]
+    if not missing:
+        return None
+    return UserMetadata(
+        classifications=classifications + missing, relations=current.relations
+    )
+
+
+# Shared by all the clients of the process
+LABELSETS = LabelSetCache()
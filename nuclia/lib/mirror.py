@@ -0,0 +1,272 @@
+import hashlib
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from nucliadb_models.resource import Resource
+from nucliadb_sdk import exceptions
+
+from nuclia.lib.batch import BatchResult
+
+MIRROR_DB = "mirror.db"
+OBJECTS_DIR = "objects"
+CATALOG_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    rid TEXT PRIMARY KEY,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    rid TEXT NOT NULL,
+    field_id TEXT NOT NULL,
+    md5 TEXT NOT NULL,
+    size INTEGER,
+    filename TEXT,
+    content_type TEXT,
+    PRIMARY KEY (rid, field_id)
+);
+"""
+
+
+@dataclass
+class MirrorFile:
+    rid: str
+    field_id: str
+    md5: Optional[str]
+    size: Optional[int]
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+@dataclass
+class MirrorResult:
+    # Resources in the KB
+    resources: int = 0
+    # Resources not fetched, as they did not change since the last mirror
+    unchanged: int = 0
+    downloaded: int = 0
+    downloaded_bytes: int = 0
+    # Files already in the mirror
+    skipped: int = 0
+    # Resources no longer in the KB, dropped from the state database
+    removed: int = 0
+    # Errors by resource id, or by `rid/field_id` for files
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+
+class MirrorState:
+    """
+    State database of a mirror, in `mirror.db` at its root. It keeps the
+    version of every mirrored resource, and the md5 of each of its files,
+    whose content is in `objects/<md5[:2]>/<md5>`.
+    """
+
+    def __init__(self, root: str):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self._db = sqlite3.connect(os.path.join(root, MIRROR_DB))
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def object_path(self, md5: str) -> str:
+        return os.path.join(self.root, OBJECTS_DIR, md5[:2], md5)
+
+    def version(self, rid: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT version FROM resources WHERE rid = ?", (rid,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def save(self, rid: str, version: Optional[str], files: List[MirrorFile]):
+        """Record a resource whose files are all in the mirror"""
+        with self._db:
+            self._db.execute("DELETE FROM files WHERE rid = ?", (rid,))
+            self._db.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        file.rid,
+                        file.field_id,
+                        file.md5,
+                        file.size,
+                        file.filename,
+                        file.content_type,
+                    )
+                    for file in files
+                ],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?)", (rid, version)
+            )
+
+    def remove_missing(self, rids: Set[str]) -> int:
+        """Forget the resources not in `rids`. Their files are kept."""
+        missing = [
+            (rid,)
+            for (rid,) in self._db.execute("SELECT rid FROM resources")
+            if rid not in rids
+        ]
+        with self._db:
+            self._db.executemany("DELETE FROM files WHERE rid = ?", missing)
+            self._db.executemany("DELETE FROM resources WHERE rid = ?", missing)
+        return len(missing)
+
+    def files(self) -> Iterator[MirrorFile]:
+        """Mirrored files, whose content is at `object_path(file.md5)`"""
+        for row in self._db.execute(
+            "SELECT rid, field_id, md5, size, filename, content_type FROM files"
+        ):
+            yield MirrorFile(*row)
+
+
+def resource_version(resource: Resource) -> Optional[str]:
+    """Marker of the last change of a resource, as listed by the catalog"""
+    parts = []
+    if resource.modified is not None:
+        parts.append(resource.modified.isoformat())
+    if resource.last_seqid is not None:
+        parts.append(str(resource.last_seqid))
+    return "/".join(parts) or None
+
+
+def file_fields(resource: Resource) -> List[MirrorFile]:
+    """Downloadable files of a resource fetched with its values"""
+    if resource.data is None or not resource.data.files:
+        return []
+    files = []
+    for field_id, file_field in resource.data.files.items():
+        if file_field.value is None or file_field.value.file is None:
+            continue
+        link = file_field.value.file
+        if link.uri is None:
+            continue
+        files.append(
+            MirrorFile(
+                rid=resource.id,
+                field_id=field_id,
+                md5=link.md5,
+                size=link.size,
+                filename=link.filename,
+                content_type=link.content_type,
+            )
+        )
+    return files
+
+
+def md5_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Mirror:
+    """
+    Bookkeeping of a `kb.mirror` run: which resources changed since the
+    last run, which of their files are already stored, and when a resource
+    is complete. The state database is only used from the thread that
+    created it; `is_mirrored`, `incoming_path` and `store` are safe to call
+    from download workers.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.state = MirrorState(root)
+        self.result = MirrorResult()
+        self._seen: Set[str] = set()
+        self._versions: Dict[str, Optional[str]] = {}
+        # Files of each fetched resource, and how many are not done yet
+        self._files: Dict[str, List[MirrorFile]] = {}
+        self._remaining: Dict[str, int] = {}
+
+    def close(self):
+        self.state.close()
+
+    def changed(self, resource: Resource) -> bool:
+        """Whether a resource listed by the catalog needs to be fetched"""
+        self.result.resources += 1
+        self._seen.add(resource.id)
+        version = resource_version(resource)
+        if version is not None and self.state.version(resource.id) == version:
+            self.result.unchanged += 1
+            return False
+        self._versions[resource.id] = version
+        return True
+
+    def fetched(self, result: BatchResult[str, Resource]) -> List[MirrorFile]:
+        """Files to download for a fetched resource"""
+        if result.value is None:
+            self.result.errors[result.item] = result.error or exceptions.NotFoundError(
+                f"Resource {result.item} not found"
+            )
+            return []
+        rid = result.value.id
+        files = file_fields(result.value)
+        if not files:
+            self.state.save(rid, self._versions.pop(rid, None), [])
+            return []
+        self._files[rid] = files
+        self._remaining[rid] = len(files)
+        return files
+
+    def is_mirrored(self, file: MirrorFile) -> bool:
+        if file.md5 is None:
+            return False
+        try:
+            size = os.path.getsize(self.object_path(file.md5))
+        except FileNotFoundError:
+            return False
+        return file.size is None or size == file.size
+
+    def object_path(self, md5: str) -> str:
+        return self.state.object_path(md5)
+
+    def incoming_path(self, file: MirrorFile) -> str:
+        """
+        Where a file is downloaded before being stored. Each field has its
+        own, so concurrent downloads of identical files do not clash, and an
+        interrupted download is resumed on the next run.
+        """
+        incoming = os.path.join(self.root, OBJECTS_DIR, "incoming")
+        os.makedirs(incoming, exist_ok=True)
+        return os.path.join(incoming, f"{file.rid}-{file.field_id}")
+
+    def store(self, incoming: str, file: MirrorFile) -> int:
+        """Move a downloaded file to its place in the mirror"""
+        if file.md5 is None:
+            file.md5 = md5_file(incoming)
+        size = os.path.getsize(incoming)
+        path = self.object_path(file.md5)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(incoming, path)
+        return size
+
+    def downloaded(
+        self, result: BatchResult[Tuple[Resource, MirrorFile], Optional[int]]
+    ):
+        """Record the outcome of a file download: `store` result, or None if skipped"""
+        _, file = result.item
+        if result.error is not None:
+            self.result.errors[f"{file.rid}/{file.field_id}"] = result.error
+        elif result.value is None:
+            self.result.skipped += 1
+        else:
+            self.result.downloaded += 1
+            self.result.downloaded_bytes += result.value
+        self._remaining[file.rid] -= 1
+        if self._remaining[file.rid] > 0:
+            return
+        del self._remaining[file.rid]
+        files = self._files.pop(file.rid)
+        version = self._versions.pop(file.rid, None)
+        if all(f"{file.rid}/{f.field_id}" not in self.result.errors for f in files):
+            self.state.save(file.rid, version, files)
+
+    def finish(self) -> MirrorResult:
+        self.result.removed = self.state.remove_missing(self._seen)
+        return self.result
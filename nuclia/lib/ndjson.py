@@ -0,0 +1,77 @@
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+)
+
+import pydantic_core
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+Line = Union[str, bytes]
+
+_type_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """Type adapters are expensive to build: build them once per type"""
+    adapter = _type_adapters.get(tp)
+    if adapter is None:
+        adapter = _type_adapters[tp] = TypeAdapter(tp)
+    return adapter
+
+
+def decode_raw(line: Line) -> Optional[Any]:
+    """
+    Parse one line without validating it nor building models, for consumers
+    that only need a few keys. Blank lines return None.
+    """
+    if not line or line.isspace():
+        return None
+    return pydantic_core.from_json(line)
+
+
+class NDJSONDecoder(Generic[T]):
+    """
+    Decodes the lines of a newline delimited JSON stream into `model`.
+
+    Discriminated unions (like the items of `AskResponseItem` or
+    `GenerativeChunk`) are resolved by pydantic-core while parsing, which is
+    faster than picking the union member beforehand in Python.
+    """
+
+    def __init__(self, model: Type[T]):
+        self.model = model
+        self._adapter = get_type_adapter(model)
+
+    def decode(self, line: Line) -> Optional[T]:
+        """
+        Decode one line. Blank lines return None. Invalid lines raise
+        `pydantic.ValidationError`.
+        """
+        if not line or line.isspace():
+            return None
+        return self._adapter.validate_json(line)
+
+    def iter(self, lines: Iterable[Line]) -> Iterator[T]:
+        decode = self.decode
+        for line in lines:
+            item = decode(line)
+            if item is not None:
+                yield item
+
+    async def aiter(self, lines: AsyncIterable[Line]) -> AsyncIterator[T]:
+        decode = self.decode
+        async for line in lines:
+            item = decode(line)
+            if item is not None:
+                yield item
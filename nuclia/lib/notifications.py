@@ -0,0 +1,502 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import backoff
+import httpx
+from nucliadb_models import Notification
+from nucliadb_models.filters import (
+    And,
+    CatalogFilterExpression,
+    Or,
+    Resource,
+    Status,
+)
+from nucliadb_models.metadata import ResourceProcessingStatus
+from nucliadb_models.notifications import NotificationType
+from nucliadb_models.search import (
+    CatalogRequest,
+    CatalogResponse,
+    ResourceProperties,
+)
+
+from nuclia.exceptions import RateLimitError
+from nuclia.lib.ndjson import NDJSONDecoder, decode_raw
+
+logger = logging.getLogger("nuclia-sdk")
+
+NOTIFICATION_DECODER = NDJSONDecoder(Notification)
+
+# Maximum page size of the catalog endpoint
+STATUS_CHECK_BATCH_SIZE = 200
+STATUS_CHECK_INTERVAL_S = 5
+
+
+class WaitCondition(str, Enum):
+    # Processing results are stored
+    PROCESSED = "processed"
+    # Processing results are stored and searchable
+    INDEXED = "indexed"
+
+
+class ProcessingWaiters:
+    """
+    Tracks the processing status of a set of resources, resolving them as
+    notifications or status checks arrive.
+
+    With `WaitCondition.INDEXED`, a processed resource is only resolved
+    once a `resource_indexed` notification at least as recent as its
+    `resource_processed` one arrives, and status checks only count the
+    resources the catalog finds by their processing status. Resources that
+    failed are resolved as soon as they are processed.
+    """
+
+    def __init__(
+        self, rids: Iterable[str], until: WaitCondition = WaitCondition.INDEXED
+    ):
+        self.until = WaitCondition(until)
+        self.statuses: Dict[str, ResourceProcessingStatus] = {
+            rid: ResourceProcessingStatus.PENDING for rid in rids
+        }
+        self.pending = set(self.statuses)
+        # Sequence ids of the last processed and indexed notifications
+        self._processed: Dict[str, int] = {}
+        self._indexed: Dict[str, int] = {}
+
+    @property
+    def done(self) -> bool:
+        return len(self.pending) == 0
+
+    def resolve(self, rid: str, status: ResourceProcessingStatus):
+        if rid not in self.pending or status == ResourceProcessingStatus.PENDING:
+            return
+        self.statuses[rid] = status
+        self.pending.discard(rid)
+
+    def on_notification(self, notification: Notification):
+        if notification.type in WAITED_NOTIFICATIONS:
+            self.on_event(notification.type, notification.data or {})
+
+    def on_event(self, notification_type: str, data: Dict[str, Any]):
+        rid = data.get("resource_uuid")
+        if rid is None or rid not in self.pending:
+            return
+        seqid = data.get("seqid", 0)
+        if notification_type == NotificationType.RESOURCE_INDEXED:
+            self._indexed[rid] = max(seqid, self._indexed.get(rid, seqid))
+            if self._processed.get(rid, seqid + 1) <= seqid:
+                self.resolve(rid, ResourceProcessingStatus.PROCESSED)
+            return
+        failed = data.get("processing_errors", False) or not data.get(
+            "ingestion_succeeded", True
+        )
+        if failed:
+            self.resolve(rid, ResourceProcessingStatus.ERROR)
+        elif (
+            self.until == WaitCondition.PROCESSED
+            or self._indexed.get(rid, seqid - 1) >= seqid
+        ):
+            self.resolve(rid, ResourceProcessingStatus.PROCESSED)
+        else:
+            self._processed[rid] = seqid
+
+    def on_line(self, line: Union[str, bytes]):
+        # Only the type and the data are needed: skip building the model
+        data = decode_raw(line)
+        if isinstance(data, dict) and data.get("type") in WAITED_NOTIFICATIONS:
+            self.on_event(data["type"], data.get("data") or {})
+
+    def status_requests(self) -> List[CatalogRequest]:
+        """Catalog requests to check the status of all pending resources"""
+        pending = sorted(self.pending)
+        return [
+            status_request(pending[i : i + STATUS_CHECK_BATCH_SIZE], self.until)
+            for i in range(0, len(pending), STATUS_CHECK_BATCH_SIZE)
+        ]
+
+    def on_status_response(self, response: CatalogResponse):
+        for rid, resource in response.resources.items():
+            if resource.metadata is not None:
+                self.resolve(rid, resource.metadata.status)
+
+
+WAITED_NOTIFICATIONS = (
+    NotificationType.RESOURCE_PROCESSED,
+    NotificationType.RESOURCE_INDEXED,
+)
+
+
+def status_request(
+    rids: List[str], until: WaitCondition = WaitCondition.PROCESSED
+) -> CatalogRequest:
+    expression: Any
+    if len(rids) == 1:
+        expression = Resource(id=rids[0])
+    else:
+        expression = Or(operands=[Resource(id=rid) for rid in rids])
+    if until == WaitCondition.INDEXED:
+        # Filtering by status matches the status the resources are indexed
+        # with, not the one stored with them
+        expression = And(
+            operands=[
+                expression,
+                Or(
+                    operands=[
+                        Status(status=ResourceProcessingStatus.PROCESSED),
+                        Status(status=ResourceProcessingStatus.ERROR),
+                    ]
+                ),
+            ]
+        )
+    return CatalogRequest(
+        filter_expression=CatalogFilterExpression(resource=expression),
+        page_size=STATUS_CHECK_BATCH_SIZE,
+        show=[ResourceProperties.BASIC],
+    )
+
+
+RECONNECT_MAX_DELAY_S = 60
+DEDUPE_WINDOW = 10_000
+SUBSCRIPTION_MAXSIZE = 1_000
+
+
+class OverflowPolicy(str, Enum):
+    """What a subscription does with a new event when its queue is full"""
+
+    # Drop the oldest queued event
+    DROP = "drop"
+    # Wait until the subscriber makes room. Slows down all the subscribers.
+    BLOCK = "block"
+    # Replace the queued event of the same resource and type, if any.
+    # Otherwise, drop the oldest one.
+    COALESCE = "coalesce"
+
+
+@dataclass
+class SubscriptionMetrics:
+    delivered: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    queued: int = 0
+    # Seconds the oldest queued event has been waiting
+    lag: float = 0.0
+
+
+@dataclass
+class NotificationsServiceMetrics:
+    connections: int = 0
+    reconnects: int = 0
+    received: int = 0
+    duplicates: int = 0
+    connected: bool = False
+    last_event_at: Optional[float] = None
+    # Seconds the oldest event queued in any subscription has been waiting
+    lag: float = 0.0
+
+
+def _event_data(notification: Notification) -> Dict[str, Any]:
+    return notification.data if isinstance(notification.data, dict) else {}
+
+
+def _dedupe_key(notification: Notification) -> Optional[Hashable]:
+    data = _event_data(notification)
+    if data.get("seqid") is None:
+        return None
+    return (notification.type, data.get("resource_uuid"), data["seqid"])
+
+
+def _coalesce_key(notification: Notification) -> Hashable:
+    return (notification.type, _event_data(notification).get("resource_uuid"))
+
+
+def _is_retriable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, RateLimitError))
+
+
+class NotificationSubscription:
+    """
+    Bounded queue of notifications for one subscriber of a
+    `NotificationsService`. Iterate it with `async for`.
+    """
+
+    def __init__(
+        self,
+        service: "NotificationsService",
+        maxsize: int,
+        overflow: OverflowPolicy,
+        types: Optional[Set[NotificationType]],
+    ):
+        self._service = service
+        self.maxsize = max(1, maxsize)
+        self.overflow = OverflowPolicy(overflow)
+        self.types = types
+        self._queue: Deque[Tuple[float, Notification]] = deque()
+        self._condition = asyncio.Condition()
+        self._closed = False
+        self._metrics = SubscriptionMetrics()
+
+    @property
+    def metrics(self) -> SubscriptionMetrics:
+        self._metrics.queued = len(self._queue)
+        self._metrics.lag = time.monotonic() - self._queue[0][0] if self._queue else 0.0
+        return self._metrics
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def put(self, notification: Notification, received_at: float):
+        if self._closed or (
+            self.types is not None and notification.type not in self.types
+        ):
+            return
+        async with self._condition:
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == OverflowPolicy.BLOCK:
+                    await self._condition.wait_for(
+                        lambda: self._closed or len(self._queue) < self.maxsize
+                    )
+                    if self._closed:
+                        return
+                elif self.overflow == OverflowPolicy.COALESCE and self._coalesce(
+                    notification
+                ):
+                    return
+                else:
+                    self._queue.popleft()
+                    self._metrics.dropped += 1
+            self._queue.append((received_at, notification))
+            self._condition.notify_all()
+
+    def _coalesce(self, notification: Notification) -> bool:
+        key = _coalesce_key(notification)
+        for index, (received_at, queued) in enumerate(self._queue):
+            if _coalesce_key(queued) == key:
+                # Keep the original arrival time, so lag is not hidden
+                self._queue[index] = (received_at, notification)
+                self._metrics.coalesced += 1
+                return True
+        return False
+
+    async def get(self) -> Notification:
+        """
+        Next notification. Raises `StopAsyncIteration` once the subscription
+        is closed and drained, or the error that stopped the service.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._closed or self._queue)
+            if not self._queue:
+                if self._service.error is not None:
+                    raise self._service.error
+                raise StopAsyncIteration()
+            _, notification = self._queue.popleft()
+            self._metrics.delivered += 1
+            self._condition.notify_all()
+            return notification
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Notification:
+        return await self.get()
+
+    async def close(self):
+        """Stop receiving notifications. Queued ones can still be read."""
+        self._service._unsubscribe(self)
+        async with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class NotificationsService:
+    """
+    Long running consumer of the KB notifications stream.
+
+    The stream is reopened with exponential backoff when it ends or fails,
+    notifications repeated across reconnections are dropped, and every
+    notification is fanned out to all the subscriptions.
+
+    :param connect: coroutine function opening the notifications stream.
+    :param max_tries: maximum consecutive failed connections before giving
+        up. `None` retries forever.
+    :param dedupe_window: number of recent notifications remembered to
+        detect duplicates.
+    :param on_connect: called every time the stream is (re)opened.
+        Notifications sent while disconnected are lost.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[httpx.Response]],
+        *,
+        max_tries: Optional[int] = None,
+        max_delay: float = RECONNECT_MAX_DELAY_S,
+        dedupe_window: int = DEDUPE_WINDOW,
+        on_connect: Optional[Callable[[], None]] = None,
+    ):
+        self._connect = connect
+        self._on_connect = on_connect
+        self.max_tries = max_tries
+        self.max_delay = max_delay
+        self.dedupe_window = dedupe_window
+        self._seen: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._subscriptions: List[NotificationSubscription] = []
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = NotificationsServiceMetrics()
+        self.error: Optional[Exception] = None
+
+    @property
+    def metrics(self) -> NotificationsServiceMetrics:
+        self._metrics.lag = max(
+            (sub.metrics.lag for sub in self._subscriptions), default=0.0
+        )
+        return self._metrics
+
+    def subscribe(
+        self,
+        maxsize: int = SUBSCRIPTION_MAXSIZE,
+        overflow: Union[OverflowPolicy, str] = OverflowPolicy.DROP,
+        types: Optional[Iterable[NotificationType]] = None,
+    ) -> NotificationSubscription:
+        """
+        :param maxsize: maximum number of queued notifications.
+        :param overflow: what to do when the queue is full.
+        :param types: only receive these notification types.
+        """
+        subscription = NotificationSubscription(
+            self,
+            maxsize=maxsize,
+            overflow=OverflowPolicy(overflow),
+            types=set(types) if types is not None else None,
+        )
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: NotificationSubscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.error = None
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close_subscriptions()
+
+    async def wait(self):
+        """Wait until the service stops. Raises the error that stopped it."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.error is not None:
+            raise self.error
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _close_subscriptions(self):
+        for subscription in list(self._subscriptions):
+            await subscription.close()
+
+    def _is_duplicate(self, notification: Notification) -> bool:
+        key = _dedupe_key(notification)
+        if key is None:
+            return False
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return True
+        self._seen[key] = None
+        if len(self._seen) > self.dedupe_window:
+            self._seen.popitem(last=False)
+        return False
+
+    async def _dispatch(self, line: str):
+        notification = NOTIFICATION_DECODER.decode(line)
+        if notification is None:
+            return
+        received_at = time.monotonic()
+        self._metrics.received += 1
+        self._metrics.last_event_at = time.time()
+        if self._is_duplicate(notification):
+            self._metrics.duplicates += 1
+            return
+        for subscription in list(self._subscriptions):
+            await subscription.put(notification, received_at)
+
+    async def _consume(self):
+        response = await self._connect()
+        self._metrics.connections += 1
+        self._metrics.connected = True
+        if self._on_connect is not None:
+            self._on_connect()
+        try:
+            async for line in response.aiter_lines():
+                await self._dispatch(line)
+        finally:
+            self._metrics.connected = False
+            await response.aclose()
+
+    async def _run(self):
+        delays = backoff.expo(max_value=self.max_delay)
+        next(delays)
+        failures = 0
+        try:
+            while True:
+                try:
+                    await self._consume()
+                    # The server closes the stream periodically: reopen it
+                    # straight away and start the backoff sequence again
+                    failures = 0
+                    delays = backoff.expo(max_value=self.max_delay)
+                    next(delays)
+                    logger.info("Notifications stream ended, reconnecting")
+                except Exception as exc:
+                    failures += 1
+                    if not _is_retriable(exc) or (
+                        self.max_tries is not None and failures >= self.max_tries
+                    ):
+                        logger.error(f"Notifications stream failed: {exc}")
+                        self.error = exc
+                        return
+                    delay = backoff.full_jitter(next(delays))
+                    logger.warning(
+                        f"Notifications stream failed ({exc}), "
+                        f"reconnecting in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+                self._metrics.reconnects += 1
+        finally:
+            await self._close_subscriptions()
@@ -26,18 +26,9 @@ import aiofiles
 import backoff
 from deprecated import deprecated
 from httpx import ConnectError, ConnectTimeout, Response, Timeout
-from nuclia_models.common.consumption import Consumption, ConsumptionGenerative
 from nuclia_models.predict.generative_responses import (
-    CitationsGenerativeResponse,
-    FootnoteCitationsGenerativeResponse,
     GenerativeChunk,
     GenerativeFullResponse,
-    JSONGenerativeResponse,
-    MetaGenerativeResponse,
-    ReasoningGenerativeResponse,
-    StatusGenerativeResponse,
-    TextGenerativeResponse,
-    ToolsGenerativeResponse,
 )
 from nuclia_models.predict.remi import RemiRequest, RemiResponse
 from nucliadb_models.search import Image
@@ -51,6 +42,7 @@ from nuclia.exceptions import (
     PredictLimitsExceededError,
     RetriablePredictAPIException,
 )
+from nuclia.lib.ndjson import NDJSONDecoder
 from nuclia.lib.nua_responses import (
     ChatModel,
     ChatResponse,
@@ -77,6 +69,7 @@ from nuclia.lib.nua_responses import (
     SummarizeResource,
     Tokens,
 )
+from nuclia.lib.stream import GenerativeAssembler
 from nuclia.lib.utils import build_httpx_async_client, build_httpx_client
 
 if TYPE_CHECKING:
@@ -107,6 +100,8 @@ LEARNING_MODEL_HEADER = "nuclia-learning-model"
 LEARNING_TRACE_HEADER = "nuclia-learning-trace-id"
 LEARNING_CHAT_HISTORY_HEADER = "nuclia-learning-chat-history"
 
+GENERATIVE_CHUNK_DECODER = NDJSONDecoder(GenerativeChunk)
+
 ConvertType = TypeVar("ConvertType", bound=BaseModel)
 StreamType = TypeVar("StreamType")
 
@@ -509,10 +504,10 @@ class NuaClient:
         ) as response:
             _raise_for_response(response, PredictAPIException)
             for json_body in response.iter_lines():
-                if not json_body.strip():
-                    continue
                 try:
-                    chunk = GenerativeChunk.model_validate_json(json_body)
+                    chunk = GENERATIVE_CHUNK_DECODER.decode(json_body)
+                    if chunk is None:
+                        continue
                     if chunk.chunk.type == "meta":
                         chunk.chunk.learning_id = response.headers.get(
                             LEARNING_ID_HEADER, chunk.chunk.learning_id
@@ -661,40 +656,15 @@ class NuaClient:
         if model:
             endpoint += f"?model={model}"
 
-        result = GenerativeFullResponse(answer="")
-        for chunk in self._stream(
-            "POST",
-            endpoint,
-            payload=body.model_dump(),
-            timeout=timeout,
-            extra_headers=extra_headers,
-        ):
-            if isinstance(chunk.chunk, TextGenerativeResponse):
-                result.answer += chunk.chunk.text
-            elif isinstance(chunk.chunk, ReasoningGenerativeResponse):
-                result.reasoning = (result.reasoning or "") + chunk.chunk.text
-            elif isinstance(chunk.chunk, JSONGenerativeResponse):
-                result.object = chunk.chunk.object
-            elif isinstance(chunk.chunk, MetaGenerativeResponse):
-                result.input_tokens = chunk.chunk.input_tokens
-                result.output_tokens = chunk.chunk.output_tokens
-                result.input_nuclia_tokens = chunk.chunk.input_nuclia_tokens
-                result.output_nuclia_tokens = chunk.chunk.output_nuclia_tokens
-                result.timings = chunk.chunk.timings
-            elif isinstance(chunk.chunk, CitationsGenerativeResponse):
-                result.citations = chunk.chunk.citations
-            elif isinstance(chunk.chunk, FootnoteCitationsGenerativeResponse):
-                result.citation_footnote_to_context = chunk.chunk.footnote_to_context
-            elif isinstance(chunk.chunk, StatusGenerativeResponse):
-                result.code = chunk.chunk.code
-            elif isinstance(chunk.chunk, ToolsGenerativeResponse):
-                result.tools = chunk.chunk.tools
-            elif isinstance(chunk.chunk, ConsumptionGenerative):
-                result.consumption = Consumption(
-                    normalized_tokens=chunk.chunk.normalized_tokens,
-                    customer_key_tokens=chunk.chunk.customer_key_tokens,
-                )
-        return result
+        return GenerativeAssembler().consume(
+            self._stream(
+                "POST",
+                endpoint,
+                payload=body.model_dump(),
+                timeout=timeout,
+                extra_headers=extra_headers,
+            )
+        )
 
     @deprecated(version="2.1.0", reason="You should use generate function")
     def generate_predict(
@@ -773,10 +743,7 @@ class NuaClient:
 
         def stream() -> Iterator[GenerativeChunk]:
             try:
-                for json_body in response.iter_lines():
-                    if not json_body.strip():
-                        continue
-                    yield GenerativeChunk.model_validate_json(json_body)
+                yield from GENERATIVE_CHUNK_DECODER.iter(response.iter_lines())
             finally:
                 response.close()
 
@@ -1241,10 +1208,10 @@ class AsyncNuaClient:
 
     async def _parse_stream(self, response: Response) -> AsyncIterator[GenerativeChunk]:
         async for json_body in response.aiter_lines():
-            if not json_body.strip():
-                continue
             try:
-                chunk = GenerativeChunk.model_validate_json(json_body)
+                chunk = GENERATIVE_CHUNK_DECODER.decode(json_body)
+                if chunk is None:
+                    continue
                 if chunk.chunk.type == "meta":
                     chunk.chunk.learning_id = response.headers.get(
                         LEARNING_ID_HEADER, chunk.chunk.learning_id
@@ -1444,42 +1411,15 @@ class AsyncNuaClient:
         endpoint = self._predict_endpoint("chat")
         if model:
             endpoint += f"?model={model}"
-        result = GenerativeFullResponse(answer="")
-
-        async for chunk in self._stream(
-            "POST",
-            endpoint,
-            payload=body.model_dump(),
-            timeout=timeout,
-            extra_headers=extra_headers,
-        ):
-            if isinstance(chunk.chunk, TextGenerativeResponse):
-                result.answer += chunk.chunk.text
-            elif isinstance(chunk.chunk, ReasoningGenerativeResponse):
-                result.reasoning = (result.reasoning or "") + chunk.chunk.text
-            elif isinstance(chunk.chunk, JSONGenerativeResponse):
-                result.object = chunk.chunk.object
-            elif isinstance(chunk.chunk, MetaGenerativeResponse):
-                result.input_tokens = chunk.chunk.input_tokens
-                result.output_tokens = chunk.chunk.output_tokens
-                result.input_nuclia_tokens = chunk.chunk.input_nuclia_tokens
-                result.output_nuclia_tokens = chunk.chunk.output_nuclia_tokens
-                result.timings = chunk.chunk.timings
-            elif isinstance(chunk.chunk, CitationsGenerativeResponse):
-                result.citations = chunk.chunk.citations
-            elif isinstance(chunk.chunk, FootnoteCitationsGenerativeResponse):
-                result.citation_footnote_to_context = chunk.chunk.footnote_to_context
-            elif isinstance(chunk.chunk, StatusGenerativeResponse):
-                result.code = chunk.chunk.code
-            elif isinstance(chunk.chunk, ToolsGenerativeResponse):
-                result.tools = chunk.chunk.tools
-            elif isinstance(chunk.chunk, ConsumptionGenerative):
-                result.consumption = Consumption(
-                    normalized_tokens=chunk.chunk.normalized_tokens,
-                    customer_key_tokens=chunk.chunk.customer_key_tokens,
-                )
-
-        return result
+        return await GenerativeAssembler().aconsume(
+            self._stream(
+                "POST",
+                endpoint,
+                payload=body.model_dump(),
+                timeout=timeout,
+                extra_headers=extra_headers,
+            )
+        )
 
     @overload
     def generate_stream(
@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from nucliadb_models.search import CatalogResponse
+
+C = TypeVar("C")
+P = TypeVar("P")
+
+
+def prefetch_pages(
+    fetch: Callable[[C], P],
+    first: C,
+    next_cursor: Callable[[C, P], Optional[C]],
+) -> Iterator[P]:
+    """
+    Yield the pages of a paginated query, fetching the next page in a
+    background thread while the current one is being consumed.
+
+    :param fetch: function returning the page at a cursor.
+    :param first: cursor of the first page.
+    :param next_cursor: function returning the cursor of the page following
+        the given one, or None if it was the last page.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        cursor = first
+        future: Optional[Future] = executor.submit(fetch, cursor)
+        while future is not None:
+            page = future.result()
+            following = next_cursor(cursor, page)
+            future = None
+            if following is not None:
+                cursor = following
+                future = executor.submit(fetch, cursor)
+            yield page
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def async_prefetch_pages(
+    fetch: Callable[[C], Awaitable[P]],
+    first: C,
+    next_cursor: Callable[[C, P], Optional[C]],
+) -> AsyncIterator[P]:
+    """
+    Async version of `prefetch_pages`: the next page is fetched in a task.
+    """
+    cursor = first
+    task: Optional[asyncio.Future] = asyncio.ensure_future(fetch(cursor))
+    try:
+        while task is not None:
+            page = await task
+            following = next_cursor(cursor, page)
+            task = None
+            if following is not None:
+                cursor = following
+                task = asyncio.ensure_future(fetch(cursor))
+            yield page
+    finally:
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def next_catalog_page(page_number: int, page: CatalogResponse) -> Optional[int]:
+    """`next_cursor` of catalog queries, paginated by page number"""
+    if page.fulltext is None or not page.fulltext.next_page or not page.resources:
+        return None
+    return page_number + 1
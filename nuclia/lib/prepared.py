@@ -0,0 +1,211 @@
+import inspect
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.fields import FieldInfo
+
+from nuclia.lib.ndjson import get_type_adapter
+
+M = TypeVar("M", bound=BaseModel)
+
+# Fields given on each call of a template, all the others are static
+BOUND_FIELDS = ("query", "filters", "top_k")
+
+
+def _field_adapter(field: FieldInfo) -> TypeAdapter:
+    """Validates a single field, with its constraints"""
+    if field.metadata:
+        return get_type_adapter(Annotated[(field.annotation, *field.metadata)])  # type: ignore
+    return get_type_adapter(field.annotation)
+
+
+def _model_validators(
+    model: Type[BaseModel],
+) -> Optional[Tuple[List[Callable], List[Callable]]]:
+    """
+    Before and after validators of the model, to run them on their own, or
+    None if some of them can only run within a whole validation: wrap
+    validators, and validators that take the validation info.
+    """
+    before: List[Callable] = []
+    after: List[Callable] = []
+    for decorator in model.__pydantic_decorators__.model_validators.values():
+        mode = decorator.info.mode
+        if mode == "wrap" or len(inspect.signature(decorator.func).parameters) != 1:
+            return None
+        (before if mode == "before" else after).append(decorator.func)
+    return before, after
+
+
+class QueryTemplate(Generic[M]):
+    """
+    A request whose static parameters are validated and serialized once.
+
+    On each call, only the bound fields are validated and serialized, and
+    spliced into the serialized static parameters. The model validators
+    then run on the request. If they change a static value, the request
+    is serialized again as a whole, so the body always matches it.
+
+    Models with validators that can not run on their own, or with field
+    validators on bound fields, are validated as a whole on each call.
+
+    :param model: request model.
+    :param params: static parameters of the request.
+    """
+
+    def __init__(self, model: Type[M], params: Dict[str, Any]):
+        bound = [name for name in BOUND_FIELDS if name in params]
+        if bound:
+            raise ValueError(f"{', '.join(bound)} must be given on each call")
+        self.model = model
+        self.params = dict(params)
+        self.fields = tuple(name for name in BOUND_FIELDS if name in model.model_fields)
+        self.required = {
+            name for name in self.fields if model.model_fields[name].is_required()
+        }
+        # Required bound fields are validated with a placeholder for now
+        self.request = model.model_validate(
+            {**params, **{name: "" for name in self.required}}
+        )
+        self._adapters = {
+            name: _field_adapter(model.model_fields[name]) for name in self.fields
+        }
+        self._static_values = self._static(self.request)
+        field_validated = {
+            name
+            for validator in model.__pydantic_decorators__.field_validators.values()
+            for name in validator.info.fields
+        }
+        self._validators = (
+            None
+            if field_validated.intersection(self.fields)
+            else _model_validators(model)
+        )
+        if self._validators and self._validators[1]:
+            # After validators already ran on the placeholders and defaults of
+            # the bound fields: they must not have changed the static part
+            try:
+                unchecked = self._unchecked_static(params, field_validated)
+            except (ValueError, AssertionError):
+                unchecked = None
+            if unchecked != self._static_values:
+                self._validators = None
+        skeleton = self.request.model_dump_json(
+            exclude=set(self.fields), by_alias=True, exclude_unset=True
+        )
+        # Opening of the JSON object, ready to be followed by the bound fields
+        self._prefix = skeleton[:-1]
+        self._separator = "," if skeleton != "{}" else ""
+
+    def _static(self, request: BaseModel) -> Dict[str, Any]:
+        """Static values set in `request`"""
+        return {
+            name: getattr(request, name)
+            for name in request.model_fields_set
+            if name not in self.fields
+        }
+
+    def _unchecked_static(
+        self, params: Dict[str, Any], field_validated: Set[str]
+    ) -> Dict[str, Any]:
+        """Static values of `params`, validated without the after validators"""
+        assert self._validators is not None
+        data = dict(params)
+        for validator in self._validators[0]:
+            data = validator(data)
+        return {
+            name: (
+                getattr(self.request, name)
+                if name in field_validated
+                else _field_adapter(self.model.model_fields[name]).validate_python(
+                    value
+                )
+            )
+            for name, value in data.items()
+            if name not in self.fields
+        }
+
+    def _validate(self, bound: Dict[str, Any]) -> M:
+        if self._validators is None:
+            return self.model.model_validate({**self.params, **bound})
+        before, after = self._validators
+        values = dict(bound)
+        if before:
+            data = {**self._static_values, **bound}
+            for validator in before:
+                data = validator(data)
+            values = {
+                name: data[name] for name in self.fields if data.get(name) is not None
+            }
+            if (
+                data.keys() - values.keys() != self._static_values.keys()
+                or any(data[k] is not v for k, v in self._static_values.items())
+                or not self.required.issubset(values)
+            ):
+                # The static part changed: validate the request as a whole
+                return self.model.model_validate({**self.params, **bound})
+        for name, value in values.items():
+            values[name] = self._adapters[name].validate_python(value)
+        request = self.request.model_copy(update=values)
+        for validator in after:
+            request = validator(request)
+        return request
+
+    def bind(self, **values: Any) -> Tuple[M, bytes]:
+        """
+        Build the request and its JSON body out of the values of the bound
+        fields. Fields whose value is None are left unset.
+
+        Raises `pydantic.ValidationError` if a value is not valid.
+        """
+        values = {name: value for name, value in values.items() if value is not None}
+        unknown = set(values) - set(self.fields)
+        if unknown:
+            raise TypeError(f"Unknown bound fields: {', '.join(sorted(unknown))}")
+        missing = [name for name in self.required if name not in values]
+        if missing:
+            raise TypeError(f"Missing bound fields: {', '.join(sorted(missing))}")
+        try:
+            request = self._validate(values)
+        except (ValueError, AssertionError) as exc:
+            if isinstance(exc, ValidationError):
+                raise
+            # Model validators run on their own raise plain errors
+            raise ValidationError.from_exception_data(
+                self.model.__name__,
+                [
+                    {
+                        "type": "value_error",
+                        "loc": (),
+                        "input": values,
+                        "ctx": {"error": exc},
+                    }
+                ],
+            ) from exc
+        if self._static(request) != self._static_values:
+            # A validator changed the static part: the skeleton is stale
+            body = request.model_dump_json(by_alias=True, exclude_unset=True)
+            return request, body.encode()
+        parts = []
+        for name in self.fields:
+            if name in request.model_fields_set:
+                serialized = self._adapters[name].dump_json(
+                    getattr(request, name), by_alias=True, exclude_unset=True
+                )
+                parts.append(f'"{name}":{serialized.decode()}')
+        if not parts:
+            return request, f"{self._prefix}}}".encode()
+        body = f"{self._prefix}{self._separator}{','.join(parts)}}}"
+        return request, body.encode()
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from nucliadb_models.notifications import NotificationType, ResourceOperationType
+
+SLUG_CACHE_MAX_ENTRIES = 10_000
+# Resources deleted or renamed by other processes are forgotten after this
+SLUG_CACHE_TTL_S = 600
+
+
+@dataclass
+class SlugCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+
+
+@dataclass
+class _Entry:
+    rid: str
+    expires_at: float
+
+
+class SlugCache:
+    """
+    LRU cache of the slug of resources and their id, by KB, so that
+    resources the process has already seen are not looked up again.
+
+    It is filled by resource creations, gets and catalog queries, and
+    entries are dropped when resources are deleted through the SDK, when
+    the KB notifies changes to them, or after `ttl` seconds.
+    """
+
+    def __init__(
+        self, max_entries: int = SLUG_CACHE_MAX_ENTRIES, ttl: float = SLUG_CACHE_TTL_S
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._rids: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._slugs: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._metrics = SlugCacheMetrics()
+
+    @property
+    def metrics(self) -> SlugCacheMetrics:
+        with self._lock:
+            self._metrics.entries = len(self._rids)
+            return SlugCacheMetrics(**self._metrics.__dict__)
+
+    def rid(self, kbid: str, slug: str) -> Optional[str]:
+        """Id of the resource with `slug`, if known"""
+        key = (kbid, slug)
+        with self._lock:
+            entry = self._rids.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._metrics.misses += 1
+                return None
+            self._rids.move_to_end(key)
+            self._metrics.hits += 1
+            return entry.rid
+
+    def put(self, kbid: str, rid: Optional[str], slug: Optional[str]):
+        if not rid or not slug:
+            return
+        with self._lock:
+            self._forget(kbid, rid, slug)
+            self._rids[(kbid, slug)] = _Entry(
+                rid=rid, expires_at=time.monotonic() + self.ttl
+            )
+            self._slugs[(kbid, rid)] = slug
+            while len(self._rids) > self.max_entries:
+                self._remove(next(iter(self._rids)))
+                self._metrics.evictions += 1
+
+    def put_resource(self, kbid: str, resource: Any):
+        """Remember a resource, as returned by a get or a catalog query"""
+        self.put(kbid, getattr(resource, "id", None), getattr(resource, "slug", None))
+
+    def forget(self, kbid: str, rid: Optional[str] = None, slug: Optional[str] = None):
+        with self._lock:
+            self._forget(kbid, rid, slug)
+
+    def invalidate(self, kbid: Optional[str] = None):
+        """Forget the resources of `kbid`, or all of them"""
+        with self._lock:
+            for key in [k for k in self._rids if kbid is None or k[0] == kbid]:
+                self._remove(key)
+
+    def on_notification(
+        self,
+        kbid: str,
+        notification_type: Optional[str],
+        data: Optional[Dict[str, Any]],
+    ):
+        """Forget resources deleted or modified, as their slug may change"""
+        if notification_type != NotificationType.RESOURCE_WRITTEN or not data:
+            return
+        if data.get("operation") != ResourceOperationType.CREATED:
+            self.forget(kbid, rid=data.get("resource_uuid"))
+
+    def _forget(self, kbid: str, rid: Optional[str], slug: Optional[str]):
+        if rid is not None:
+            known = self._slugs.get((kbid, rid))
+            if known is not None:
+                self._remove((kbid, known))
+        if slug is not None and (kbid, slug) in self._rids:
+            self._remove((kbid, slug))
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._rids.pop(key)
+        kbid, slug = key
+        if self._slugs.get((kbid, entry.rid)) == slug:
+            del self._slugs[(kbid, entry.rid)]
+
+
+# Shared by all the clients of the process
+SLUG_CACHE = SlugCache()
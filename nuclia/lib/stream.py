@@ -0,0 +1,166 @@
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    ClassVar,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from nuclia_models.common.consumption import Consumption, ConsumptionGenerative
+from nuclia_models.predict.generative_responses import (
+    CitationsGenerativeResponse,
+    FootnoteCitationsGenerativeResponse,
+    GenerativeChunk,
+    GenerativeFullResponse,
+    JSONGenerativeResponse,
+    MetaGenerativeResponse,
+    ReasoningGenerativeResponse,
+    StatusGenerativeResponse,
+    TextGenerativeResponse,
+    ToolsGenerativeResponse,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TextBuffer:
+    """
+    Accumulates text chunks and joins them once, instead of copying the
+    whole text on every chunk.
+    """
+
+    __slots__ = ("_parts",)
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    def append(self, text: str):
+        self._parts.append(text)
+
+    def __bool__(self) -> bool:
+        return len(self._parts) > 0
+
+    def getvalue(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def getvalue_or_none(self) -> Optional[str]:
+        return self.getvalue() if self._parts else None
+
+
+class StreamAssembler(ABC, Generic[T, R]):
+    """
+    Builds a full response out of the items of a stream.
+
+    Subclasses implement `key`, which returns the type of an item, and
+    `result`, and define `handlers`, a table mapping each type to the
+    function that applies the item `payload`.
+    """
+
+    handlers: ClassVar[Dict[Hashable, Callable[[Any, Any], None]]] = {}
+
+    @abstractmethod
+    def key(self, item: T) -> Hashable: ...
+
+    def payload(self, item: T) -> Any:
+        return item
+
+    @abstractmethod
+    def result(self) -> R: ...
+
+    def on_unknown(self, item: T):
+        pass
+
+    def feed(self, item: T):
+        handler = self.handlers.get(self.key(item))
+        if handler is None:
+            self.on_unknown(item)
+        else:
+            handler(self, self.payload(item))
+
+    def consume(self, items: Iterable[T]) -> R:
+        feed = self.feed
+        for item in items:
+            feed(item)
+        return self.result()
+
+    async def aconsume(self, items: AsyncIterable[T]) -> R:
+        feed = self.feed
+        async for item in items:
+            feed(item)
+        return self.result()
+
+
+class GenerativeAssembler(StreamAssembler[GenerativeChunk, GenerativeFullResponse]):
+    """Builds a `GenerativeFullResponse` out of a predict chat stream"""
+
+    def __init__(self):
+        self.response = GenerativeFullResponse(answer="")
+        self.answer = TextBuffer()
+        self.reasoning = TextBuffer()
+
+    def key(self, item: GenerativeChunk) -> Hashable:
+        return type(item.chunk)
+
+    def payload(self, item: GenerativeChunk) -> Any:
+        return item.chunk
+
+    def result(self) -> GenerativeFullResponse:
+        self.response.answer = self.answer.getvalue()
+        self.response.reasoning = self.reasoning.getvalue_or_none()
+        return self.response
+
+    def _text(self, chunk: TextGenerativeResponse):
+        self.answer.append(chunk.text)
+
+    def _reasoning(self, chunk: ReasoningGenerativeResponse):
+        self.reasoning.append(chunk.text)
+
+    def _json(self, chunk: JSONGenerativeResponse):
+        self.response.object = chunk.object
+
+    def _meta(self, chunk: MetaGenerativeResponse):
+        self.response.input_tokens = chunk.input_tokens
+        self.response.output_tokens = chunk.output_tokens
+        self.response.input_nuclia_tokens = chunk.input_nuclia_tokens
+        self.response.output_nuclia_tokens = chunk.output_nuclia_tokens
+        self.response.timings = chunk.timings
+
+    def _citations(self, chunk: CitationsGenerativeResponse):
+        self.response.citations = chunk.citations
+
+    def _footnote_citations(self, chunk: FootnoteCitationsGenerativeResponse):
+        self.response.citation_footnote_to_context = chunk.footnote_to_context
+
+    def _status(self, chunk: StatusGenerativeResponse):
+        self.response.code = chunk.code
+
+    def _tools(self, chunk: ToolsGenerativeResponse):
+        self.response.tools = chunk.tools
+
+    def _consumption(self, chunk: ConsumptionGenerative):
+        self.response.consumption = Consumption(
+            normalized_tokens=chunk.normalized_tokens,
+            customer_key_tokens=chunk.customer_key_tokens,
+        )
+
+    handlers = {
+        TextGenerativeResponse: _text,
+        ReasoningGenerativeResponse: _reasoning,
+        JSONGenerativeResponse: _json,
+        MetaGenerativeResponse: _meta,
+        CitationsGenerativeResponse: _citations,
+        FootnoteCitationsGenerativeResponse: _footnote_citations,
+        StatusGenerativeResponse: _status,
+        ToolsGenerativeResponse: _tools,
+        ConsumptionGenerative: _consumption,
+    }
@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from nuclia.config import EphemeralToken
+
+# Tokens are created with this many more seconds than the requested ttl,
+# and reused while at least the requested ttl is left, minus
+# `EPHEMERAL_TOKEN_MARGIN_S` for the time it takes to use the URLs
+EPHEMERAL_TOKEN_EXTRA_TTL_S = 60
+EPHEMERAL_TOKEN_MARGIN_S = 2
+
+TokenKey = Tuple[str, Optional[int]]
+
+
+class EphemeralTokenCache:
+    """
+    Ephemeral tokens of each KB, by ttl, reused instead of creating one per
+    signed URL. Tokens are created with `extra_ttl` more seconds than asked
+    for, and reused while the requested ttl, minus `margin`, is left.
+    """
+
+    def __init__(
+        self,
+        extra_ttl: int = EPHEMERAL_TOKEN_EXTRA_TTL_S,
+        margin: float = EPHEMERAL_TOKEN_MARGIN_S,
+    ):
+        self.extra_ttl = extra_ttl
+        self.margin = margin
+        self._tokens: Dict[TokenKey, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kbid: str, ttl: Optional[int]) -> Optional[str]:
+        with self._lock:
+            cached = self._tokens.get((kbid, ttl))
+            if cached is None:
+                return None
+            token, reusable_until = cached
+            if reusable_until <= time.monotonic():
+                del self._tokens[(kbid, ttl)]
+                return None
+            return token
+
+    def put(self, kbid: str, ttl: Optional[int], token: str, created_at: float):
+        if not ttl:
+            # The server default ttl is unknown: do not reuse it
+            return
+        reusable_until = created_at + self.extra_ttl + min(self.margin, ttl)
+        with self._lock:
+            self._tokens[(kbid, ttl)] = (token, reusable_until)
+
+    def _created_ttl(self, ttl: Optional[int]) -> Optional[int]:
+        return ttl + self.extra_ttl if ttl else ttl
+
+    def invalidate(self, kbid: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._tokens if kbid is None or k[0] == kbid]:
+                del self._tokens[key]
+
+    def get_or_create(
+        self,
+        kbid: str,
+        ttl: Optional[int],
+        create: Callable[[str, Optional[int]], EphemeralToken],
+    ) -> str:
+        token = self.get(kbid, ttl)
+        if token is None:
+            # The ttl runs from the moment the token is requested
+            created_at = time.monotonic()
+            token = create(kbid, self._created_ttl(ttl)).token
+            self.put(kbid, ttl, token, created_at)
+        return token
+
+    async def aget_or_create(
+        self,
+        kbid: str,
+        ttl: Optional[int],
+        create: Callable[[str, Optional[int]], Awaitable[EphemeralToken]],
+    ) -> str:
+        token = self.get(kbid, ttl)
+        if token is None:
+            created_at = time.monotonic()
+            token = (await create(kbid, self._created_ttl(ttl))).token
+            self.put(kbid, ttl, token, created_at)
+        return token
+
+
+# Shared by all the clients of the process
+EPHEMERAL_TOKENS = EphemeralTokenCache()
@@ -9,7 +9,7 @@ from httpx import Response as HttpxResponse
 from nuclia_models.agent.interaction import AnswerOperation, AragAnswer
 from nuclia_models.worker.tasks import TaskDefinition, TaskList
 from nucliadb_models.resource import KnowledgeBoxList, ResourceList
-from nucliadb_models.search import SyncAskResponse
+from nucliadb_models.search import AskResponseItem, SyncAskResponse
 from requests import HTTPError as RequestsHTTPError
 from requests import Response as RequestsResponse
 from tabulate import tabulate
@@ -28,6 +28,9 @@ MAX_TITLE_LEN = 50
 
 
 def handle_http_sync_errors(response):
+    if response.status_code < 400:
+        # Do not consume the body of successful (possibly streaming) responses
+        return
     try:
         content = response.text
     except (httpx.ResponseNotRead, requests.exceptions.RequestException):
@@ -39,6 +42,9 @@ def handle_http_sync_errors(response):
 
 
 async def handle_http_async_errors(response: httpx.Response):
+    if response.status_code < 400:
+        # Do not consume the body of successful (possibly streaming) responses
+        return
     try:
         if not response.is_closed and not response.is_stream_consumed:
             await response.aread()
@@ -84,15 +90,37 @@ def _raise_for_status(status_code: int, content: str, response=None, request=Non
             raise Exception(f"Status code {status_code}: {content}")
 
 
+def print_ask_stream_item(item: AskResponseItem) -> bool:
+    """
+    Print an ask stream item as it arrives. Answer tokens are printed
+    without line breaks. Returns whether an answer token was printed.
+    """
+    ask_item = item.item
+    if ask_item.type == "answer":
+        print(ask_item.text, end="", flush=True)
+        return True
+    if ask_item.type == "answer_json":
+        print(json.dumps(ask_item.object, indent=2, ensure_ascii=False))
+    elif ask_item.type == "error":
+        print(f"ERROR: {ask_item.error}")
+    return False
+
+
 def serialize(obj):
     # Serialize each item in the iterator separately
     if hasattr(obj, "__iter__") and hasattr(obj, "__next__"):
+        streamed_answer = False
         for i, item in enumerate(obj):
+            if isinstance(item, AskResponseItem):
+                streamed_answer = print_ask_stream_item(item) or streamed_answer
+                continue
             serialized_item = serialize(item)
             if serialized_item:
                 print(f"{item.__class__.__name__} {i}")
                 print(serialized_item)
                 print()
+        if streamed_answer:
+            print()
         return ""
 
     if isinstance(obj, ResourceList):
@@ -0,0 +1,101 @@
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar, Union
+
+import pydantic_core
+from nucliadb_models.extracted import ExtractedText
+from nucliadb_models.resource import Resource
+
+from nuclia.lib.ndjson import get_type_adapter
+
+T = TypeVar("T")
+
+Path = Tuple[Union[str, int], ...]
+
+
+class ResourceView:
+    """
+    Read-only view of a resource, as returned by the KB, for readers that
+    only need a part of it. The response is kept as bytes and parsed on
+    first access, without validating it nor building models. Parts of it
+    are validated into models only when asked for with `parse`, and the
+    whole `Resource` model is only built by `materialize`.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self._parsed: Optional[Dict[str, Any]] = None
+        self._models: Dict[Tuple[Any, Path], Any] = {}
+        self._resource: Optional[Resource] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON value of the resource"""
+        if self._parsed is None:
+            self._parsed = pydantic_core.from_json(self.content)
+        return self._parsed
+
+    def get(self, *path: Union[str, int], default: Any = None) -> Any:
+        """
+        Plain JSON value at `path`, like `view.get("data", "files", "doc",
+        "extracted", "text", "text")`, or `default` if there is none.
+        """
+        value: Any = self.to_dict()
+        for key in path:
+            try:
+                value = value[key]
+            except (KeyError, IndexError, TypeError):
+                return default
+            if value is None:
+                return default
+        return value
+
+    def parse(self, model: Type[T], *path: Union[str, int]) -> Optional[T]:
+        """Value at `path`, validated as `model` on first access"""
+        key = (model, path)
+        if key not in self._models:
+            value = self.get(*path)
+            self._models[key] = (
+                None
+                if value is None
+                else get_type_adapter(model).validate_python(value)
+            )
+        return self._models[key]
+
+    @property
+    def id(self) -> str:
+        return self.get("id")
+
+    @property
+    def slug(self) -> Optional[str]:
+        return self.get("slug")
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.get("title")
+
+    def field(self, field_type: str, field_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Plain JSON value of a field.
+
+        :param field_type: type of the field, as in `Resource.data`
+            (`texts`, `files`, `links`, `conversations`...).
+        """
+        return self.get("data", field_type, field_id)
+
+    def extracted_text(self, field_type: str, field_id: str) -> Optional[ExtractedText]:
+        """Text extracted from a field, if `extracted` included `text`"""
+        return self.parse(
+            ExtractedText, "data", field_type, field_id, "extracted", "text"
+        )
+
+    def materialize(self) -> Resource:
+        """Full `Resource` model, validated once"""
+        if self._resource is None:
+            self._resource = Resource.model_validate_json(self.content)
+        return self._resource
+
+    def json(self, indent: Optional[int] = None) -> str:
+        if indent is None:
+            return self.content.decode()
+        return pydantic_core.to_json(self.to_dict(), indent=indent).decode()
+
+    def __repr__(self) -> str:
+        return f"ResourceView(id={self.id!r}, {len(self.content)} bytes)"
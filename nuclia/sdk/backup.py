@@ -1,4 +1,7 @@
-from typing import Optional, Union
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from uuid import UUID
 
 from nuclia_models.accounts.backups import (
@@ -12,17 +15,92 @@ from pydantic import BaseModel, TypeAdapter
 from nuclia import get_regional_url
 from nuclia.data import get_async_auth, get_auth
 from nuclia.decorators import account, accounts, zone
+from nuclia.lib.batch import async_run_batch, run_batch
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
+from nuclia.sdk.logger import logger
 
 BACKUPS_ENDPOINT = "/api/v1/account/{account_id}/backups"
 BACKUP_ENDPOINT = "/api/v1/account/{account_id}/backup/{backup_id}"
 RESTORE_ENDPOINT = "/api/v1/account/{account_id}/backup/{backup_id}/restore"
 
+BACKUP_CONCURRENCY = 4
+BACKUP_STATUS_CHECK_INTERVAL_S = 30
+BACKUP_WAIT_TIMEOUT_S = 6 * 60 * 60
+
 
 class KnowledgeBoxCreated(BaseModel):
     id: str
 
 
+class BackupManifestEntry(BaseModel):
+    zone: str
+    kb_id: Optional[str] = None
+    backup_id: Optional[str] = None
+    restored_kb_id: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    size: Optional[int] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def pending(self) -> bool:
+        return (
+            self.backup_id is not None
+            and self.error is None
+            and self.finished_at is None
+        )
+
+    def update(self, backup: BackupResponse):
+        self.started_at = backup.started_at
+        self.finished_at = backup.finished_at
+        self.size = backup.size
+        if backup.finished_at is not None:
+            self.duration = (backup.finished_at - backup.started_at).total_seconds()
+
+
+class BackupManifest(BaseModel):
+    entries: List[BackupManifestEntry] = []
+
+    @property
+    def pending(self) -> List[BackupManifestEntry]:
+        return [entry for entry in self.entries if entry.pending]
+
+    @property
+    def failed(self) -> List[BackupManifestEntry]:
+        return [entry for entry in self.entries if entry.error is not None]
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.model_dump_json(indent=2))
+
+
+def _group_by_zone(
+    items: Iterable[Union[str, dict]], default_zone: Optional[str], key: str
+) -> Dict[str, List[dict]]:
+    # Validate every item before any request is sent
+    groups: Dict[str, List[dict]] = {}
+    for item in items:
+        if isinstance(item, str):
+            item = {key: item}
+        if not item.get(key):
+            raise ValueError(f"{key} is required: {item}")
+        item_zone = item.get("zone") or default_zone
+        if not item_zone:
+            raise ValueError(f"zone is required for {item.get(key)}")
+        groups.setdefault(item_zone, []).append(item)
+    return groups
+
+
+def _backup_statuses(
+    manifest: BackupManifest, backups: Iterable[BackupResponse], zone: str
+):
+    by_id = {str(backup.id): backup for backup in backups}
+    for entry in manifest.pending:
+        if entry.zone == zone and entry.backup_id in by_id:
+            entry.update(by_id[entry.backup_id])
+
+
 class NucliaBackup:
     @property
     def _auth(self) -> NucliaAuth:
@@ -138,6 +216,177 @@ class NucliaBackup:
         )
         return KnowledgeBoxCreated.model_validate(data)
 
+    @accounts
+    @account
+    @zone
+    def create_many(
+        self,
+        kbs: Iterable[Union[str, dict]],
+        account_id: Optional[str] = None,
+        zone: Optional[str] = None,
+        concurrency: int = BACKUP_CONCURRENCY,
+        wait: bool = True,
+        timeout: float = BACKUP_WAIT_TIMEOUT_S,
+        manifest: Optional[str] = None,
+        **kwargs,
+    ) -> BackupManifest:
+        """
+        Create backups of many Knowledge Boxes, grouped by zone.
+
+        :param kbs: KB ids, or dicts with `kb_id` and an optional `zone`.
+            Items without zone are backed up in `zone` (or the default zone).
+        :param concurrency: maximum number of backup requests in flight.
+        :param wait: wait for all the backups to finish.
+        :param timeout: maximum number of seconds to wait for the backups
+            (6 hours by default). A `TimeoutError` listing the backups still
+            running is raised when it expires, after writing the manifest.
+        :param manifest: if specified, the resulting manifest is written there.
+        """
+        if not account_id:
+            raise ValueError("account_id is required")
+
+        groups = _group_by_zone(kbs, zone, "kb_id")
+        endpoints = {
+            kb_zone: self._auth.resolve_zone_endpoint(kb_zone) for kb_zone in groups
+        }
+        result = BackupManifest()
+
+        def submit(entry: BackupManifestEntry):
+            zone_region, zone_origin = endpoints[entry.zone]
+            path = get_regional_url(
+                zone_region,
+                BACKUPS_ENDPOINT.format(account_id=account_id),
+                origin_url=zone_origin,
+            )
+            body = BackupCreate.model_validate({"kb_id": entry.kb_id})
+            data = self._auth._request(
+                "POST", path, body.model_dump(mode="json", exclude_unset=True)
+            )
+            return BackupCreateResponse.model_validate(data)
+
+        entries = [
+            BackupManifestEntry(zone=kb_zone, kb_id=str(item["kb_id"]))
+            for kb_zone, items in groups.items()
+            for item in items
+        ]
+        for item in run_batch(submit, entries, concurrency=concurrency):
+            if item.ok:
+                item.item.backup_id = str(item.value.id)  # type: ignore
+            else:
+                logger.error(f"Backup of KB {item.item.kb_id} failed: {item.error}")
+                item.item.error = str(item.error)
+            result.entries.append(item.item)
+
+        try:
+            if wait:
+                self._wait_for_backups(result, account_id, endpoints, timeout)
+        finally:
+            if manifest is not None:
+                result.write(manifest)
+        return result
+
+    @accounts
+    @account
+    @zone
+    def restore_many(
+        self,
+        restores: Iterable[dict],
+        account_id: Optional[str] = None,
+        zone: Optional[str] = None,
+        concurrency: int = BACKUP_CONCURRENCY,
+        manifest: Optional[str] = None,
+        **kwargs,
+    ) -> BackupManifest:
+        """
+        Restore many backups into new Knowledge Boxes, grouped by zone.
+
+        :param restores: dicts with `backup_id`, `slug`, `title` and an optional `zone`.
+        :param concurrency: maximum number of restore requests in flight.
+        :param manifest: if specified, the resulting manifest is written there.
+        """
+        if not account_id:
+            raise ValueError("account_id is required")
+
+        groups = _group_by_zone(restores, zone, "backup_id")
+        endpoints = {
+            kb_zone: self._auth.resolve_zone_endpoint(kb_zone) for kb_zone in groups
+        }
+        result = BackupManifest()
+
+        def submit(item: Tuple[BackupManifestEntry, BackupRestore]):
+            entry, body = item
+            zone_region, zone_origin = endpoints[entry.zone]
+            path = get_regional_url(
+                zone_region,
+                RESTORE_ENDPOINT.format(
+                    account_id=account_id, backup_id=entry.backup_id
+                ),
+                origin_url=zone_origin,
+            )
+            start = time.monotonic()
+            data = self._auth._request(
+                "POST", path, body.model_dump(mode="json", exclude_unset=True)
+            )
+            entry.duration = time.monotonic() - start
+            return KnowledgeBoxCreated.model_validate(data)
+
+        items = [
+            (
+                BackupManifestEntry(zone=kb_zone, backup_id=str(item["backup_id"])),
+                BackupRestore.model_validate(item),
+            )
+            for kb_zone, zone_items in groups.items()
+            for item in zone_items
+        ]
+        for item in run_batch(submit, items, concurrency=concurrency):
+            entry = item.item[0]
+            if item.ok:
+                entry.restored_kb_id = item.value.id  # type: ignore
+            else:
+                logger.error(
+                    f"Restore of backup {entry.backup_id} failed: {item.error}"
+                )
+                entry.error = str(item.error)
+            result.entries.append(entry)
+
+        if manifest is not None:
+            result.write(manifest)
+        return result
+
+    def _wait_for_backups(
+        self,
+        manifest: BackupManifest,
+        account_id: str,
+        endpoints: Dict[str, Tuple[str, Optional[str]]],
+        timeout: float = BACKUP_WAIT_TIMEOUT_S,
+    ):
+        # A single list call per zone and interval checks all its pending backups
+        start = time.monotonic()
+        while True:
+            for backup_zone in {entry.zone for entry in manifest.pending}:
+                zone_region, zone_origin = endpoints[backup_zone]
+                path = get_regional_url(
+                    zone_region,
+                    BACKUPS_ENDPOINT.format(account_id=account_id),
+                    origin_url=zone_origin,
+                )
+                data = self._auth._request("GET", path)
+                backups = TypeAdapter(list[BackupResponse]).validate_python(data)
+                _backup_statuses(manifest, backups, backup_zone)
+            pending = len(manifest.pending)
+            if pending == 0:
+                return
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                backup_ids = ", ".join(
+                    str(entry.backup_id) for entry in manifest.pending
+                )
+                raise TimeoutError(
+                    f"Timeout waiting for {pending} backups to finish: {backup_ids}"
+                )
+            logger.info(f"Waiting for {pending} backups to finish")
+            time.sleep(min(BACKUP_STATUS_CHECK_INTERVAL_S, remaining))
+
 
 class AsyncNucliaBackup:
     @property
@@ -253,3 +502,174 @@ class AsyncNucliaBackup:
             "POST", path, body.model_dump(mode="json", exclude_unset=True)
         )
         return KnowledgeBoxCreated.model_validate(data)
+
+    @accounts
+    @account
+    @zone
+    async def create_many(
+        self,
+        kbs: Iterable[Union[str, dict]],
+        account_id: Optional[str] = None,
+        zone: Optional[str] = None,
+        concurrency: int = BACKUP_CONCURRENCY,
+        wait: bool = True,
+        timeout: float = BACKUP_WAIT_TIMEOUT_S,
+        manifest: Optional[str] = None,
+        **kwargs,
+    ) -> BackupManifest:
+        """
+        Create backups of many Knowledge Boxes, grouped by zone.
+
+        :param kbs: KB ids, or dicts with `kb_id` and an optional `zone`.
+            Items without zone are backed up in `zone` (or the default zone).
+        :param concurrency: maximum number of backup requests in flight.
+        :param wait: wait for all the backups to finish.
+        :param timeout: maximum number of seconds to wait for the backups
+            (6 hours by default). A `TimeoutError` listing the backups still
+            running is raised when it expires, after writing the manifest.
+        :param manifest: if specified, the resulting manifest is written there.
+        """
+        if not account_id:
+            raise ValueError("account_id is required")
+
+        groups = _group_by_zone(kbs, zone, "kb_id")
+        endpoints = {
+            kb_zone: self._auth.resolve_zone_endpoint(kb_zone) for kb_zone in groups
+        }
+        result = BackupManifest()
+
+        async def submit(entry: BackupManifestEntry):
+            zone_region, zone_origin = endpoints[entry.zone]
+            path = get_regional_url(
+                zone_region,
+                BACKUPS_ENDPOINT.format(account_id=account_id),
+                origin_url=zone_origin,
+            )
+            body = BackupCreate.model_validate({"kb_id": entry.kb_id})
+            data = await self._auth._request(
+                "POST", path, body.model_dump(mode="json", exclude_unset=True)
+            )
+            return BackupCreateResponse.model_validate(data)
+
+        entries = [
+            BackupManifestEntry(zone=kb_zone, kb_id=str(item["kb_id"]))
+            for kb_zone, items in groups.items()
+            for item in items
+        ]
+        async for item in async_run_batch(submit, entries, concurrency=concurrency):
+            if item.ok:
+                item.item.backup_id = str(item.value.id)  # type: ignore
+            else:
+                logger.error(f"Backup of KB {item.item.kb_id} failed: {item.error}")
+                item.item.error = str(item.error)
+            result.entries.append(item.item)
+
+        try:
+            if wait:
+                await self._wait_for_backups(result, account_id, endpoints, timeout)
+        finally:
+            if manifest is not None:
+                result.write(manifest)
+        return result
+
+    @accounts
+    @account
+    @zone
+    async def restore_many(
+        self,
+        restores: Iterable[dict],
+        account_id: Optional[str] = None,
+        zone: Optional[str] = None,
+        concurrency: int = BACKUP_CONCURRENCY,
+        manifest: Optional[str] = None,
+        **kwargs,
+    ) -> BackupManifest:
+        """
+        Restore many backups into new Knowledge Boxes, grouped by zone.
+
+        :param restores: dicts with `backup_id`, `slug`, `title` and an optional `zone`.
+        :param concurrency: maximum number of restore requests in flight.
+        :param manifest: if specified, the resulting manifest is written there.
+        """
+        if not account_id:
+            raise ValueError("account_id is required")
+
+        groups = _group_by_zone(restores, zone, "backup_id")
+        endpoints = {
+            kb_zone: self._auth.resolve_zone_endpoint(kb_zone) for kb_zone in groups
+        }
+        result = BackupManifest()
+
+        async def submit(item: Tuple[BackupManifestEntry, BackupRestore]):
+            entry, body = item
+            zone_region, zone_origin = endpoints[entry.zone]
+            path = get_regional_url(
+                zone_region,
+                RESTORE_ENDPOINT.format(
+                    account_id=account_id, backup_id=entry.backup_id
+                ),
+                origin_url=zone_origin,
+            )
+            start = time.monotonic()
+            data = await self._auth._request(
+                "POST", path, body.model_dump(mode="json", exclude_unset=True)
+            )
+            entry.duration = time.monotonic() - start
+            return KnowledgeBoxCreated.model_validate(data)
+
+        items = [
+            (
+                BackupManifestEntry(zone=kb_zone, backup_id=str(item["backup_id"])),
+                BackupRestore.model_validate(item),
+            )
+            for kb_zone, zone_items in groups.items()
+            for item in zone_items
+        ]
+        async for item in async_run_batch(submit, items, concurrency=concurrency):
+            entry = item.item[0]
+            if item.ok:
+                entry.restored_kb_id = item.value.id  # type: ignore
+            else:
+                logger.error(
+                    f"Restore of backup {entry.backup_id} failed: {item.error}"
+                )
+                entry.error = str(item.error)
+            result.entries.append(entry)
+
+        if manifest is not None:
+            result.write(manifest)
+        return result
+
+    async def _wait_for_backups(
+        self,
+        manifest: BackupManifest,
+        account_id: str,
+        endpoints: Dict[str, Tuple[str, Optional[str]]],
+        timeout: float = BACKUP_WAIT_TIMEOUT_S,
+    ):
+        # A single list call per zone and interval checks all its pending backups
+        start = time.monotonic()
+        while True:
+            for backup_zone in {entry.zone for entry in manifest.pending}:
+                zone_region, zone_origin = endpoints[backup_zone]
+                path = get_regional_url(
+                    zone_region,
+                    BACKUPS_ENDPOINT.format(account_id=account_id),
+                    origin_url=zone_origin,
+                )
+                data = await self._auth._request("GET", path)
+                backups = TypeAdapter(list[BackupResponse]).validate_python(data)
+                _backup_statuses(manifest, backups, backup_zone)
+            pending = len(manifest.pending)
+            if pending == 0:
+                return
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                backup_ids = ", ".join(
+                    str(entry.backup_id) for entry in manifest.pending
+                )
+                raise TimeoutError(
+                    f"Timeout waiting for {pending} backups to finish: {backup_ids}"
+                )
+            logger.info(f"Waiting for {pending} backups to finish")
+            await asyncio.sleep(min(BACKUP_STATUS_CHECK_INTERVAL_S, remaining))
@@ -1,10 +1,14 @@
 import asyncio
 import os
+import queue
+import threading
 import time
 from functools import partial
-from typing import Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
 import aiofiles
+import backoff
+import httpx
 from nucliadb_models.export_import import (
     CreateExportResponse,
     CreateImportResponse,
@@ -20,6 +24,22 @@ from nuclia.sdk.logger import logger
 MB = 1024 * 1024
 CHUNK_SIZE = 10 * MB
 STATUS_CHECK_INTERVAL_S = 3
+# Number of chunks read ahead of the upload while importing
+PREFETCH_CHUNKS = 4
+IMPORT_MAX_TRIES = 3
+IMPORT_RETRY_FACTOR = 5
+# The import endpoint is not resumable: on these errors the whole upload is
+# retried from the beginning of the file, if the server did not get all of it.
+# Only transport errors raised before the request reached the server are
+# retried: once a response arrives, the whole body has been sent.
+# See `_import_retriable`.
+IMPORT_RETRIABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.WriteError,
+    httpx.WriteTimeout,
+)
 
 
 class NucliaExports:
@@ -121,34 +141,43 @@ class NucliaImports:
 
     @kb
     def start(
-        self, *, path: str, sync: bool = False, **kwargs
+        self,
+        *,
+        path: str,
+        sync: bool = False,
+        prefetch: int = PREFETCH_CHUNKS,
+        max_tries: int = IMPORT_MAX_TRIES,
+        **kwargs,
     ) -> Optional[CreateImportResponse]:
         """
         Start an import.
 
         :param path: path to the file with the export data.
         :param sync: waits for the server import task to finish.
+        :param prefetch: number of chunks read ahead of the upload.
+        :param max_tries: attempts to upload the data on transient errors.
         """
         ndb: NucliaDBClient = kwargs["ndb"]
-
-        def iterator(path: str):
-            total_size = os.path.getsize(path)
-            with tqdm(
-                desc="Uploading data",
-                total=total_size,
-                unit="iB",
-                unit_scale=True,
-            ) as pbar:
-                with open(path, "rb") as f:
-                    while True:
-                        chunk = f.read(CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        pbar.update(len(chunk))
-                        yield chunk
+        readers: List[_BaseReadAheadReader] = []
+
+        @backoff.on_exception(
+            backoff.expo,
+            IMPORT_RETRIABLE_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=max_tries,
+            factor=IMPORT_RETRY_FACTOR,
+            giveup=lambda _: not _import_retriable(readers),
+            on_backoff=_log_import_retry,
+        )
+        def upload() -> CreateImportResponse:
+            with ReadAheadReader(path, prefetch=prefetch) as reader:
+                readers.append(reader)
+                response = ndb.ndb.start_import(kbid=ndb.kbid, content=reader.chunks())
+            reader.log_throughput()
+            return response
 
         logger.info(f"Importing from {path}")
-        response = ndb.ndb.start_import(kbid=ndb.kbid, content=iterator(path))
+        response = upload()
 
         if not sync:
             logger.info("Import task started.")
@@ -179,34 +208,45 @@ class AsyncNucliaImports:
 
     @kb
     async def start(
-        self, *, path: str, sync: bool = False, **kwargs
+        self,
+        *,
+        path: str,
+        sync: bool = False,
+        prefetch: int = PREFETCH_CHUNKS,
+        max_tries: int = IMPORT_MAX_TRIES,
+        **kwargs,
     ) -> Optional[CreateImportResponse]:
         """
         Start an import.
 
         :param path: path to the file with the export data.
         :param sync: waits for the server import task to finish.
+        :param prefetch: number of chunks read ahead of the upload.
+        :param max_tries: attempts to upload the data on transient errors.
         """
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-
-        async def iterator(path: str):
-            total_size = os.path.getsize(path)
-            with tqdm(
-                desc="Uploading data",
-                total=total_size,
-                unit="iB",
-                unit_scale=True,
-            ) as pbar:
-                async with aiofiles.open(path, "rb") as f:
-                    while True:
-                        chunk = await f.read(CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        pbar.update(len(chunk))
-                        yield chunk
+        readers: List[_BaseReadAheadReader] = []
+
+        @backoff.on_exception(
+            backoff.expo,
+            IMPORT_RETRIABLE_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=max_tries,
+            factor=IMPORT_RETRY_FACTOR,
+            giveup=lambda _: not _import_retriable(readers),
+            on_backoff=_log_import_retry,
+        )
+        async def upload() -> CreateImportResponse:
+            async with AsyncReadAheadReader(path, prefetch=prefetch) as reader:
+                readers.append(reader)
+                response = await ndb.ndb.start_import(
+                    kbid=ndb.kbid, content=reader.chunks()
+                )
+            reader.log_throughput()
+            return response
 
         logger.info(f"Importing from {path}")
-        response = await ndb.ndb.start_import(kbid=ndb.kbid, content=iterator(path))
+        response = await upload()
 
         if not sync:
             logger.info("Import task started.")
@@ -229,6 +269,223 @@ class AsyncNucliaImports:
         return await ndb.ndb.import_status(kbid=ndb.kbid, import_id=import_id)
 
 
+class _BaseReadAheadReader:
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        prefetch: int = PREFETCH_CHUNKS,
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.prefetch = max(1, prefetch)
+        self.total_size = os.path.getsize(path)
+        self.bytes_read = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._pbar: Optional[tqdm] = None
+
+    def _open_pbar(self):
+        self._pbar = tqdm(
+            desc="Uploading data",
+            total=self.total_size,
+            unit="iB",
+            unit_scale=True,
+        )
+
+    def _close_pbar(self):
+        if self._pbar is not None:
+            self._pbar.close()
+            self._pbar = None
+
+    def _consumed(self, chunk: bytes):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.bytes_read += len(chunk)
+        if self._pbar is not None:
+            self._pbar.update(len(chunk))
+
+    @property
+    def body_sent(self) -> bool:
+        """Whether the whole file has been handed to the upload"""
+        return self.finished_at is not None
+
+    @property
+    def throughput(self) -> float:
+        """Sustained upload throughput, in MB/s"""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or time.monotonic()
+        elapsed = max(end - self.started_at, 1e-6)
+        return self.bytes_read / MB / elapsed
+
+    def log_throughput(self):
+        logger.info(
+            f"Uploaded {self.bytes_read / MB:.1f} MB at {self.throughput:.2f} MB/s"
+        )
+
+
+class ReadAheadReader(_BaseReadAheadReader):
+    """
+    Iterate over the chunks of a file while a background thread keeps reading
+    the next ones, so that disk reads overlap with network writes.
+
+    At most `prefetch` chunks are kept in memory.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        prefetch: int = PREFETCH_CHUNKS,
+    ):
+        super().__init__(path, chunk_size=chunk_size, prefetch=prefetch)
+        self._queue: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ReadAheadReader":
+        self._open_pbar()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                while not self._stop.is_set():
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if not self._put(chunk):
+                        return
+        except Exception as exc:
+            self._put(exc)
+            return
+        self._put(self._DONE)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.chunks()
+
+    def chunks(self) -> Iterator[bytes]:
+        if self._thread is None:
+            raise RuntimeError("ReadAheadReader must be used as a context manager")
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                self.finished_at = time.monotonic()
+                return
+            if isinstance(item, Exception):
+                raise item
+            self._consumed(item)
+            yield item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close_pbar()
+
+
+class AsyncReadAheadReader(_BaseReadAheadReader):
+    """
+    Async version of `ReadAheadReader`: a background task reads the file with
+    aiofiles while the upload consumes the chunks already read.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        prefetch: int = PREFETCH_CHUNKS,
+    ):
+        super().__init__(path, chunk_size=chunk_size, prefetch=prefetch)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "AsyncReadAheadReader":
+        self._open_pbar()
+        self._task = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _read(self):
+        try:
+            async with aiofiles.open(self.path, "rb") as f:
+                while True:
+                    chunk = await f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    await self._queue.put(chunk)
+        except Exception as exc:
+            await self._queue.put(exc)
+            return
+        await self._queue.put(self._DONE)
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.chunks()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        if self._task is None:
+            raise RuntimeError(
+                "AsyncReadAheadReader must be used as an async context manager"
+            )
+        while True:
+            item = await self._queue.get()
+            if item is self._DONE:
+                self.finished_at = time.monotonic()
+                return
+            if isinstance(item, Exception):
+                raise item
+            self._consumed(item)
+            yield item
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_pbar()
+
+
+def _import_retriable(readers: List[_BaseReadAheadReader]) -> bool:
+    """
+    Whether an import upload that failed can be sent again. Once the whole
+    body has been sent, the server may have started the import, so it is
+    never sent twice.
+    """
+    return not (readers and readers[-1].body_sent)
+
+
+def _log_import_retry(details):
+    logger.warning(
+        f"Import upload failed ({details['exception']}). "
+        f"Retrying from the beginning (attempt {details['tries'] + 1})"
+    )
+
+
 def wait_for_task_to_finish(ndb: NucliaDBClient, task_type: str, id: str):
     if task_type not in ("export", "import"):
         raise ValueError(f"Unknown task_type {task_type}")
@@ -5,6 +5,7 @@ from nuclia_models.config.proto import ExtractConfig
 from nuclia.data import get_async_auth, get_auth
 from nuclia.decorators import kb, pretty
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.kb_config import KB_CONFIGS
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
 
 
@@ -41,6 +42,7 @@ class NucliaExtractStrategy:
 
         ndb: NucliaDBClient = kwargs["ndb"]
         response = ndb.add_extract_strategy(config=config)
+        KB_CONFIGS.invalidate(ndb.kbid)
         return response.json()
 
     @kb
@@ -52,6 +54,7 @@ class NucliaExtractStrategy:
         """
         ndb: NucliaDBClient = kwargs["ndb"]
         ndb.delete_extract_strategy(strategy_id=id)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
 
 class AsyncNucliaExtractStrategy:
@@ -87,6 +90,7 @@ class AsyncNucliaExtractStrategy:
 
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         response = await ndb.add_extract_strategy(config=config)
+        KB_CONFIGS.invalidate(ndb.kbid)
         return response.json()
 
     @kb
@@ -98,3 +102,4 @@ class AsyncNucliaExtractStrategy:
         """
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         await ndb.delete_extract_strategy(strategy_id=id)
+        KB_CONFIGS.invalidate(ndb.kbid)
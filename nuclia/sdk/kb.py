@@ -1,21 +1,55 @@
 import asyncio
 import os
 import tempfile
+import threading
 import time
 from datetime import datetime
-from typing import Any, AsyncIterator, Iterator, List, Optional, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
+import backoff
 from deprecated import deprecated
 from nucliadb_models import Notification
 from nucliadb_models.labels import KnowledgeBoxLabels, Label, LabelSet, LabelSetKind
-from nucliadb_models.resource import ResourceList
+from nucliadb_models.metadata import ResourceProcessingStatus
+from nucliadb_models.resource import Resource, ResourceList
 from nucliadb_models.search import SummarizeRequest, SummaryKind
 from nucliadb_sdk import exceptions
 
+from nuclia import get_list_parameter
 from nuclia.data import get_async_auth, get_async_client, get_auth, get_client
 from nuclia.decorators import kb
+from nuclia.lib.batch import DEFAULT_CONCURRENCY, async_run_batch, run_batch
+from nuclia.lib.graph import GraphIndex, relation_edges
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.kb_config import KB_CONFIGS, KBConfig
+from nuclia.lib.labels import (
+    LABELSETS,
+    LabelAssignment,
+    LabelResult,
+    group_assignments,
+    has_labels,
+    labels_by_labelset,
+    merge_classifications,
+)
+from nuclia.lib.mirror import CATALOG_PAGE_SIZE, Mirror, MirrorFile, MirrorResult
 from nuclia.lib.models import GraphRelation, get_relation
+from nuclia.lib.notifications import (
+    NOTIFICATION_DECODER,
+    STATUS_CHECK_INTERVAL_S,
+    NotificationsService,
+    ProcessingWaiters,
+    WaitCondition,
+)
 from nuclia.lib.nua_responses import SummarizedModel
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
 from nuclia.sdk.export_import import (
@@ -32,7 +66,12 @@ from nuclia.sdk.kv_schemas import AsyncNucliaKVSchemas, NucliaKVSchemas
 from nuclia.sdk.logger import logger
 from nuclia.sdk.logs import AsyncNucliaLogs, NucliaLogs
 from nuclia.sdk.remi import AsyncNucliaRemi, NucliaRemi
-from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+from nuclia.sdk.resource import (
+    RATE_LIMIT_ERRORS,
+    RATE_LIMIT_MAX_TRIES,
+    AsyncNucliaResource,
+    NucliaResource,
+)
 from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
 from nuclia.sdk.split_strategy import (
     AsyncNucliaSplitStrategy,
@@ -84,7 +123,9 @@ class NucliaKB:
         **kwargs,
     ) -> LabelSet:
         ndb: NucliaDBClient = kwargs["ndb"]
-        return ndb.ndb.get_labelset(kbid=ndb.kbid, labelset=labelset)
+        labelset_obj = ndb.ndb.get_labelset(kbid=ndb.kbid, labelset=labelset)
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        return labelset_obj
 
     @kb
     @deprecated(version="5.0.0", reason="You should use set_labelset")
@@ -136,17 +177,22 @@ class NucliaKB:
         )
 
         ndb.ndb.set_labelset(kbid=ndb.kbid, labelset=labelset, content=labelset_obj)
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     def list_labelsets(self, **kwargs) -> KnowledgeBoxLabels:
         ndb: NucliaDBClient = kwargs["ndb"]
         data: KnowledgeBoxLabels = ndb.ndb.get_labelsets(kbid=ndb.kbid)
+        LABELSETS.put_all(ndb.kbid, data)
         return data
 
     @kb
     def del_labelset(self, *, labelset: str, **kwargs):
         ndb: NucliaDBClient = kwargs["ndb"]
         ndb.ndb.delete_labelset(kbid=ndb.kbid, labelset=labelset)
+        LABELSETS.forget(ndb.kbid, labelset)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     def add_label(
@@ -174,6 +220,9 @@ class NucliaKB:
         **kwargs,
     ):
         ndb: NucliaDBClient = kwargs["ndb"]
+        cached = LABELSETS.get(ndb.kbid, labelset)
+        if cached is not None and has_labels(cached, labels):
+            return
         existing = False
         try:
             labelset_obj: LabelSet = ndb.ndb.get_labelset(
@@ -204,6 +253,79 @@ class NucliaKB:
             labelset=labelset,
             content=labelset_obj,
         )
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
+
+    @kb
+    def label_resources(
+        self,
+        *,
+        assignments: Iterable[LabelAssignment],
+        labelset_kind: Optional[LabelSetKind] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs,
+    ) -> LabelResult:
+        """
+        Add labels to many resources. The labels of each resource are merged
+        with its current classifications and written at once, and resources
+        that already have all their labels are not written.
+
+        :param assignments: `(rid or slug, labelset, label)` tuples.
+        :param labelset_kind: if set, labels are added to their labelset
+            when missing, and labelsets are created with this kind.
+        :param concurrency: maximum number of resources read, and written,
+            at once.
+        :return: counters, and the errors by resource id or slug.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        grouped = group_assignments(assignments)
+        result = LabelResult(resources=len(grouped))
+        if labelset_kind is not None:
+            for labelset, labels in labels_by_labelset(grouped).items():
+                self.add_labels(
+                    labelset=labelset,
+                    labels=labels,
+                    labelset_kind=labelset_kind,
+                    ndb=ndb,
+                )
+
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )
+        def write(item: Tuple[str, Resource]) -> bool:
+            id_or_slug, resource = item
+            usermetadata = merge_classifications(
+                resource.usermetadata, grouped[id_or_slug]
+            )
+            if usermetadata is None:
+                return False
+            self.resource.update(rid=resource.id, usermetadata=usermetadata, ndb=ndb)
+            return True
+
+        def fetched() -> Iterator[Tuple[str, Resource]]:
+            for fetch in self.resource.get_many(
+                ids_or_slugs=grouped,
+                show=["basic"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            ):
+                if fetch.error is None:
+                    yield (fetch.item, fetch.value)
+                else:
+                    result.errors[fetch.item] = fetch.error
+
+        for written in run_batch(write, fetched(), concurrency, ordered=False):
+            if written.error is not None:
+                result.errors[written.item[0]] = written.error
+            elif written.value:
+                result.labelled += 1
+            else:
+                result.unchanged += 1
+        return result
 
     @kb
     def del_label(self, *, labelset: str, label: str, **kwargs):
@@ -212,6 +334,8 @@ class NucliaKB:
         label_to_delete = next(x for x in labelset_obj.labels if x.title == label)
         labelset_obj.labels.remove(label_to_delete)
         ndb.ndb.set_labelset(kbid=ndb.kbid, labelset=labelset, content=labelset_obj)
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     def get_graph(
@@ -272,6 +396,85 @@ class NucliaKB:
     ):
         self.resource.delete(ndb=kwargs["ndb"], rid=uid, slug=slug)
 
+    @kb
+    def index_graph(
+        self,
+        index: Optional[GraphIndex] = None,
+        uid: Optional[str] = None,
+        slug: Optional[str] = None,
+        **kwargs,
+    ) -> GraphIndex:
+        """
+        Load the graph of a resource into a local index, replacing the edges
+        previously loaded from it. Loading the resource again refreshes it.
+
+        :param index: index to update. A new one is created if not given.
+        """
+        if index is None:
+            index = GraphIndex()
+        res = self.resource.get(
+            ndb=kwargs["ndb"], rid=uid, slug=slug, show=["basic", "relations"]
+        )
+        relations = res.usermetadata.relations if res.usermetadata else []
+        index.replace(res.id, relation_edges(relations or [], rid=res.id))
+        return index
+
+    @kb
+    def mirror(
+        self, *, path: str, concurrency: int = DEFAULT_CONCURRENCY, **kwargs
+    ) -> MirrorResult:
+        """
+        Download the files of every resource of the KB to `path`. Files are
+        stored by md5 in `objects/<md5[:2]>/<md5>`, and `mirror.db` maps each
+        file field to its object. On the next run, only the resources
+        modified since are fetched again, and files already stored are not
+        downloaded.
+
+        :param path: root directory of the mirror.
+        :param concurrency: maximum number of resources fetched, and of files
+            downloaded, at once.
+        :return: counters, and the errors by resource or `rid/field_id`.
+            Resources with errors are retried on the next run.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        mirror = Mirror(path)
+
+        def fetch(item: Tuple[Resource, MirrorFile]) -> Optional[int]:
+            resource, file = item
+            if mirror.is_mirrored(file):
+                return None
+            incoming = mirror.incoming_path(file)
+            self.resource.download_file(
+                resource=resource, file_id=file.field_id, output=incoming, ndb=ndb
+            )
+            return mirror.store(incoming, file)
+
+        try:
+            rids = (
+                resource.id
+                for resource in self.search.iter_catalog(
+                    query={"page_size": CATALOG_PAGE_SIZE}, ndb=ndb
+                )
+                if mirror.changed(resource)
+            )
+            fetched = self.resource.get_many(
+                ids_or_slugs=rids,
+                show=["values"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            )
+            files = (
+                (result.value, file)
+                for result in fetched
+                for file in mirror.fetched(result)
+            )
+            for result in run_batch(fetch, files, concurrency, ordered=False):
+                mirror.downloaded(result)
+            return mirror.finish()
+        finally:
+            mirror.close()
+
     @kb
     def update_configuration(
         self,
@@ -301,6 +504,7 @@ class NucliaKB:
             kbid=ndb.kbid,
             content=content,
         )
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     def get_configuration(
@@ -312,6 +516,20 @@ class NucliaKB:
             kbid=ndb.kbid,
         )
 
+    @kb
+    def configuration_snapshot(self, *, refresh: bool = False, **kwargs) -> KBConfig:
+        """
+        Labelsets, extract and split strategies, KV schemas and learning
+        configuration of the KB, fetched at once and kept in memory for
+        `KB_CONFIG_TTL_S` seconds. Changes made through the SDK drop it.
+
+        :param refresh: fetch it again, even if it did not expire.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        if refresh:
+            KB_CONFIGS.invalidate(ndb.kbid)
+        return KB_CONFIGS.get_or_load(ndb)
+
     @kb
     def summarize(
         self, *, resources: List[str], show_consumption: bool = False, **kwargs
@@ -327,8 +545,74 @@ class NucliaKB:
     def notifications(self, **kwargs) -> Iterator[Notification]:
         ndb: NucliaDBClient = kwargs["ndb"]
         response = ndb.notifications()
-        for notification in response.iter_lines():
-            yield Notification.model_validate_json(notification)
+        yield from NOTIFICATION_DECODER.iter(response.iter_lines())
+
+    @kb
+    def wait_processed(
+        self,
+        *,
+        rids: List[str],
+        timeout: Optional[float] = None,
+        until: Union[str, WaitCondition] = WaitCondition.INDEXED,
+        **kwargs,
+    ) -> Dict[str, ResourceProcessingStatus]:
+        """
+        Wait until the given resources are processed.
+
+        Resources are resolved as their notifications arrive on the KB
+        notifications stream. If the stream drops, the remaining ones are
+        checked with batched catalog requests.
+
+        :param rids: ids of the resources to wait for.
+        :param timeout: maximum number of seconds to wait.
+        :param until: `indexed` (the default) to wait until the processing
+            results are searchable, or `processed` to only wait until they
+            are stored.
+        :return: processing status of each resource. Resources that are not
+            processed before the timeout are returned as PENDING.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        waiters = ProcessingWaiters(get_list_parameter(rids), WaitCondition(until))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        lock = threading.Lock()
+        stream_ended = threading.Event()
+
+        # Subscribe before checking the current status, so no update is lost
+        response = ndb.notifications()
+
+        def listen():
+            try:
+                for line in response.iter_lines():
+                    with lock:
+                        waiters.on_line(line)
+                        if waiters.done:
+                            return
+            except Exception as exc:
+                if not waiters.done:
+                    logger.warning(f"Notifications stream dropped: {exc}")
+            finally:
+                stream_ended.set()
+
+        listener = threading.Thread(target=listen, daemon=True)
+        listener.start()
+        try:
+            _check_processing_status(ndb, waiters, lock)
+            while not waiters.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                if not stream_ended.is_set():
+                    stream_ended.wait(remaining)
+                    continue
+                time.sleep(
+                    STATUS_CHECK_INTERVAL_S
+                    if remaining is None
+                    else min(STATUS_CHECK_INTERVAL_S, remaining)
+                )
+                _check_processing_status(ndb, waiters, lock)
+        finally:
+            response.close()
+        return dict(waiters.statuses)
 
     @kb
     def copy(
@@ -520,7 +804,9 @@ class AsyncNucliaKB:
         **kwargs,
     ) -> LabelSet:
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        return await ndb.ndb.get_labelset(kbid=ndb.kbid, labelset=labelset)
+        labelset_obj = await ndb.ndb.get_labelset(kbid=ndb.kbid, labelset=labelset)
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        return labelset_obj
 
     @kb
     @deprecated(version="5.0.0", reason="You should use set_labelset")
@@ -574,17 +860,22 @@ class AsyncNucliaKB:
         await ndb.ndb.set_labelset(
             kbid=ndb.kbid, labelset=labelset, content=labelset_obj
         )
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     async def list_labelsets(self, **kwargs) -> KnowledgeBoxLabels:
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         data: KnowledgeBoxLabels = await ndb.ndb.get_labelsets(kbid=ndb.kbid)
+        LABELSETS.put_all(ndb.kbid, data)
         return data
 
     @kb
     async def del_labelset(self, *, labelset: str, **kwargs):
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         await ndb.ndb.delete_labelset(kbid=ndb.kbid, labelset=labelset)
+        LABELSETS.forget(ndb.kbid, labelset)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     async def add_label(
@@ -612,6 +903,9 @@ class AsyncNucliaKB:
         **kwargs,
     ):
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        cached = LABELSETS.get(ndb.kbid, labelset)
+        if cached is not None and has_labels(cached, labels):
+            return
         existing = False
         try:
             labelset_obj: LabelSet = await ndb.ndb.get_labelset(
@@ -642,6 +936,83 @@ class AsyncNucliaKB:
             labelset=labelset,
             content=labelset_obj,
         )
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
+
+    @kb
+    async def label_resources(
+        self,
+        *,
+        assignments: Iterable[LabelAssignment],
+        labelset_kind: Optional[LabelSetKind] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs,
+    ) -> LabelResult:
+        """
+        Add labels to many resources. The labels of each resource are merged
+        with its current classifications and written at once, and resources
+        that already have all their labels are not written.
+
+        :param assignments: `(rid or slug, labelset, label)` tuples.
+        :param labelset_kind: if set, labels are added to their labelset
+            when missing, and labelsets are created with this kind.
+        :param concurrency: maximum number of resources read, and written,
+            at once.
+        :return: counters, and the errors by resource id or slug.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        grouped = group_assignments(assignments)
+        result = LabelResult(resources=len(grouped))
+        if labelset_kind is not None:
+            for labelset, labels in labels_by_labelset(grouped).items():
+                await self.add_labels(
+                    labelset=labelset,
+                    labels=labels,
+                    labelset_kind=labelset_kind,
+                    ndb=ndb,
+                )
+
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )
+        async def write(item: Tuple[str, Resource]) -> bool:
+            id_or_slug, resource = item
+            usermetadata = merge_classifications(
+                resource.usermetadata, grouped[id_or_slug]
+            )
+            if usermetadata is None:
+                return False
+            await self.resource.update(
+                rid=resource.id, usermetadata=usermetadata, ndb=ndb
+            )
+            return True
+
+        async def fetched() -> AsyncIterator[Tuple[str, Resource]]:
+            async for fetch in self.resource.get_many(
+                ids_or_slugs=grouped,
+                show=["basic"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            ):
+                if fetch.error is None:
+                    yield (fetch.item, fetch.value)
+                else:
+                    result.errors[fetch.item] = fetch.error
+
+        async for written in async_run_batch(
+            write, fetched(), concurrency, ordered=False
+        ):
+            if written.error is not None:
+                result.errors[written.item[0]] = written.error
+            elif written.value:
+                result.labelled += 1
+            else:
+                result.unchanged += 1
+        return result
 
     @kb
     async def del_label(self, *, labelset: str, label: str, **kwargs):
@@ -654,6 +1025,8 @@ class AsyncNucliaKB:
         await ndb.ndb.set_labelset(
             kbid=ndb.kbid, labelset=labelset, content=labelset_obj
         )
+        LABELSETS.put(ndb.kbid, labelset, labelset_obj)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     async def get_graph(
@@ -714,6 +1087,86 @@ class AsyncNucliaKB:
     ):
         await self.resource.delete(ndb=kwargs["ndb"], rid=uid, slug=slug)
 
+    @kb
+    async def index_graph(
+        self,
+        index: Optional[GraphIndex] = None,
+        uid: Optional[str] = None,
+        slug: Optional[str] = None,
+        **kwargs,
+    ) -> GraphIndex:
+        """
+        Load the graph of a resource into a local index, replacing the edges
+        previously loaded from it. Loading the resource again refreshes it.
+
+        :param index: index to update. A new one is created if not given.
+        """
+        if index is None:
+            index = GraphIndex()
+        res = await self.resource.get(
+            ndb=kwargs["ndb"], rid=uid, slug=slug, show=["basic", "relations"]
+        )
+        relations = res.usermetadata.relations if res.usermetadata else []
+        index.replace(res.id, relation_edges(relations or [], rid=res.id))
+        return index
+
+    @kb
+    async def mirror(
+        self, *, path: str, concurrency: int = DEFAULT_CONCURRENCY, **kwargs
+    ) -> MirrorResult:
+        """
+        Download the files of every resource of the KB to `path`. Files are
+        stored by md5 in `objects/<md5[:2]>/<md5>`, and `mirror.db` maps each
+        file field to its object. On the next run, only the resources
+        modified since are fetched again, and files already stored are not
+        downloaded.
+
+        :param path: root directory of the mirror.
+        :param concurrency: maximum number of resources fetched, and of files
+            downloaded, at once.
+        :return: counters, and the errors by resource or `rid/field_id`.
+            Resources with errors are retried on the next run.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        mirror = Mirror(path)
+
+        async def fetch(item: Tuple[Resource, MirrorFile]) -> Optional[int]:
+            resource, file = item
+            if mirror.is_mirrored(file):
+                return None
+            incoming = mirror.incoming_path(file)
+            await self.resource.download_file(
+                resource=resource, file_id=file.field_id, output=incoming, ndb=ndb
+            )
+            return await asyncio.to_thread(mirror.store, incoming, file)
+
+        async def rids() -> AsyncIterator[str]:
+            async for resource in self.search.iter_catalog(
+                query={"page_size": CATALOG_PAGE_SIZE}, ndb=ndb
+            ):
+                if mirror.changed(resource):
+                    yield resource.id
+
+        async def files() -> AsyncIterator[Tuple[Resource, MirrorFile]]:
+            async for result in self.resource.get_many(
+                ids_or_slugs=rids(),
+                show=["values"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            ):
+                for file in mirror.fetched(result):
+                    yield result.value, file
+
+        try:
+            async for result in async_run_batch(
+                fetch, files(), concurrency, ordered=False
+            ):
+                mirror.downloaded(result)
+            return mirror.finish()
+        finally:
+            mirror.close()
+
     @kb
     async def update_configuration(
         self,
@@ -743,6 +1196,7 @@ class AsyncNucliaKB:
             kbid=ndb.kbid,
             content=content,
         )
+        KB_CONFIGS.invalidate(ndb.kbid)
 
     @kb
     async def get_configuration(
@@ -754,6 +1208,22 @@ class AsyncNucliaKB:
             kbid=ndb.kbid,
         )
 
+    @kb
+    async def configuration_snapshot(
+        self, *, refresh: bool = False, **kwargs
+    ) -> KBConfig:
+        """
+        Labelsets, extract and split strategies, KV schemas and learning
+        configuration of the KB, fetched at once and kept in memory for
+        `KB_CONFIG_TTL_S` seconds. Changes made through the SDK drop it.
+
+        :param refresh: fetch it again, even if it did not expire.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        if refresh:
+            KB_CONFIGS.invalidate(ndb.kbid)
+        return await KB_CONFIGS.aget_or_load(ndb)
+
     @kb
     async def summarize(
         self,
@@ -781,8 +1251,84 @@ class AsyncNucliaKB:
     async def notifications(self, **kwargs) -> AsyncIterator[Notification]:
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         response = await ndb.notifications()
-        async for notification in response.aiter_lines():
-            yield Notification.model_validate_json(notification)
+        async for notification in NOTIFICATION_DECODER.aiter(response.aiter_lines()):
+            yield notification
+
+    @kb
+    async def notifications_service(
+        self, *, max_tries: Optional[int] = None, **kwargs
+    ) -> NotificationsService:
+        """
+        Notifications consumer that reconnects when the stream drops and fans
+        notifications out to several subscribers.
+
+        :param max_tries: maximum consecutive failed connections before giving
+            up. By default, it retries forever.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        return NotificationsService(ndb.notifications, max_tries=max_tries)
+
+    @kb
+    async def wait_processed(
+        self,
+        *,
+        rids: List[str],
+        timeout: Optional[float] = None,
+        until: Union[str, WaitCondition] = WaitCondition.INDEXED,
+        **kwargs,
+    ) -> Dict[str, ResourceProcessingStatus]:
+        """
+        Wait until the given resources are processed.
+
+        Resources are resolved as their notifications arrive on the KB
+        notifications stream. If the stream drops, the remaining ones are
+        checked with batched catalog requests.
+
+        :param rids: ids of the resources to wait for.
+        :param timeout: maximum number of seconds to wait.
+        :param until: `indexed` (the default) to wait until the processing
+            results are searchable, or `processed` to only wait until they
+            are stored.
+        :return: processing status of each resource. Resources that are not
+            processed before the timeout are returned as PENDING.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        waiters = ProcessingWaiters(get_list_parameter(rids), WaitCondition(until))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        # Subscribe before checking the current status, so no update is lost
+        response = await ndb.notifications()
+
+        async def listen():
+            try:
+                async for line in response.aiter_lines():
+                    waiters.on_line(line)
+                    if waiters.done:
+                        return
+            except Exception as exc:
+                if not waiters.done:
+                    logger.warning(f"Notifications stream dropped: {exc}")
+
+        listener = asyncio.create_task(listen())
+        try:
+            await _async_check_processing_status(ndb, waiters)
+            while not waiters.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                if not listener.done():
+                    await asyncio.wait([listener], timeout=remaining)
+                    continue
+                await asyncio.sleep(
+                    STATUS_CHECK_INTERVAL_S
+                    if remaining is None
+                    else min(STATUS_CHECK_INTERVAL_S, remaining)
+                )
+                await _async_check_processing_status(ndb, waiters)
+        finally:
+            listener.cancel()
+            await response.aclose()
+        return dict(waiters.statuses)
 
     @kb
     async def copy(
@@ -915,3 +1461,22 @@ class AsyncNucliaKB:
                 logger.info(f"Resource {res.id} already exists in destination KB")
         if not is_last:
             await self.copy_all(destination=destination, page=page + 1, **kwargs)
+
+
+def _check_processing_status(
+    ndb: NucliaDBClient, waiters: ProcessingWaiters, lock: threading.Lock
+):
+    with lock:
+        requests = waiters.status_requests()
+    for request in requests:
+        response = ndb.ndb.catalog(request, kbid=ndb.kbid)
+        with lock:
+            waiters.on_status_response(response)
+
+
+async def _async_check_processing_status(
+    ndb: AsyncNucliaDBClient, waiters: ProcessingWaiters
+):
+    for request in waiters.status_requests():
+        response = await ndb.ndb.catalog(request, kbid=ndb.kbid)
+        waiters.on_status_response(response)
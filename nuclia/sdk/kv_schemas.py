@@ -3,6 +3,7 @@ from nucliadb_models.kv_schemas import KBKVSchemas, KVSchema, UpdateKVSchema
 from nuclia.data import get_async_auth, get_auth
 from nuclia.decorators import kb
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.kb_config import KB_CONFIGS
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
 
 
@@ -39,7 +40,9 @@ class NucliaKVSchemas:
         if isinstance(schema, dict):
             schema = KVSchema.model_validate(schema)
         ndb: NucliaDBClient = kwargs["ndb"]
-        return ndb.ndb.create_kv_schema(kbid=ndb.kbid, content=schema)
+        created = ndb.ndb.create_kv_schema(kbid=ndb.kbid, content=schema)
+        KB_CONFIGS.invalidate(ndb.kbid)
+        return created
 
     @kb
     def update(
@@ -54,9 +57,11 @@ class NucliaKVSchemas:
         if isinstance(schema, dict):
             schema = UpdateKVSchema.model_validate(schema)
         ndb: NucliaDBClient = kwargs["ndb"]
-        return ndb.ndb.update_kv_schema(
+        updated = ndb.ndb.update_kv_schema(
             kbid=ndb.kbid, schema_id=schema_id, content=schema
         )
+        KB_CONFIGS.invalidate(ndb.kbid)
+        return updated
 
     @kb
     def delete(self, *args, schema_id: str, **kwargs):
@@ -67,6 +72,7 @@ class NucliaKVSchemas:
         """
         ndb: NucliaDBClient = kwargs["ndb"]
         ndb.ndb.delete_kv_schema(kbid=ndb.kbid, schema_id=schema_id)
+        KB_CONFIGS.invalidate(ndb.kbid)
 
 
 class AsyncNucliaKVSchemas:
@@ -102,7 +108,9 @@ class AsyncNucliaKVSchemas:
         if isinstance(schema, dict):
             schema = KVSchema.model_validate(schema)
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        return await ndb.ndb.create_kv_schema(kbid=ndb.kbid, content=schema)
+        created = await ndb.ndb.create_kv_schema(kbid=ndb.kbid, content=schema)
+        KB_CONFIGS.invalidate(ndb.kbid)
+        return created
 
     @kb
     async def update(
@@ -117,9 +125,11 @@ class AsyncNucliaKVSchemas:
         if isinstance(schema, dict):
             schema = UpdateKVSchema.model_validate(schema)
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        return await ndb.ndb.update_kv_schema(
+        updated = await ndb.ndb.update_kv_schema(
             kbid=ndb.kbid, schema_id=schema_id, content=schema
         )
+        KB_CONFIGS.invalidate(ndb.kbid)
+        return updated
 
     @kb
     async def delete(self, *args, schema_id: str, **kwargs):
@@ -130,3 +140,4 @@ class AsyncNucliaKVSchemas:
         """
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         await ndb.ndb.delete_kv_schema(kbid=ndb.kbid, schema_id=schema_id)
+        KB_CONFIGS.invalidate(ndb.kbid)
@@ -20,10 +20,13 @@ from nuclia.lib.models import (
     ActivityLogsQueryResponse,
     DownloadRequestOutput,
 )
+from nuclia.lib.ndjson import NDJSONDecoder
 from nuclia.sdk.logger import logger
 
 WAIT_FOR_DOWNLOAD_TIMEOUT = 120
 
+ACTIVITY_LOG_DECODER = NDJSONDecoder(ActivityLogsQueryResponse)
+
 
 class NucliaLogs:
     @kb
@@ -64,8 +67,7 @@ class NucliaLogs:
         ndb: NucliaDBClient = kwargs["ndb"]
         response = ndb.logs_query(type=_type, query=_query)
         output: list[ActivityLogsQueryResponse] = []  # type: ignore
-        for line in response.iter_lines():
-            output.append(ActivityLogsQueryResponse.model_validate_json(line))
+        output.extend(ACTIVITY_LOG_DECODER.iter(response.iter_lines()))
         return ActivityLogsOutput(
             data=output, has_more=response.headers["has-more"].lower() == "true"
         )
@@ -190,8 +192,7 @@ class AsyncNucliaLogs:
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
         response = await ndb.logs_query(type=_type, query=_query)
         output: list[ActivityLogsQueryResponse] = []  # type: ignore
-        for line in response.iter_lines():
-            output.append(ActivityLogsQueryResponse.model_validate_json(line))
+        output.extend(ACTIVITY_LOG_DECODER.iter(response.iter_lines()))
         return ActivityLogsOutput(
             data=output, has_more=response.headers["has-more"].lower() == "true"
         )
@@ -44,6 +44,12 @@ from nucliadb_models.search import (
 from nucliadb_sdk.v2.exceptions import NotFoundError
 
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.pagination import (
+    async_prefetch_pages,
+    next_catalog_page,
+    prefetch_pages,
+)
+from nuclia.lib.slugs import SLUG_CACHE
 from nuclia.sdk.memory.models import (
     AskResult,
     EntryContent,
@@ -775,13 +781,20 @@ def _ensure_global_entries_resource(
 
 def _ensure_global_entries_resource_sync(ndb: NucliaDBClient, user_id: str) -> str:
     slug = _global_entries_slug(user_id)
-    if not ndb.ndb.exists_resource_by_slug(kbid=ndb.kbid, slug=slug):
-        ndb.ndb.create_resource(
+    if SLUG_CACHE.rid(ndb.kbid, slug) is not None:
+        return slug
+    try:
+        resource = ndb.ndb.get_resource_by_slug(kbid=ndb.kbid, slug=slug)
+        rid = resource.id
+    except NotFoundError:
+        created = ndb.ndb.create_resource(
             kbid=ndb.kbid,
             content=CreateResourcePayload(
                 title=f"Memory global entries - {user_id}", slug=slug
             ),
         )
+        rid = created.uuid
+    SLUG_CACHE.put(ndb.kbid, rid, slug)
     return slug
 
 
@@ -789,13 +802,20 @@ async def _ensure_global_entries_resource_async(
     ndb: AsyncNucliaDBClient, user_id: str
 ) -> str:
     slug = _global_entries_slug(user_id)
-    if not await ndb.ndb.exists_resource_by_slug(kbid=ndb.kbid, slug=slug):
-        await ndb.ndb.create_resource(
+    if SLUG_CACHE.rid(ndb.kbid, slug) is not None:
+        return slug
+    try:
+        resource = await ndb.ndb.get_resource_by_slug(kbid=ndb.kbid, slug=slug)
+        rid = resource.id
+    except NotFoundError:
+        created = await ndb.ndb.create_resource(
             kbid=ndb.kbid,
             content=CreateResourcePayload(
                 title=f"Memory global entries - {user_id}", slug=slug
             ),
         )
+        rid = created.uuid
+    SLUG_CACHE.put(ndb.kbid, rid, slug)
     return slug
 
 
@@ -950,63 +970,57 @@ def _get_global_users(
     return _get_global_users_sync(ndb=ndb)
 
 
-def _get_global_users_sync(ndb: NucliaDBClient) -> list[str]:
+def _global_users_request() -> CatalogRequest:
+    return CatalogRequest(
+        query=CatalogQuery(
+            field=CatalogQueryField.Slug,
+            match=CatalogQueryMatch.StartsWith,
+            query=GLOBAL_ANNOTATIONS_RESOURCE_SLUG_PREFIX + "-",
+        ),
+        page_size=200,
+        show=[ResourceProperties.BASIC],
+    )
+
+
+def _global_user_id(resource: Resource) -> str | None:
     prefix = GLOBAL_ANNOTATIONS_RESOURCE_SLUG_PREFIX + "-"
-    page, user_ids = 0, []
-    while True:
-        catalog_response = ndb.ndb.catalog(
+    slug = resource.slug or ""
+    return slug[len(prefix) :] if slug.startswith(prefix) else None
+
+
+def _get_global_users_sync(ndb: NucliaDBClient) -> list[str]:
+    request = _global_users_request()
+
+    def fetch(page_number: int):
+        return ndb.ndb.catalog(
             kbid=ndb.kbid,
-            content=CatalogRequest(
-                query=CatalogQuery(
-                    field=CatalogQueryField.Slug,
-                    match=CatalogQueryMatch.StartsWith,
-                    query=prefix,
-                ),
-                page_number=page,
-                page_size=200,
-                show=[ResourceProperties.BASIC],
-            ),
-        )
-        for resource in catalog_response.resources.values():
-            slug = resource.slug or ""
-            if slug.startswith(prefix):
-                user_ids.append(slug[len(prefix) :])
-        has_more = (
-            catalog_response.fulltext.next_page if catalog_response.fulltext else False
+            content=request.model_copy(update={"page_number": page_number}),
         )
-        if not has_more:
-            break
-        page += 1
+
+    user_ids = []
+    for page in prefetch_pages(fetch, 0, next_catalog_page):
+        for resource in page.resources.values():
+            user_id = _global_user_id(resource)
+            if user_id is not None:
+                user_ids.append(user_id)
     return user_ids
 
 
 async def _get_global_users_async(ndb: AsyncNucliaDBClient) -> list[str]:
-    prefix = GLOBAL_ANNOTATIONS_RESOURCE_SLUG_PREFIX + "-"
-    page, user_ids = 0, []
-    while True:
-        catalog_response = await ndb.ndb.catalog(
+    request = _global_users_request()
+
+    def fetch(page_number: int):
+        return ndb.ndb.catalog(
             kbid=ndb.kbid,
-            content=CatalogRequest(
-                query=CatalogQuery(
-                    field=CatalogQueryField.Slug,
-                    match=CatalogQueryMatch.StartsWith,
-                    query=prefix,
-                ),
-                page_number=page,
-                page_size=200,
-                show=[ResourceProperties.BASIC],
-            ),
+            content=request.model_copy(update={"page_number": page_number}),
         )
-        for resource in catalog_response.resources.values():
-            slug = resource.slug or ""
-            if slug.startswith(prefix):
-                user_ids.append(slug[len(prefix) :])
-        has_more = (
-            catalog_response.fulltext.next_page if catalog_response.fulltext else False
-        )
-        if not has_more:
-            break
-        page += 1
+
+    user_ids = []
+    async for page in async_prefetch_pages(fetch, 0, next_catalog_page):
+        for resource in page.resources.values():
+            user_id = _global_user_id(resource)
+            if user_id is not None:
+                user_ids.append(user_id)
     return user_ids
 
 
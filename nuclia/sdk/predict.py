@@ -8,6 +8,7 @@ from nuclia_models.predict.remi import RemiRequest, RemiResponse
 
 from nuclia.data import get_auth
 from nuclia.decorators import nua
+from nuclia.lib.kb_config import KB_CONFIGS
 from nuclia.lib.nua import (
     AsyncNuaClient,
     ContextItem,
@@ -52,11 +53,13 @@ class NucliaPredict:
     def set_config(self, kbid: str, config: LearningConfigurationCreation, **kwargs):
         nc: NuaClient = kwargs["nc"]
         nc.add_config_predict(kbid, config)
+        KB_CONFIGS.invalidate(kbid)
 
     @nua
     def del_config(self, kbid: str, **kwargs):
         nc: NuaClient = kwargs["nc"]
         nc.del_config_predict(kbid)
+        KB_CONFIGS.invalidate(kbid)
 
     @nua
     def sentence(
@@ -288,11 +291,13 @@ class AsyncNucliaPredict:
     ):
         nc: AsyncNuaClient = kwargs["nc"]
         await nc.add_config_predict(kbid, config)
+        KB_CONFIGS.invalidate(kbid)
 
     @nua
     async def del_config(self, kbid: str, **kwargs):
         nc: AsyncNuaClient = kwargs["nc"]
         await nc.del_config_predict(kbid)
+        KB_CONFIGS.invalidate(kbid)
 
     @nua
     async def sentence(
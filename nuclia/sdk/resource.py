@@ -1,15 +1,30 @@
 import json
 import os
-from typing import Any, Dict, List, Optional, Union
+import re
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 from uuid import uuid4
 
 import backoff
-import requests
+from nucliadb_models.common import CloudLink
 from nucliadb_models.metadata import ResourceProcessingStatus
 from nucliadb_models.resource import Resource
 from nucliadb_models.search import (
     AskRequest,
+    CatalogRequest,
     Filter,
     RagImagesStrategies,
     RagStrategies,
@@ -21,9 +36,34 @@ from nuclia import get_list_parameter, get_regional_url
 from nuclia.data import get_async_auth, get_auth
 from nuclia.decorators import kb, pretty
 from nuclia.exceptions import RateLimitError
+from nuclia.lib.batch import (
+    DEFAULT_CONCURRENCY,
+    BatchResult,
+    async_run_batch,
+    run_batch,
+)
+from nuclia.lib.bulk import (
+    BulkResult,
+    BulkRun,
+    async_iter_rids,
+    bulk_request,
+    iter_rids,
+)
+from nuclia.lib.diff import DIFF_SHOW, resource_changes
+from nuclia.lib.download import async_download, download
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.slugs import SLUG_CACHE
+from nuclia.lib.tokens import EPHEMERAL_TOKENS
+from nuclia.lib.views import ResourceView
 from nuclia.sdk.logger import logger
 
+# Resource ids are uuid4 hex strings
+RID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Rate limited calls of batch operations are retried
+RATE_LIMIT_ERRORS = (exceptions.RateLimitError, RateLimitError)
+RATE_LIMIT_MAX_TRIES = 5
+
 RESOURCE_ATTRIBUTES = [
     "icon",
     "origin",
@@ -42,6 +82,22 @@ RESOURCE_ATTRIBUTES = [
 ]
 
 
+def _resource_attributes(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {param: kwargs[param] for param in RESOURCE_ATTRIBUTES if param in kwargs}
+
+
+def _diff_update(
+    res: Resource, kw: Dict[str, Any], rid: Optional[str], slug: Optional[str]
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Changes of an update of `res`, and the slug it is renamed to, if any"""
+    changes = resource_changes(res, kw)
+    if rid and slug == res.slug:
+        slug = None
+    if (changes or (rid and slug)) and "wait_for_commit" in kw:
+        changes["wait_for_commit"] = kw["wait_for_commit"]
+    return changes, slug
+
+
 def _ndb_origin_url(ndb: Union[NucliaDBClient, AsyncNucliaDBClient]) -> Optional[str]:
     if ndb.url is None:
         return None
@@ -51,6 +107,54 @@ def _ndb_origin_url(ndb: Union[NucliaDBClient, AsyncNucliaDBClient]) -> Optional
     return None
 
 
+def _download_link(res: Resource, file_id: str) -> CloudLink:
+    if res.data is None or res.data.files is None:
+        raise ValueError("Resource has no file data")
+    file_field = res.data.files.get(file_id)
+    if not file_field:
+        raise ValueError(f"File with id {file_id} not found in resource")
+    if (
+        file_field.value is None
+        or file_field.value.file is None
+        or file_field.value.file.uri is None
+    ):
+        raise ValueError(f"File field {file_id} has no download URI")
+    return file_field.value.file
+
+
+def _signed_urls(
+    ndb: Union[NucliaDBClient, AsyncNucliaDBClient],
+    files: List[Tuple[str, str]],
+    resources: Dict[str, BatchResult[str, Resource]],
+    token: str,
+) -> List[BatchResult[Tuple[str, str], str]]:
+    """URLs of `files`, signed with an ephemeral token"""
+    results: List[BatchResult[Tuple[str, str], str]] = []
+    for index, (id_or_slug, file_id) in enumerate(files):
+        result: BatchResult[Tuple[str, str], str] = BatchResult(
+            index=index, item=(id_or_slug, file_id)
+        )
+        fetched = resources[id_or_slug]
+        if fetched.value is None:
+            result.error = fetched.error
+        else:
+            try:
+                url = _download_url(ndb, _download_link(fetched.value, file_id))
+                result.value = f"{url}?eph-token={token}"
+            except ValueError as exc:
+                result.error = exc
+        results.append(result)
+    return results
+
+
+def _download_url(
+    ndb: Union[NucliaDBClient, AsyncNucliaDBClient], file: CloudLink
+) -> str:
+    return get_regional_url(
+        ndb.region, "/api/v1" + (file.uri or ""), origin_url=_ndb_origin_url(ndb)
+    )
+
+
 class RagStrategiesParse(BaseModel):
     rag_strategies: list[RagStrategies] = Field(default=[])
 
@@ -92,6 +196,7 @@ class NucliaResource:
             )
             raise RateLimitError() from exc
         rid = resource.uuid
+        SLUG_CACHE.put(ndb.kbid, rid, slug)
         return rid
 
     @kb
@@ -171,7 +276,9 @@ class NucliaResource:
         **kwargs,
     ) -> bool:
         ndb: NucliaDBClient = kwargs["ndb"]
-        url = _resource_head_url(kbid=ndb.kbid, rid=rid, slug=slug)
+        if rid is None and slug and SLUG_CACHE.rid(ndb.kbid, slug) is not None:
+            return True
+        url = _resource_url(kbid=ndb.kbid, rid=rid, slug=slug)
         resp = ndb.ndb.session.head(url)
         if resp.status_code == 404:
             return False
@@ -187,8 +294,16 @@ class NucliaResource:
         slug: Optional[str] = None,
         show: Optional[List[str]] = None,
         extracted: Optional[List[str]] = None,
+        raw: bool = False,
         **kwargs,
-    ) -> Resource:
+    ) -> Union[Resource, ResourceView]:
+        """
+        Get a resource.
+
+        :param raw: return a `ResourceView`, parsed lazily, instead of
+            validating the whole `Resource`. Much cheaper for large
+            resources of which only a part is read.
+        """
         show = show or ["basic"]
         extracted = extracted or []
         ndb: NucliaDBClient = kwargs["ndb"]
@@ -196,32 +311,96 @@ class NucliaResource:
         extracted = get_list_parameter(extracted)
         if "basic" not in show:
             show.append("basic")
+        query_params = {"show": show, "extracted": extracted}
+        res: Union[Resource, ResourceView]
         if rid:
-            res = ndb.ndb.get_resource_by_id(
-                kbid=ndb.kbid,
-                rid=rid,
-                query_params={"show": show, "extracted": extracted},
-            )
+            if raw:
+                res = _get_view(ndb, query_params, rid=rid)
+            else:
+                res = ndb.ndb.get_resource_by_id(
+                    kbid=ndb.kbid, rid=rid, query_params=query_params
+                )
         elif slug:
-            res = ndb.ndb.get_resource_by_slug(
-                kbid=ndb.kbid,
-                slug=slug,
-                query_params={"show": show, "extracted": extracted},
-            )
+            try:
+                if raw:
+                    res = _get_view(ndb, query_params, slug=slug)
+                else:
+                    res = ndb.ndb.get_resource_by_slug(
+                        kbid=ndb.kbid, slug=slug, query_params=query_params
+                    )
+            except exceptions.NotFoundError:
+                SLUG_CACHE.forget(ndb.kbid, slug=slug)
+                raise
         else:
             raise ValueError("Either rid or slug must be provided")
+        if not raw:
+            # Views are not parsed just to fill the cache
+            SLUG_CACHE.put_resource(ndb.kbid, res)
 
-        if (
-            "extracted" in show
-            and res.metadata is not None
-            and res.metadata.status != ResourceProcessingStatus.PROCESSED
-        ):
+        if "extracted" in show and _not_processed(res):
             logger.warning(
                 "Resource is not processed yet, extracted content may be empty or incomplete."
             )
 
         return res
 
+    @kb
+    def get_many(
+        self,
+        *,
+        ids_or_slugs: Iterable[str],
+        show: Optional[List[str]] = None,
+        extracted: Optional[List[str]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        raw: bool = False,
+        **kwargs,
+    ) -> Iterator[BatchResult[str, Union[Resource, ResourceView]]]:
+        """
+        Fetch many resources concurrently, sharing one client. Resources are
+        yielded as they are fetched, and at most `concurrency` of them are
+        held at once, so any number of resources can be read with bounded
+        memory.
+
+        :param ids_or_slugs: ids or slugs of the resources. Values that look
+            like an id are fetched by id, then by slug if there is no such id.
+        :param show: as in `get`.
+        :param extracted: as in `get`.
+        :param concurrency: maximum number of fetches in flight.
+        :param ordered: yield resources in the order of `ids_or_slugs`.
+            Otherwise, they are yielded as soon as they are fetched.
+        :param raw: yield lazily parsed `ResourceView`s, as in `get`.
+        :return: one result per resource. Resources that do not exist have
+            `error` set to `NotFoundError`.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )
+        def get(id_or_slug: str) -> Union[Resource, ResourceView]:
+            if RID_PATTERN.match(id_or_slug):
+                try:
+                    return self.get(
+                        rid=id_or_slug,
+                        show=show,
+                        extracted=extracted,
+                        raw=raw,
+                        ndb=ndb,
+                    )
+                except exceptions.NotFoundError:
+                    pass
+            return self.get(
+                slug=id_or_slug, show=show, extracted=extracted, raw=raw, ndb=ndb
+            )
+
+        yield from run_batch(
+            get, ids_or_slugs, concurrency=concurrency, ordered=ordered
+        )
+
     @kb
     def download_file(
         self,
@@ -230,10 +409,25 @@ class NucliaResource:
         slug: Optional[str] = None,
         file_id: str,
         output: str,
+        resource: Optional[Resource] = None,
+        segments: int = 1,
         **kwargs,
     ):
+        """
+        Download the file of a file field to `output`. It is written to
+        `output.part` first, and an interrupted download is resumed where it
+        stopped. The file is checked against the size and md5 stored in the
+        resource, when known.
+
+        :param resource: the resource, fetched with `show=["values"]`, to
+            skip fetching it again.
+        :param segments: split large files in this many ranges, downloaded
+            concurrently.
+        """
         ndb: NucliaDBClient = kwargs["ndb"]
-        if rid:
+        if resource is not None:
+            res = resource
+        elif rid:
             res = ndb.ndb.get_resource_by_id(
                 kbid=ndb.kbid, rid=rid, query_params={"show": ["values"]}
             )
@@ -243,29 +437,18 @@ class NucliaResource:
             )
         else:
             raise ValueError("Either rid or slug must be provided")
-        if res.data is None or res.data.files is None:
-            raise ValueError("Resource has no file data")
-        file_field = res.data.files.get(file_id)
-        if not file_field:
-            raise ValueError(f"File with id {file_id} not found in resource")
-        if (
-            file_field.value is None
-            or file_field.value.file is None
-            or file_field.value.file.uri is None
-        ):
-            raise ValueError(f"File field {file_id} has no download URI")
-        url = get_regional_url(
-            ndb.region,
-            "/api/v1" + file_field.value.file.uri,
-            origin_url=_ndb_origin_url(ndb),
+        if ndb.stream_session is None:
+            raise ValueError("KB not configured")
+        file = _download_link(res, file_id)
+        download(
+            ndb.stream_session,
+            _download_url(ndb, file),
+            output,
+            headers=ndb.headers,
+            size=file.size,
+            md5=file.md5,
+            segments=segments,
         )
-        download = requests.get(url, stream=True, headers=ndb.headers)
-        if download.status_code != 200:
-            raise ValueError(f"Error downloading file: {download.text}")
-        with open(output, "wb") as f:
-            for chunk in download.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
 
     @kb
     def temporal_download_url(
@@ -288,29 +471,76 @@ class NucliaResource:
             )
         else:
             raise ValueError("Either rid or slug must be provided")
-        file_field = res.data.files.get(file_id)
-        if not file_field:
-            raise ValueError(f"File with id {file_id} not found in resource")
-        url = get_regional_url(
-            ndb.region,
-            "/api/v1" + file_field.value.file.uri,
-            origin_url=_ndb_origin_url(ndb),
+        url = _download_url(ndb, _download_link(res, file_id))
+        token = EPHEMERAL_TOKENS.get_or_create(
+            ndb.kbid, ttl, get_auth().create_ephemeral_token
         )
-        auth = get_auth()
-        token = auth.create_ephemeral_token(ndb.kbid, ttl=ttl)
-        return f"{url}?eph-token={token.token}"
+        return f"{url}?eph-token={token}"
+
+    @kb
+    def temporal_download_urls(
+        self,
+        *,
+        files: Iterable[Tuple[str, str]],
+        ttl: int = 10,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs,
+    ) -> List[BatchResult[Tuple[str, str], str]]:
+        """
+        Temporal download URLs of many files. Each resource is fetched once,
+        concurrently, and all the URLs share the same ephemeral token.
+
+        :param files: `(rid or slug, file_id)` pairs.
+        :param ttl: as in `temporal_download_url`.
+        :param concurrency: maximum number of resources fetched at once.
+        :return: one result per file, in the order of `files`, with the URL
+            or the error.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        files = list(files)
+        token = EPHEMERAL_TOKENS.get_or_create(
+            ndb.kbid, ttl, get_auth().create_ephemeral_token
+        )
+        resources = {
+            result.item: result
+            for result in self.get_many(
+                ids_or_slugs=dict.fromkeys(id_or_slug for id_or_slug, _ in files),
+                show=["values"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            )
+        }
+        return _signed_urls(ndb, files, resources, token)
 
     @kb
     def update(
-        self, *, rid: Optional[str] = None, slug: Optional[str] = None, **kwargs
+        self,
+        *,
+        rid: Optional[str] = None,
+        slug: Optional[str] = None,
+        diff: bool = False,
+        resource: Optional[Resource] = None,
+        **kwargs,
     ):
+        """
+        Update a resource.
+
+        :param diff: only send the fields and metadata that differ from the
+            current resource, and do not call the KB if nothing changed.
+        :param resource: current resource to diff against, fetched with
+            `show=DIFF_SHOW`. It is fetched if not provided.
+        """
         ndb: NucliaDBClient = kwargs["ndb"]
-        kw = {
-            "kbid": ndb.kbid,
-        }
-        for param in RESOURCE_ATTRIBUTES:
-            if param in kwargs:
-                kw[param] = kwargs.get(param)  # type: ignore
+        kw = _resource_attributes(kwargs)
+        if diff:
+            if resource is None:
+                resource = self.get(rid=rid, slug=slug, show=DIFF_SHOW, ndb=ndb)
+            kw, slug = _diff_update(resource, kw, rid, slug)
+            if not kw and not (rid and slug):
+                logger.info("Resource is up to date, no update sent")
+                return
+        kw["kbid"] = ndb.kbid
         if rid:
             kw["rid"] = rid
             if slug:
@@ -352,6 +582,128 @@ class NucliaResource:
             ndb.ndb.delete_resource_by_slug(kbid=ndb.kbid, rslug=slug)
         else:
             raise ValueError("Either rid or slug must be provided")
+        SLUG_CACHE.forget(ndb.kbid, rid=rid, slug=slug)
+
+    @kb
+    def delete_many(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        all: bool = False,
+        dry_run: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint: Optional[str] = None,
+        progress: bool = True,
+        **kwargs,
+    ) -> BulkResult:
+        """
+        Delete all the resources matching a catalog query, with at most
+        `concurrency` requests in flight. Rate limited requests are retried.
+
+        :param query: catalog query, as accepted by `search.catalog`, to
+            select resources by labels, dates or slug prefix.
+        :param filters: as in `search.catalog`.
+        :param all: apply to every resource of the KB. Required when
+            neither `query` nor `filters` select resources.
+        :param dry_run: only count the matching resources.
+        :param checkpoint: path of a file recording the progress. If the
+            operation is interrupted, running it again with the same
+            checkpoint resumes it. The file is removed once every resource
+            is done.
+        :param progress: show a progress bar.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+
+        def delete(rid: str):
+            try:
+                self.delete(rid=rid, ndb=ndb)
+            except exceptions.NotFoundError:
+                # Deleted by an interrupted run
+                pass
+
+        return self._bulk(
+            "delete",
+            delete,
+            bulk_request(query, filters, all=all),
+            dry_run,
+            concurrency,
+            checkpoint,
+            progress,
+            ndb,
+        )
+
+    @kb
+    def reprocess_many(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        all: bool = False,
+        dry_run: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint: Optional[str] = None,
+        progress: bool = True,
+        **kwargs,
+    ) -> BulkResult:
+        """
+        Reprocess all the resources matching a catalog query, with at most
+        `concurrency` requests in flight. Rate limited requests are retried.
+
+        :param query: catalog query, as accepted by `search.catalog`, to
+            select resources by labels, dates or slug prefix.
+        :param filters: as in `search.catalog`.
+        :param all: apply to every resource of the KB. Required when
+            neither `query` nor `filters` select resources.
+        :param dry_run: only count the matching resources.
+        :param checkpoint: path of a file recording the progress. If the
+            operation is interrupted, running it again with the same
+            checkpoint resumes it. The file is removed once every resource
+            is done.
+        :param progress: show a progress bar.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        return self._bulk(
+            "reprocess",
+            lambda rid: self.send_to_process(rid=rid, ndb=ndb),
+            bulk_request(query, filters, all=all),
+            dry_run,
+            concurrency,
+            checkpoint,
+            progress,
+            ndb,
+        )
+
+    def _bulk(
+        self,
+        operation: str,
+        func: Callable[[str], Any],
+        req: CatalogRequest,
+        dry_run: bool,
+        concurrency: int,
+        checkpoint: Optional[str],
+        progress: bool,
+        ndb: NucliaDBClient,
+    ) -> BulkResult:
+        run = BulkRun(operation, checkpoint, progress=progress, dry_run=dry_run)
+        retried = backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )(func)
+        try:
+            pending = run.resume()
+            if pending is None:
+                # Resources are listed before any is processed, as deleting
+                # them would shift the catalog pages
+                pending = run.start(list(iter_rids(ndb, req)))
+            if not dry_run:
+                for result in run_batch(retried, pending, concurrency, ordered=False):
+                    run.record(result)
+            return run.complete()
+        finally:
+            run.close()
 
     @kb
     def delete_field(
@@ -396,6 +748,7 @@ class AsyncNucliaResource:
                 kw[param] = kwargs.get(param)
         resource = await ndb.ndb.create_resource(**kw)
         rid = resource.uuid
+        SLUG_CACHE.put(ndb.kbid, rid, slug)
         return rid
 
     @kb
@@ -407,7 +760,9 @@ class AsyncNucliaResource:
         **kwargs,
     ) -> bool:
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        url = _resource_head_url(kbid=ndb.kbid, rid=rid, slug=slug)
+        if rid is None and slug and SLUG_CACHE.rid(ndb.kbid, slug) is not None:
+            return True
+        url = _resource_url(kbid=ndb.kbid, rid=rid, slug=slug)
         resp = await ndb.ndb.session.head(url)
         if resp.status_code == 404:
             return False
@@ -423,8 +778,16 @@ class AsyncNucliaResource:
         slug: Optional[str] = None,
         show: Optional[List[str]] = None,
         extracted: Optional[List[str]] = None,
+        raw: bool = False,
         **kwargs,
-    ) -> Resource:
+    ) -> Union[Resource, ResourceView]:
+        """
+        Get a resource.
+
+        :param raw: return a `ResourceView`, parsed lazily, instead of
+            validating the whole `Resource`. Much cheaper for large
+            resources of which only a part is read.
+        """
         show = show or ["basic"]
         extracted = extracted or []
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
@@ -432,32 +795,98 @@ class AsyncNucliaResource:
         extracted = get_list_parameter(extracted)
         if "basic" not in show:
             show.append("basic")
+        query_params = {"show": show, "extracted": extracted}
+        res: Union[Resource, ResourceView]
         if rid:
-            res = await ndb.ndb.get_resource_by_id(
-                kbid=ndb.kbid,
-                rid=rid,
-                query_params={"show": show, "extracted": extracted},
-            )
+            if raw:
+                res = await _async_get_view(ndb, query_params, rid=rid)
+            else:
+                res = await ndb.ndb.get_resource_by_id(
+                    kbid=ndb.kbid, rid=rid, query_params=query_params
+                )
         elif slug:
-            res = await ndb.ndb.get_resource_by_slug(
-                kbid=ndb.kbid,
-                slug=slug,
-                query_params={"show": show, "extracted": extracted},
-            )
+            try:
+                if raw:
+                    res = await _async_get_view(ndb, query_params, slug=slug)
+                else:
+                    res = await ndb.ndb.get_resource_by_slug(
+                        kbid=ndb.kbid, slug=slug, query_params=query_params
+                    )
+            except exceptions.NotFoundError:
+                SLUG_CACHE.forget(ndb.kbid, slug=slug)
+                raise
         else:
             raise ValueError("Either rid or slug must be provided")
+        if not raw:
+            # Views are not parsed just to fill the cache
+            SLUG_CACHE.put_resource(ndb.kbid, res)
 
-        if (
-            "extracted" in show
-            and res.metadata is not None
-            and res.metadata.status != ResourceProcessingStatus.PROCESSED
-        ):
+        if "extracted" in show and _not_processed(res):
             logger.warning(
                 "Resource is not processed yet, extracted content may be empty or incomplete."
             )
 
         return res
 
+    @kb
+    async def get_many(
+        self,
+        *,
+        ids_or_slugs: Union[Iterable[str], AsyncIterable[str]],
+        show: Optional[List[str]] = None,
+        extracted: Optional[List[str]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        raw: bool = False,
+        **kwargs,
+    ) -> AsyncIterator[BatchResult[str, Union[Resource, ResourceView]]]:
+        """
+        Fetch many resources concurrently, sharing one client. Resources are
+        yielded as they are fetched, and at most `concurrency` of them are
+        held at once, so any number of resources can be read with bounded
+        memory.
+
+        :param ids_or_slugs: ids or slugs of the resources. Values that look
+            like an id are fetched by id, then by slug if there is no such id.
+            It can be an async iterable.
+        :param show: as in `get`.
+        :param extracted: as in `get`.
+        :param concurrency: maximum number of fetches in flight.
+        :param ordered: yield resources in the order of `ids_or_slugs`.
+            Otherwise, they are yielded as soon as they are fetched.
+        :param raw: yield lazily parsed `ResourceView`s, as in `get`.
+        :return: one result per resource. Resources that do not exist have
+            `error` set to `NotFoundError`.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )
+        async def get(id_or_slug: str) -> Union[Resource, ResourceView]:
+            if RID_PATTERN.match(id_or_slug):
+                try:
+                    return await self.get(
+                        rid=id_or_slug,
+                        show=show,
+                        extracted=extracted,
+                        raw=raw,
+                        ndb=ndb,
+                    )
+                except exceptions.NotFoundError:
+                    pass
+            return await self.get(
+                slug=id_or_slug, show=show, extracted=extracted, raw=raw, ndb=ndb
+            )
+
+        async for result in async_run_batch(
+            get, ids_or_slugs, concurrency=concurrency, ordered=ordered
+        ):
+            yield result
+
     @kb
     async def download_file(
         self,
@@ -466,10 +895,25 @@ class AsyncNucliaResource:
         slug: Optional[str] = None,
         file_id: str,
         output: str,
+        resource: Optional[Resource] = None,
+        segments: int = 1,
         **kwargs,
     ):
+        """
+        Download the file of a file field to `output`. It is written to
+        `output.part` first, and an interrupted download is resumed where it
+        stopped. The file is checked against the size and md5 stored in the
+        resource, when known.
+
+        :param resource: the resource, fetched with `show=["values"]`, to
+            skip fetching it again.
+        :param segments: split large files in this many ranges, downloaded
+            concurrently.
+        """
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        if rid:
+        if resource is not None:
+            res = resource
+        elif rid:
             res = await ndb.ndb.get_resource_by_id(
                 kbid=ndb.kbid, rid=rid, query_params={"show": ["values"]}
             )
@@ -479,29 +923,18 @@ class AsyncNucliaResource:
             )
         else:
             raise ValueError("Either rid or slug must be provided")
-        if res.data is None or res.data.files is None:
-            raise ValueError("Resource has no file data")
-        file_field = res.data.files.get(file_id)
-        if not file_field:
-            raise ValueError(f"File with id {file_id} not found in resource")
-        if (
-            file_field.value is None
-            or file_field.value.file is None
-            or file_field.value.file.uri is None
-        ):
-            raise ValueError(f"File field {file_id} has no download URI")
-        url = get_regional_url(
-            ndb.region,
-            "/api/v1" + file_field.value.file.uri,
-            origin_url=_ndb_origin_url(ndb),
+        if ndb.reader_session is None:
+            raise ValueError("KB not configured")
+        file = _download_link(res, file_id)
+        await async_download(
+            ndb.reader_session,
+            _download_url(ndb, file),
+            output,
+            headers=ndb.headers,
+            size=file.size,
+            md5=file.md5,
+            segments=segments,
         )
-        download = requests.get(url, stream=True, headers=ndb.headers)
-        if download.status_code != 200:
-            raise ValueError(f"Error downloading file: {download.text}")
-        with open(output, "wb") as f:
-            for chunk in download.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
 
     @kb
     async def temporal_download_url(
@@ -524,20 +957,38 @@ class AsyncNucliaResource:
             )
         else:
             raise ValueError("Either rid or slug must be provided")
-        file_field = res.data.files.get(file_id)
-        if not file_field:
-            raise ValueError(f"File with id {file_id} not found in resource")
-        url = get_regional_url(
-            ndb.region,
-            "/api/v1" + file_field.value.file.uri,
-            origin_url=_ndb_origin_url(ndb),
+        url = _download_url(ndb, _download_link(res, file_id))
+        token = await EPHEMERAL_TOKENS.aget_or_create(
+            ndb.kbid, ttl, get_async_auth().create_ephemeral_token
         )
-        download = requests.get(url, stream=True, headers=ndb.headers)
-        if download.status_code != 200:
-            raise ValueError(f"Error downloading file: {download.text}")
-        auth = get_async_auth()
-        token = await auth.create_ephemeral_token(ndb.kbid, ttl=ttl)
-        return f"{url}?eph-token={token.token}"
+        return f"{url}?eph-token={token}"
+
+    @kb
+    async def temporal_download_urls(
+        self,
+        *,
+        files: Iterable[Tuple[str, str]],
+        ttl: int = 10,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs,
+    ) -> List[BatchResult[Tuple[str, str], str]]:
+        """Async version of `NucliaResource.temporal_download_urls`"""
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        files = list(files)
+        token = await EPHEMERAL_TOKENS.aget_or_create(
+            ndb.kbid, ttl, get_async_auth().create_ephemeral_token
+        )
+        resources = {
+            result.item: result
+            async for result in self.get_many(
+                ids_or_slugs=dict.fromkeys(id_or_slug for id_or_slug, _ in files),
+                show=["values"],
+                concurrency=concurrency,
+                ordered=False,
+                ndb=ndb,
+            )
+        }
+        return _signed_urls(ndb, files, resources, token)
 
     @kb
     async def send_to_process(
@@ -560,15 +1011,32 @@ class AsyncNucliaResource:
 
     @kb
     async def update(
-        self, *, rid: Optional[str] = None, slug: Optional[str] = None, **kwargs
+        self,
+        *,
+        rid: Optional[str] = None,
+        slug: Optional[str] = None,
+        diff: bool = False,
+        resource: Optional[Resource] = None,
+        **kwargs,
     ):
+        """
+        Update a resource.
+
+        :param diff: only send the fields and metadata that differ from the
+            current resource, and do not call the KB if nothing changed.
+        :param resource: current resource to diff against, fetched with
+            `show=DIFF_SHOW`. It is fetched if not provided.
+        """
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
-        kw = {
-            "kbid": ndb.kbid,
-        }
-        for param in RESOURCE_ATTRIBUTES:
-            if param in kwargs:
-                kw[param] = kwargs.get(param)  # type: ignore
+        kw = _resource_attributes(kwargs)
+        if diff:
+            if resource is None:
+                resource = await self.get(rid=rid, slug=slug, show=DIFF_SHOW, ndb=ndb)
+            kw, slug = _diff_update(resource, kw, rid, slug)
+            if not kw and not (rid and slug):
+                logger.info("Resource is up to date, no update sent")
+                return
+        kw["kbid"] = ndb.kbid
         if rid:
             kw["rid"] = rid
             if slug:
@@ -591,6 +1059,102 @@ class AsyncNucliaResource:
             await ndb.ndb.delete_resource_by_slug(kbid=ndb.kbid, rslug=slug)
         else:
             raise ValueError("Either rid or slug must be provided")
+        SLUG_CACHE.forget(ndb.kbid, rid=rid, slug=slug)
+
+    @kb
+    async def delete_many(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        all: bool = False,
+        dry_run: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint: Optional[str] = None,
+        progress: bool = True,
+        **kwargs,
+    ) -> BulkResult:
+        """Async version of `NucliaResource.delete_many`"""
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+
+        async def delete(rid: str):
+            try:
+                await self.delete(rid=rid, ndb=ndb)
+            except exceptions.NotFoundError:
+                # Deleted by an interrupted run
+                pass
+
+        return await self._bulk(
+            "delete",
+            delete,
+            bulk_request(query, filters, all=all),
+            dry_run,
+            concurrency,
+            checkpoint,
+            progress,
+            ndb,
+        )
+
+    @kb
+    async def reprocess_many(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        all: bool = False,
+        dry_run: bool = False,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint: Optional[str] = None,
+        progress: bool = True,
+        **kwargs,
+    ) -> BulkResult:
+        """Async version of `NucliaResource.reprocess_many`"""
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+
+        async def reprocess(rid: str):
+            await self.send_to_process(rid=rid, ndb=ndb)
+
+        return await self._bulk(
+            "reprocess",
+            reprocess,
+            bulk_request(query, filters, all=all),
+            dry_run,
+            concurrency,
+            checkpoint,
+            progress,
+            ndb,
+        )
+
+    async def _bulk(
+        self,
+        operation: str,
+        func: Callable[[str], Awaitable[Any]],
+        req: CatalogRequest,
+        dry_run: bool,
+        concurrency: int,
+        checkpoint: Optional[str],
+        progress: bool,
+        ndb: AsyncNucliaDBClient,
+    ) -> BulkResult:
+        run = BulkRun(operation, checkpoint, progress=progress, dry_run=dry_run)
+        retried = backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=RATE_LIMIT_MAX_TRIES,
+        )(func)
+        try:
+            pending = run.resume()
+            if pending is None:
+                pending = run.start([rid async for rid in async_iter_rids(ndb, req)])
+            if not dry_run:
+                async for result in async_run_batch(
+                    retried, pending, concurrency, ordered=False
+                ):
+                    run.record(result)
+            return run.complete()
+        finally:
+            run.close()
 
     @kb
     async def delete_field(
@@ -615,7 +1179,49 @@ class AsyncNucliaResource:
             raise ValueError("Either rid or slug must be provided")
 
 
-def _resource_head_url(
+def _get_view(
+    ndb: NucliaDBClient,
+    query_params: Dict[str, Any],
+    *,
+    rid: Optional[str] = None,
+    slug: Optional[str] = None,
+) -> ResourceView:
+    resp = ndb.ndb.session.get(
+        _resource_url(kbid=ndb.kbid, rid=rid, slug=slug), params=query_params
+    )
+    # Raises the same errors as the other calls of the nucliadb client
+    ndb.ndb._check_response(resp)
+    return ResourceView(resp.content)
+
+
+async def _async_get_view(
+    ndb: AsyncNucliaDBClient,
+    query_params: Dict[str, Any],
+    *,
+    rid: Optional[str] = None,
+    slug: Optional[str] = None,
+) -> ResourceView:
+    resp = await ndb.ndb.session.get(
+        _resource_url(kbid=ndb.kbid, rid=rid, slug=slug), params=query_params
+    )
+    ndb.ndb._check_response(resp)
+    return ResourceView(resp.content)
+
+
+def _not_processed(res: Union[Resource, ResourceView]) -> bool:
+    if isinstance(res, ResourceView):
+        metadata = res.get("metadata")
+        return (
+            metadata is not None
+            and metadata.get("status") != ResourceProcessingStatus.PROCESSED
+        )
+    return (
+        res.metadata is not None
+        and res.metadata.status != ResourceProcessingStatus.PROCESSED
+    )
+
+
+def _resource_url(
     *, kbid: str, rid: Optional[str] = None, slug: Optional[str] = None
 ) -> str:
     if rid:
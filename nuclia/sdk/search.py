@@ -1,12 +1,32 @@
+import asyncio
 import json
 import os
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
+import backoff
 from nuclia_models.common.consumption import Consumption, TokensDetail
 from nucliadb_models.graph.requests import GraphSearchRequest
 from nucliadb_models.graph.responses import GraphSearchResponse
+from nucliadb_models.resource import Resource
 from nucliadb_models.search import (
     AskRequest,
     AskResponseItem,
@@ -15,24 +35,101 @@ from nucliadb_models.search import (
     ChatModel,
     Filter,
     FindOptions,
+    FindParagraph,
     FindRequest,
     KnowledgeboxFindResults,
     KnowledgeboxSearchResults,
+    Paragraph,
     RagImagesStrategies,
     RagStrategies,
     Relations,
     SearchRequest,
     SyncAskResponse,
 )
-from pydantic import ValidationError
-
-from nuclia.data import get_async_auth, get_auth
-from nuclia.decorators import kb, pretty
-from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nucliadb_sdk import exceptions
+from nucliadb_sdk.v2.sdk import ask_response_parser, ask_response_parser_async
+from pydantic import BaseModel, ValidationError
+
+from nuclia.data import get_async_auth, get_async_client, get_auth, get_client
+from nuclia.decorators import deadline, kb, pretty
+from nuclia.exceptions import RateLimitError
+from nuclia.lib.batch import (
+    DEFAULT_CONCURRENCY,
+    BatchResult,
+    async_run_batch,
+    run_batch,
+)
+from nuclia.lib.cache import AsyncCacheInvalidator, CacheInvalidator, QueryCache
+from nuclia.lib.federated import (
+    FEDERATED_MAX_CLIENTS,
+    FEDERATED_MAX_CONCURRENCY,
+    FEDERATED_TIMEOUT_S,
+    FederatedFindResults,
+    ScoreNormalization,
+    merge_results,
+)
+from nuclia.lib.hedging import HedgingPolicy
+from nuclia.lib.kb import (
+    ASK_URL,
+    FIND_URL,
+    SEARCH_URL,
+    AsyncNucliaDBClient,
+    NucliaDBClient,
+)
+from nuclia.lib.ndjson import NDJSONDecoder
+from nuclia.lib.pagination import (
+    async_prefetch_pages,
+    next_catalog_page,
+    prefetch_pages,
+)
+from nuclia.lib.prepared import QueryTemplate
+from nuclia.lib.slugs import SLUG_CACHE
+from nuclia.lib.stream import StreamAssembler, TextBuffer
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
 from nuclia.sdk.logger import logger
 from nuclia.sdk.resource import RagImagesStrategiesParse, RagStrategiesParse
 
+ASK_RESPONSE_DECODER = NDJSONDecoder(AskResponseItem)
+
+M = TypeVar("M", bound=BaseModel)
+
+# Rate limited queries of `*_many` batches are retried
+RATE_LIMIT_ERRORS = (exceptions.RateLimitError, RateLimitError)
+QUERY_MAX_TRIES = 5
+QUERY_RETRY_FACTOR = 1
+
+
+def _to_request(
+    model: Type[M], query: Union[str, dict, M], filters: Any, kwargs: Dict[str, Any]
+) -> M:
+    """Validated request out of a query given as text, dict or model"""
+    if isinstance(query, model):
+        return query.model_copy(deep=True)
+    if isinstance(query, dict):
+        return model.model_validate(query)
+    if isinstance(query, str):
+        return model(query=query, filters=filters or [], **kwargs)
+    raise TypeError(f"query must be 'str', 'dict' or '{model.__name__}'")
+
+
+def _next_find_page(
+    search_after: Optional[str], page: KnowledgeboxFindResults
+) -> Optional[str]:
+    if not page.resources or not page.search_after:
+        return None
+    return page.search_after
+
+
+def _find_paragraphs(page: KnowledgeboxFindResults) -> List[FindParagraph]:
+    paragraphs = [
+        paragraph
+        for resource in page.resources.values()
+        for field in resource.fields.values()
+        for paragraph in field.paragraphs.values()
+    ]
+    paragraphs.sort(key=lambda paragraph: paragraph.order)
+    return paragraphs
+
 
 @dataclass
 class AskAnswer:
@@ -64,6 +161,274 @@ class AskAnswer:
         return ""
 
 
+def ask_answer(ask_response: SyncAskResponse) -> AskAnswer:
+    """Build an `AskAnswer` out of a synchronous ask response"""
+    result = AskAnswer(
+        answer=ask_response.answer.encode(),
+        reasoning=ask_response.reasoning,
+        learning_id=ask_response.learning_id,
+        relations_result=ask_response.relations,
+        find_result=ask_response.retrieval_results,
+        prequeries=ask_response.prequeries,
+        retrieval_best_matches=[
+            best.id for best in ask_response.retrieval_best_matches
+        ],
+        citations=ask_response.citations,
+        citation_footnote_to_context=ask_response.citation_footnote_to_context,
+        timings=None,
+        tokens=None,
+        object=ask_response.answer_json,
+        status=ask_response.status,
+        error_details=ask_response.error_details,
+        predict_request=ChatModel.model_validate(ask_response.predict_request)
+        if ask_response.predict_request is not None
+        else None,
+        relations=ask_response.relations,
+        prompt_context=ask_response.prompt_context,
+        consumption=ask_response.consumption,
+        augmented_context=ask_response.augmented_context,
+    )
+    if ask_response.metadata is not None:
+        if ask_response.metadata.timings is not None:
+            result.timings = ask_response.metadata.timings.model_dump()
+        if ask_response.metadata.tokens is not None:
+            result.tokens = ask_response.metadata.tokens.model_dump()
+
+    return result
+
+
+# Request model, response model and path of the queries that can be prepared
+PREPARED_QUERIES: Dict[str, Tuple[Type[BaseModel], Type[BaseModel], str]] = {
+    "find": (FindRequest, KnowledgeboxFindResults, FIND_URL),
+    "search": (SearchRequest, KnowledgeboxSearchResults, SEARCH_URL),
+    "ask": (AskRequest, SyncAskResponse, ASK_URL),
+}
+
+# The server answers ask queries with a single JSON document
+SYNC_ASK_HEADERS = {"X-Synchronous": "true"}
+
+
+class PreparedQuery:
+    """
+    A find, search or ask query whose static parameters are validated and
+    serialized once. See `NucliaSearch.prepare`.
+    """
+
+    def __init__(self, search: "NucliaSearch", kind: str, params: Dict[str, Any]):
+        if kind not in PREPARED_QUERIES:
+            raise ValueError(f"kind must be one of {', '.join(PREPARED_QUERIES)}")
+        model, self.response_model, self.path = PREPARED_QUERIES[kind]
+        self.search = search
+        self.kind = kind
+        self.template = QueryTemplate(model, params)
+
+    @kb
+    def __call__(
+        self,
+        *,
+        query: Optional[str] = None,
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        top_k: Optional[int] = None,
+        show_consumption: bool = False,
+        **kwargs,
+    ):
+        """
+        Run the query.
+
+        :param query: text of the query.
+        :param filters: filters of the query.
+        :param top_k: number of results, if not the default one.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        request, body = self.template.bind(query=query, filters=filters, top_k=top_k)
+        if self.kind == "ask":
+            response = self.search._hedged(
+                lambda: ndb.query(
+                    self.path,
+                    body,
+                    extra_headers={
+                        **SYNC_ASK_HEADERS,
+                        "X-Show-Consumption": str(show_consumption).lower(),
+                    },
+                )
+            )
+            return ask_answer(ask_response_parser(response))
+
+        def call():
+            response = ndb.query(self.path, body)
+            return self.response_model.model_validate_json(response.content)
+
+        return self.search._read(ndb.kbid, self.kind, request, call)
+
+
+class AsyncPreparedQuery:
+    """
+    Async version of `PreparedQuery`. See `AsyncNucliaSearch.prepare`.
+    """
+
+    def __init__(self, search: "AsyncNucliaSearch", kind: str, params: Dict[str, Any]):
+        if kind not in PREPARED_QUERIES:
+            raise ValueError(f"kind must be one of {', '.join(PREPARED_QUERIES)}")
+        model, self.response_model, self.path = PREPARED_QUERIES[kind]
+        self.search = search
+        self.kind = kind
+        self.template = QueryTemplate(model, params)
+
+    @kb
+    async def __call__(
+        self,
+        *,
+        query: Optional[str] = None,
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        top_k: Optional[int] = None,
+        show_consumption: bool = False,
+        **kwargs,
+    ):
+        """
+        Run the query.
+
+        :param query: text of the query.
+        :param filters: filters of the query.
+        :param top_k: number of results, if not the default one.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        request, body = self.template.bind(query=query, filters=filters, top_k=top_k)
+        if self.kind == "ask":
+
+            async def ask():
+                response = await ndb.query(
+                    self.path,
+                    body,
+                    extra_headers={
+                        **SYNC_ASK_HEADERS,
+                        "X-Show-Consumption": str(show_consumption).lower(),
+                    },
+                )
+                return ask_answer(await ask_response_parser_async(response))
+
+            return await self.search._hedged(ask)
+
+        async def call():
+            response = await ndb.query(self.path, body)
+            return self.response_model.model_validate_json(response.content)
+
+        return await self.search._read(ndb.kbid, self.kind, request, call)
+
+
+class AskAnswerAssembler(StreamAssembler[Any, AskAnswer]):
+    """Builds an `AskAnswer` out of the items of an ask stream"""
+
+    def __init__(self, learning_id: str):
+        self.response = AskAnswer(
+            answer=b"",
+            reasoning=None,
+            learning_id=learning_id,
+            relations_result=None,
+            find_result=None,
+            prequeries=None,
+            retrieval_best_matches=None,
+            citations=None,
+            citation_footnote_to_context=None,
+            timings=None,
+            tokens=None,
+            object=None,
+            status=None,
+            error_details=None,
+            predict_request=None,
+            relations=None,
+            prompt_context=None,
+            consumption=None,
+            augmented_context=None,
+        )
+        self.answer = TextBuffer()
+        self.reasoning = TextBuffer()
+
+    def key(self, item: Any) -> str:
+        return item.type
+
+    def result(self) -> AskAnswer:
+        self.response.answer = self.answer.getvalue().encode()
+        self.response.reasoning = self.reasoning.getvalue_or_none()
+        return self.response
+
+    def on_unknown(self, item: Any):  # pragma: no cover
+        warnings.warn(f"Unknown ask stream item type: {item.type}")
+
+    def _answer(self, item: Any):
+        self.answer.append(item.text)
+
+    def _reasoning(self, item: Any):
+        self.reasoning.append(item.text)
+
+    def _answer_json(self, item: Any):
+        self.response.object = item.object
+
+    def _retrieval(self, item: Any):
+        self.response.find_result = item.results
+
+    def _relations(self, item: Any):
+        self.response.relations_result = item.relations
+
+    def _citations(self, item: Any):
+        self.response.citations = item.citations
+
+    def _footnote_citations(self, item: Any):
+        self.response.citation_footnote_to_context = item.footnote_to_context
+
+    def _metadata(self, item: Any):
+        if item.timings:
+            self.response.timings = item.timings.model_dump()
+        if item.tokens:
+            self.response.tokens = item.tokens.model_dump()
+
+    def _consumption(self, item: Any):
+        self.response.consumption = Consumption(
+            normalized_tokens=TokensDetail(
+                input=item.normalized_tokens.input,
+                output=item.normalized_tokens.output,
+                image=item.normalized_tokens.image,
+            ),
+            customer_key_tokens=TokensDetail(
+                input=item.customer_key_tokens.input,
+                output=item.customer_key_tokens.output,
+                image=item.customer_key_tokens.image,
+            ),
+        )
+
+    def _status(self, item: Any):
+        self.response.status = item.status
+
+    def _prequeries(self, item: Any):
+        self.response.prequeries = item.results
+
+    def _error(self, item: Any):
+        self.response.error_details = item.error
+
+    def _debug(self, item: Any):
+        self.response.prompt_context = item.metadata.get("prompt_context")
+        self.response.predict_request = item.metadata.get("predict_request")
+
+    def _augmented_context(self, item: Any):
+        self.response.augmented_context = item.augmented
+
+    handlers = {
+        "answer": _answer,
+        "reasoning": _reasoning,
+        "answer_json": _answer_json,
+        "retrieval": _retrieval,
+        "relations": _relations,
+        "citations": _citations,
+        "footnote_citations": _footnote_citations,
+        "metadata": _metadata,
+        "consumption": _consumption,
+        "status": _status,
+        "prequeries": _prequeries,
+        "error": _error,
+        "debug": _debug,
+        "augmented_context": _augmented_context,
+    }
+
+
 class NucliaSearch:
     """
     Perform search on a Knowledge Box.
@@ -71,13 +436,71 @@ class NucliaSearch:
     `find` and `search` accept the following parameters:
     - `json`: return results in JSON format
     - `yaml`: return results in YAML format
+
+    If a `cache` is given, the results of `find`, `search` and `catalog` are
+    cached. If a `hedging` policy is given, slow `find`, `search`, `catalog`
+    and `ask` queries are hedged.
     """
 
+    def __init__(
+        self,
+        cache: Optional[QueryCache] = None,
+        hedging: Optional[HedgingPolicy] = None,
+    ):
+        self.cache = cache
+        self.hedging = hedging
+        # Clients of the KBs last queried by `find_federated`, reused across calls
+        self._clients: "OrderedDict[str, NucliaDBClient]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
     @property
     def _auth(self) -> NucliaAuth:
         auth = get_auth()
         return auth
 
+    def _hedged(self, call: Callable[[], Any]) -> Any:
+        if self.hedging is not None:
+            return self.hedging.call(call)
+        return call()
+
+    def _read(
+        self, kbid: str, kind: str, request: BaseModel, call: Callable[[], Any]
+    ) -> Any:
+        """Run a read query through the cache and the hedging policy, if any"""
+        if self.cache is not None:
+            return self.cache.get_or_call(
+                kbid, kind, request, lambda: self._hedged(call)
+            )
+        return self._hedged(call)
+
+    def prepare(self, kind: str, **static_params) -> PreparedQuery:
+        """
+        Prepare a query to run many times with different texts. Its static
+        parameters are validated and serialized once. On each call, only
+        `query`, `filters` and `top_k` are validated and serialized, and the
+        validators of the model run on the request.
+
+        :param kind: `find`, `search` or `ask`.
+        :param static_params: parameters of the request, as accepted by its
+            model.
+        """
+        return PreparedQuery(self, kind, static_params)
+
+    @kb
+    def invalidate_cache_on_changes(self, **kwargs) -> CacheInvalidator:
+        """
+        Follow the KB notifications in the background, dropping its cached
+        results whenever its resources change. Call `stop` on the returned
+        object to stop following them.
+        """
+        if self.cache is None:
+            raise ValueError("Search cache is not enabled")
+        ndb: NucliaDBClient = kwargs["ndb"]
+        invalidator = CacheInvalidator(self.cache, ndb.kbid, ndb.notifications)
+        invalidator.start()
+        return invalidator
+
     @kb
     @pretty
     def search(
@@ -106,7 +529,9 @@ class NucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict' or 'SearchRequest'")
 
-        return ndb.ndb.search(req, kbid=ndb.kbid)
+        return self._read(
+            ndb.kbid, "search", req, lambda: ndb.ndb.search(req, kbid=ndb.kbid)
+        )
 
     @kb
     @pretty
@@ -146,7 +571,9 @@ class NucliaSearch:
         if relations:
             req.features.append(FindOptions.RELATIONS)
 
-        return ndb.ndb.find(req, kbid=ndb.kbid)
+        return self._read(
+            ndb.kbid, "find", req, lambda: ndb.ndb.find(req, kbid=ndb.kbid)
+        )
 
     @kb
     @pretty
@@ -180,7 +607,12 @@ class NucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict', or 'CatalogRequest'")
 
-        return ndb.ndb.catalog(req, kbid=ndb.kbid)
+        results = self._read(
+            ndb.kbid, "catalog", req, lambda: ndb.ndb.catalog(req, kbid=ndb.kbid)
+        )
+        for resource in results.resources.values():
+            SLUG_CACHE.put_resource(ndb.kbid, resource)
+        return results
 
     @kb
     def ask(
@@ -224,47 +656,65 @@ class NucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict' or 'AskRequest'")
 
-        ask_response: SyncAskResponse = ndb.ndb.ask(
-            kbid=ndb.kbid,
-            content=req,
-            headers={"X-Show-Consumption": str(show_consumption).lower()},
+        ask_response: SyncAskResponse = self._hedged(
+            lambda: ndb.ndb.ask(
+                kbid=ndb.kbid,
+                content=req,
+                headers={"X-Show-Consumption": str(show_consumption).lower()},
+            )
         )
+        return ask_answer(ask_response)
 
-        result = AskAnswer(
-            answer=ask_response.answer.encode(),
-            reasoning=ask_response.reasoning,
-            learning_id=ask_response.learning_id,
-            relations_result=ask_response.relations,
-            find_result=ask_response.retrieval_results,
-            prequeries=ask_response.prequeries,
-            retrieval_best_matches=[
-                best.id for best in ask_response.retrieval_best_matches
-            ],
-            citations=ask_response.citations,
-            citation_footnote_to_context=ask_response.citation_footnote_to_context,
-            timings=None,
-            tokens=None,
-            object=ask_response.answer_json,
-            status=ask_response.status,
-            error_details=ask_response.error_details,
-            predict_request=ChatModel.model_validate(ask_response.predict_request)
-            if ask_response.predict_request is not None
-            else None,
-            relations=ask_response.relations,
-            prompt_context=ask_response.prompt_context,
-            consumption=ask_response.consumption,
-            augmented_context=ask_response.augmented_context,
-        )
+    @kb
+    def ask_stream(
+        self,
+        *,
+        query: Union[str, dict, AskRequest],
+        filters: Optional[List[str]] = None,
+        show_consumption: bool = False,
+        timeout: int = 100,
+        **kwargs,
+    ) -> Iterator[AskResponseItem]:
+        """
+        Answer a question, yielding the response items as they are received.
 
-        if ask_response.prompt_context:
-            result.prompt_context = ask_response.prompt_context
-        if ask_response.metadata is not None:
-            if ask_response.metadata.timings is not None:
-                result.timings = ask_response.metadata.timings.model_dump()
-            if ask_response.metadata.tokens is not None:
-                result.tokens = ask_response.metadata.tokens.model_dump()
+        See https://docs.rag.progress.cloud/docs/api#tag/Search/operation/Ask_Knowledge_Box_kb__kbid__ask_post
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        if isinstance(query, str):
+            req = AskRequest(
+                query=query,
+                filters=filters or [],  # type: ignore
+            )
+        elif isinstance(query, dict):
+            try:
+                req = AskRequest.model_validate(query)
+            except ValidationError:
+                logger.exception("Error validating query")
+                raise
+        elif isinstance(query, AskRequest):
+            req = query
+        else:
+            raise TypeError("query must be 'str, 'dict' or 'AskRequest'")
 
-        return result
+        ask_stream_response = ndb.ask(
+            req,
+            timeout=timeout,
+            extra_headers={"X-Show-Consumption": str(show_consumption).lower()},
+        )
+        try:
+            for line in ask_stream_response.iter_lines():
+                try:
+                    ask_response_item = ASK_RESPONSE_DECODER.decode(line)
+                except Exception as e:
+                    warnings.warn(
+                        f"Failed to parse AskResponseItem: {e}. item: {line!r}"
+                    )
+                    continue
+                if ask_response_item is not None:
+                    yield ask_response_item
+        finally:
+            ask_stream_response.close()
 
     @kb
     def ask_json(
@@ -320,43 +770,14 @@ class NucliaSearch:
         else:
             raise TypeError("query must be 'str, 'dict' or 'AskRequest'")
 
-        ask_response: SyncAskResponse = ndb.ndb.ask(
-            kbid=ndb.kbid,
-            content=req,
-            headers={"X-Show-Consumption": str(show_consumption).lower()},
-        )
-
-        result = AskAnswer(
-            answer=ask_response.answer.encode(),
-            reasoning=ask_response.reasoning,
-            learning_id=ask_response.learning_id,
-            relations_result=ask_response.relations,
-            find_result=ask_response.retrieval_results,
-            prequeries=ask_response.prequeries,
-            retrieval_best_matches=[
-                best.id for best in ask_response.retrieval_best_matches
-            ],
-            citations=ask_response.citations,
-            citation_footnote_to_context=ask_response.citation_footnote_to_context,
-            timings=None,
-            tokens=None,
-            object=ask_response.answer_json,
-            status=ask_response.status,
-            error_details=ask_response.error_details,
-            predict_request=ChatModel.model_validate(ask_response.predict_request)
-            if ask_response.predict_request is not None
-            else None,
-            relations=ask_response.relations,
-            prompt_context=ask_response.prompt_context,
-            consumption=ask_response.consumption,
-            augmented_context=ask_response.augmented_context,
+        ask_response: SyncAskResponse = self._hedged(
+            lambda: ndb.ndb.ask(
+                kbid=ndb.kbid,
+                content=req,
+                headers={"X-Show-Consumption": str(show_consumption).lower()},
+            )
         )
-        if ask_response.metadata is not None:
-            if ask_response.metadata.timings is not None:
-                result.timings = ask_response.metadata.timings.model_dump()
-            if ask_response.metadata.tokens is not None:
-                result.tokens = ask_response.metadata.tokens.model_dump()
-        return result
+        return ask_answer(ask_response)
 
     @kb
     def graph(
@@ -385,6 +806,254 @@ class NucliaSearch:
 
         return ndb.ndb.graph_search(req, kbid=ndb.kbid)
 
+    @kb
+    def find_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, FindRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> Iterator[BatchResult[Union[str, dict, FindRequest], KnowledgeboxFindResults]]:
+        """
+        Run many find queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `find`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        yield from self._run_many(
+            self.find, queries, concurrency, ordered, kwargs["ndb"]
+        )
+
+    @kb
+    def search_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, SearchRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> Iterator[
+        BatchResult[Union[str, dict, SearchRequest], KnowledgeboxSearchResults]
+    ]:
+        """
+        Run many search queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `search`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        yield from self._run_many(
+            self.search, queries, concurrency, ordered, kwargs["ndb"]
+        )
+
+    @kb
+    def ask_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, AskRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> Iterator[BatchResult[Union[str, dict, AskRequest], AskAnswer]]:
+        """
+        Run many ask queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `ask`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        yield from self._run_many(
+            self.ask, queries, concurrency, ordered, kwargs["ndb"]
+        )
+
+    @kb
+    def iter_catalog(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> Iterator[Resource]:
+        """
+        Iterate over all the resources matching a catalog query, fetching the
+        next page in the background while the current one is consumed.
+
+        :param query: query, as accepted by `catalog`. Its `page_number` is
+            the first page and its `page_size` the size of the pages.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        req = _to_request(CatalogRequest, query, filters, kwargs)
+
+        def fetch(page_number: int):
+            return self.catalog(
+                query=req.model_copy(update={"page_number": page_number}), ndb=ndb
+            )
+
+        for page in prefetch_pages(fetch, req.page_number, next_catalog_page):
+            yield from page.resources.values()
+
+    @kb
+    def iter_find(
+        self,
+        *,
+        query: Union[str, dict, FindRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> Iterator[FindParagraph]:
+        """
+        Iterate over all the paragraphs matching a find query, by pages of
+        `top_k` paragraphs. The next page is fetched in the background while
+        the current one is consumed.
+
+        :param query: query, as accepted by `find`.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        req = _to_request(FindRequest, query, filters, kwargs)
+
+        def fetch(search_after: Optional[str]):
+            return self.find(
+                query=req.model_copy(update={"search_after": search_after}), ndb=ndb
+            )
+
+        for page in prefetch_pages(fetch, req.search_after, _next_find_page):
+            yield from _find_paragraphs(page)
+
+    @kb
+    def iter_search(
+        self,
+        *,
+        query: Union[str, dict, SearchRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> Iterator[Paragraph]:
+        """
+        Iterate over the paragraphs matching a search query.
+
+        `/search` is not paginated: this yields its `top_k` paragraphs. Use
+        `iter_find` to go through all the matching paragraphs.
+
+        :param query: query, as accepted by `search`.
+        """
+        ndb: NucliaDBClient = kwargs["ndb"]
+        req = _to_request(SearchRequest, query, filters, kwargs)
+        page = self.search(query=req, ndb=ndb)
+        if page.paragraphs is not None:
+            yield from page.paragraphs.results
+
+    def find_federated(
+        self,
+        *,
+        kbids: Iterable[str],
+        query: Union[str, dict, FindRequest] = "",
+        top_k: int = 20,
+        timeout: float = FEDERATED_TIMEOUT_S,
+        normalization: Union[str, ScoreNormalization] = ScoreNormalization.MINMAX,
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> FederatedFindResults:
+        """
+        Run a find query on many KBs concurrently, and merge their best
+        `top_k` paragraphs.
+
+        Scores of different KBs are not comparable, so they are normalized
+        per KB before being merged. KBs that fail, or do not answer within
+        `timeout` seconds, are reported in `errors`, and the results of the
+        other KBs are returned.
+
+        :param kbids: KBs to query, out of the configured ones. The clients of
+            the last queried KBs are kept and reused by the next calls.
+        :param query: query, as accepted by `find`. It is sent to every KB.
+        :param top_k: number of merged paragraphs. Each KB is asked for as
+            many paragraphs.
+        :param timeout: seconds to wait for the KBs to answer.
+        :param normalization: `minmax`, `rank` or `none`. See
+            `ScoreNormalization`.
+        """
+        req = _to_request(FindRequest, query, filters, kwargs)
+        req = req.model_copy(update={"top_k": top_k})
+        results: Dict[str, KnowledgeboxFindResults] = {}
+        errors: Dict[str, BaseException] = {}
+        clients: Dict[str, NucliaDBClient] = {}
+        for kbid in dict.fromkeys(kbids):
+            try:
+                clients[kbid] = self._client(kbid)
+            except Exception as exc:
+                errors[kbid] = exc
+
+        if clients:
+            executor = self._federated_executor()
+            futures = {
+                kbid: executor.submit(self.find, query=req, ndb=client)
+                for kbid, client in clients.items()
+            }
+            done, not_done = wait(futures.values(), timeout=timeout)
+            # Late KBs that already started keep running in their threads, and
+            # their results are lost
+            for future in not_done:
+                future.cancel()
+            for kbid, future in futures.items():
+                error = (
+                    future.exception()
+                    if future in done
+                    else TimeoutError(f"KB {kbid} timed out")
+                )
+                if error is None:
+                    results[kbid] = future.result()
+                else:
+                    errors[kbid] = error
+
+        return merge_results(results, errors, top_k, ScoreNormalization(normalization))
+
+    def _federated_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=FEDERATED_MAX_CONCURRENCY,
+                    thread_name_prefix="nuclia-federated",
+                )
+            return self._executor
+
+    def _client(self, kbid: str) -> NucliaDBClient:
+        with self._lock:
+            client = self._clients.get(kbid)
+            if client is not None:
+                self._clients.move_to_end(kbid)
+                return client
+        client = get_client(kbid)
+        with self._lock:
+            self._clients[kbid] = client
+            while len(self._clients) > FEDERATED_MAX_CLIENTS:
+                self._clients.popitem(last=False)
+        return client
+
+    def _run_many(
+        self,
+        method: Callable[..., Any],
+        queries: Iterable[Any],
+        concurrency: int,
+        ordered: bool,
+        ndb: NucliaDBClient,
+    ) -> Iterator[BatchResult]:
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=QUERY_MAX_TRIES,
+            factor=QUERY_RETRY_FACTOR,
+        )
+        def run(query):
+            return method(query=query, ndb=ndb)
+
+        return run_batch(run, queries, concurrency=concurrency, ordered=ordered)
+
 
 class AsyncNucliaSearch:
     """
@@ -393,13 +1062,106 @@ class AsyncNucliaSearch:
     `find` and `search` accept the following parameters:
     - `json`: return results in JSON format
     - `yaml`: return results in YAML format
+
+    If a `cache` is given, the results of `find`, `search` and `catalog` are
+    cached. If a `hedging` policy is given, slow `find`, `search`, `catalog`
+    and `ask` queries are hedged.
+
+    `search`, `find`, `catalog`, `graph` and the `ask` methods accept a
+    `deadline`, in seconds, for the whole call. When it is exceeded, the call
+    is cancelled and `NucliaTimeoutError` is raised.
     """
 
+    def __init__(
+        self,
+        cache: Optional[QueryCache] = None,
+        hedging: Optional[HedgingPolicy] = None,
+    ):
+        self.cache = cache
+        self.hedging = hedging
+        # Clients of the KBs last queried by `find_federated`, reused across calls
+        self._clients: "OrderedDict[str, AsyncNucliaDBClient]" = OrderedDict()
+
     @property
     def _auth(self) -> AsyncNucliaAuth:
         auth = get_async_auth()
         return auth
 
+    async def _hedged(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        if self.hedging is not None:
+            return await self.hedging.acall(call)
+        return await call()
+
+    async def _read(
+        self,
+        kbid: str,
+        kind: str,
+        request: BaseModel,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run a read query through the cache and the hedging policy, if any"""
+        if self.cache is not None:
+            return await self.cache.aget_or_call(
+                kbid, kind, request, lambda: self._hedged(call)
+            )
+        return await self._hedged(call)
+
+    async def _ask_answer(
+        self,
+        ndb: AsyncNucliaDBClient,
+        req: AskRequest,
+        show_consumption: bool,
+        timeout: int,
+    ) -> AskAnswer:
+        ask_stream_response = await ndb.ask(
+            req,
+            timeout=timeout,
+            extra_headers={"X-Show-Consumption": str(show_consumption).lower()},
+        )
+        assembler = AskAnswerAssembler(
+            learning_id=ask_stream_response.headers.get("NUCLIA-LEARNING-ID", "")
+        )
+        try:
+            async for line in ask_stream_response.aiter_lines():
+                try:
+                    ask_response_item = ASK_RESPONSE_DECODER.decode(line)
+                except Exception as e:
+                    warnings.warn(f"Failed to parse AskResponseItem: {e}. item: {line}")
+                    continue
+                if ask_response_item is not None:
+                    assembler.feed(ask_response_item.item)
+        finally:
+            await ask_stream_response.aclose()
+        return assembler.result()
+
+    def prepare(self, kind: str, **static_params) -> AsyncPreparedQuery:
+        """
+        Prepare a query to run many times with different texts. Its static
+        parameters are validated and serialized once. On each call, only
+        `query`, `filters` and `top_k` are validated and serialized, and the
+        validators of the model run on the request.
+
+        :param kind: `find`, `search` or `ask`.
+        :param static_params: parameters of the request, as accepted by its
+            model.
+        """
+        return AsyncPreparedQuery(self, kind, static_params)
+
+    @kb
+    async def invalidate_cache_on_changes(self, **kwargs) -> AsyncCacheInvalidator:
+        """
+        Follow the KB notifications in the background, dropping its cached
+        results whenever its resources change. Await `stop` on the returned
+        object to stop following them.
+        """
+        if self.cache is None:
+            raise ValueError("Search cache is not enabled")
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        invalidator = AsyncCacheInvalidator(self.cache, ndb.kbid, ndb.notifications)
+        invalidator.start()
+        return invalidator
+
+    @deadline
     @kb
     @pretty
     async def search(
@@ -428,8 +1190,11 @@ class AsyncNucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict' or 'SearchRequest'")
 
-        return await ndb.ndb.search(req, kbid=ndb.kbid)
+        return await self._read(
+            ndb.kbid, "search", req, lambda: ndb.ndb.search(req, kbid=ndb.kbid)
+        )
 
+    @deadline
     @kb
     @pretty
     async def find(
@@ -466,8 +1231,11 @@ class AsyncNucliaSearch:
         if relations:
             req.features.append(FindOptions.RELATIONS)
 
-        return await ndb.ndb.find(req, kbid=ndb.kbid)
+        return await self._read(
+            ndb.kbid, "find", req, lambda: ndb.ndb.find(req, kbid=ndb.kbid)
+        )
 
+    @deadline
     @kb
     @pretty
     async def catalog(
@@ -500,8 +1268,14 @@ class AsyncNucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict', or 'CatalogRequest'")
 
-        return await ndb.ndb.catalog(req, kbid=ndb.kbid)
+        results = await self._read(
+            ndb.kbid, "catalog", req, lambda: ndb.ndb.catalog(req, kbid=ndb.kbid)
+        )
+        for resource in results.resources.values():
+            SLUG_CACHE.put_resource(ndb.kbid, resource)
+        return results
 
+    @deadline
     @kb
     async def ask(
         self,
@@ -536,89 +1310,11 @@ class AsyncNucliaSearch:
         else:
             raise TypeError("query must be 'str', 'dict' or 'AskRequest'")
 
-        ask_stream_response = await ndb.ask(
-            req,
-            timeout=timeout,
-            extra_headers={"X-Show-Consumption": str(show_consumption).lower()},
+        return await self._hedged(
+            lambda: self._ask_answer(ndb, req, show_consumption, timeout)
         )
-        result = AskAnswer(
-            answer=b"",
-            reasoning=None,
-            learning_id=ask_stream_response.headers.get("NUCLIA-LEARNING-ID", ""),
-            relations_result=None,
-            find_result=None,
-            prequeries=None,
-            retrieval_best_matches=None,
-            citations=None,
-            citation_footnote_to_context=None,
-            timings=None,
-            tokens=None,
-            object=None,
-            status=None,
-            error_details=None,
-            predict_request=None,
-            relations=None,
-            prompt_context=None,
-            consumption=None,
-            augmented_context=None,
-        )
-        async for line in ask_stream_response.aiter_lines():
-            try:
-                ask_response_item = AskResponseItem.model_validate_json(line).item
-            except Exception as e:
-                warnings.warn(f"Failed to parse AskResponseItem: {e}. item: {line}")
-                continue
-            if ask_response_item.type == "answer":
-                result.answer += ask_response_item.text.encode()
-            elif ask_response_item.type == "reasoning":
-                result.reasoning = (result.reasoning or "") + ask_response_item.text
-            elif ask_response_item.type == "answer_json":
-                result.object = ask_response_item.object
-            elif ask_response_item.type == "retrieval":
-                result.find_result = ask_response_item.results
-            elif ask_response_item.type == "relations":
-                result.relations_result = ask_response_item.relations
-            elif ask_response_item.type == "citations":
-                result.citations = ask_response_item.citations
-            elif ask_response_item.type == "footnote_citations":
-                result.citation_footnote_to_context = (
-                    ask_response_item.footnote_to_context
-                )
-            elif ask_response_item.type == "metadata":
-                if ask_response_item.timings:
-                    result.timings = ask_response_item.timings.model_dump()
-                if ask_response_item.tokens:
-                    result.tokens = ask_response_item.tokens.model_dump()
-            elif ask_response_item.type == "consumption":
-                result.consumption = Consumption(
-                    normalized_tokens=TokensDetail(
-                        input=ask_response_item.normalized_tokens.input,
-                        output=ask_response_item.normalized_tokens.output,
-                        image=ask_response_item.normalized_tokens.image,
-                    ),
-                    customer_key_tokens=TokensDetail(
-                        input=ask_response_item.customer_key_tokens.input,
-                        output=ask_response_item.customer_key_tokens.output,
-                        image=ask_response_item.customer_key_tokens.image,
-                    ),
-                )
-            elif ask_response_item.type == "status":
-                result.status = ask_response_item.status
-            elif ask_response_item.type == "prequeries":
-                result.prequeries = ask_response_item.results
-            elif ask_response_item.type == "error":
-                result.error_details = ask_response_item.error
-            elif ask_response_item.type == "debug":
-                result.prompt_context = ask_response_item.metadata.get("prompt_context")
-                result.predict_request = ask_response_item.metadata.get(
-                    "predict_request"
-                )
-            elif ask_response_item.type == "augmented_context":
-                result.augmented_context = ask_response_item.augmented
-            else:  # pragma: no cover
-                warnings.warn(f"Unknown ask stream item type: {ask_response_item.type}")
-        return result
 
+    @deadline
     @kb
     async def ask_stream(
         self,
@@ -656,14 +1352,20 @@ class AsyncNucliaSearch:
             timeout=timeout,
             extra_headers={"X-Show-Consumption": str(show_consumption).lower()},
         )
-        async for line in ask_stream_response.aiter_lines():
-            try:
-                ask_response_item = AskResponseItem.model_validate_json(line)
-            except Exception as e:
-                warnings.warn(f"Failed to parse AskResponseItem: {e}. item: {line}")
-                continue
-            yield ask_response_item
-
+        try:
+            async for line in ask_stream_response.aiter_lines():
+                try:
+                    ask_response_item = ASK_RESPONSE_DECODER.decode(line)
+                except Exception as e:
+                    warnings.warn(f"Failed to parse AskResponseItem: {e}. item: {line}")
+                    continue
+                if ask_response_item is not None:
+                    yield ask_response_item
+        finally:
+            # Also closes streams left half-read by a cancelled or closed caller
+            await ask_stream_response.aclose()
+
+    @deadline
     @kb
     async def ask_json(
         self,
@@ -699,89 +1401,11 @@ class AsyncNucliaSearch:
         else:
             raise TypeError("query must be 'str, 'dict' or 'AskRequest'")
 
-        ask_stream_response = await ndb.ask(
-            req,
-            timeout=timeout,
-            extra_headers={"X-Show-Consumption": str(show_consumption).lower()},
+        return await self._hedged(
+            lambda: self._ask_answer(ndb, req, show_consumption, timeout)
         )
-        result = AskAnswer(
-            answer=b"",
-            reasoning=None,
-            learning_id=ask_stream_response.headers.get("NUCLIA-LEARNING-ID", ""),
-            relations_result=None,
-            find_result=None,
-            prequeries=None,
-            retrieval_best_matches=None,
-            citations=None,
-            citation_footnote_to_context=None,
-            timings=None,
-            tokens=None,
-            object=None,
-            status=None,
-            error_details=None,
-            predict_request=None,
-            relations=None,
-            prompt_context=None,
-            consumption=None,
-            augmented_context=None,
-        )
-        async for line in ask_stream_response.aiter_lines():
-            try:
-                ask_response_item = AskResponseItem.model_validate_json(line).item
-            except Exception as e:
-                warnings.warn(f"Failed to parse AskResponseItem: {e}. item: {line}")
-                continue
-            if ask_response_item.type == "answer":
-                result.answer += ask_response_item.text.encode()
-            elif ask_response_item.type == "reasoning":
-                result.reasoning = (result.reasoning or "") + ask_response_item.text
-            elif ask_response_item.type == "retrieval":
-                result.find_result = ask_response_item.results
-            elif ask_response_item.type == "answer_json":
-                result.object = ask_response_item.object
-            elif ask_response_item.type == "relations":
-                result.relations_result = ask_response_item.relations
-            elif ask_response_item.type == "citations":
-                result.citations = ask_response_item.citations
-            elif ask_response_item.type == "footnote_citations":
-                result.citation_footnote_to_context = (
-                    ask_response_item.footnote_to_context
-                )
-            elif ask_response_item.type == "metadata":
-                if ask_response_item.timings:
-                    result.timings = ask_response_item.timings.model_dump()
-                if ask_response_item.tokens:
-                    result.tokens = ask_response_item.tokens.model_dump()
-            elif ask_response_item.type == "consumption":
-                result.consumption = Consumption(
-                    normalized_tokens=TokensDetail(
-                        input=ask_response_item.normalized_tokens.input,
-                        output=ask_response_item.normalized_tokens.output,
-                        image=ask_response_item.normalized_tokens.image,
-                    ),
-                    customer_key_tokens=TokensDetail(
-                        input=ask_response_item.customer_key_tokens.input,
-                        output=ask_response_item.customer_key_tokens.output,
-                        image=ask_response_item.customer_key_tokens.image,
-                    ),
-                )
-            elif ask_response_item.type == "status":
-                result.status = ask_response_item.status
-            elif ask_response_item.type == "prequeries":
-                result.prequeries = ask_response_item.results
-            elif ask_response_item.type == "error":
-                result.error_details = ask_response_item.error
-            elif ask_response_item.type == "debug":
-                result.prompt_context = ask_response_item.metadata.get("prompt_context")
-                result.predict_request = ask_response_item.metadata.get(
-                    "predict_request"
-                )
-            elif ask_response_item.type == "augmented_context":
-                result.augmented_context = ask_response_item.augmented
-            else:  # pragma: no cover
-                warnings.warn(f"Unknown ask stream item type: {ask_response_item.type}")
-        return result
 
+    @deadline
     @kb
     async def graph(
         self,
@@ -808,3 +1432,244 @@ class AsyncNucliaSearch:
             raise TypeError("query must be 'dict' or 'GraphSearchRequest'")
 
         return await ndb.ndb.graph_search(req, kbid=ndb.kbid)
+
+    @kb
+    async def find_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, FindRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> AsyncIterator[
+        BatchResult[Union[str, dict, FindRequest], KnowledgeboxFindResults]
+    ]:
+        """
+        Run many find queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `find`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        async for result in self._run_many(
+            self.find, queries, concurrency, ordered, kwargs["ndb"]
+        ):
+            yield result
+
+    @kb
+    async def search_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, SearchRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> AsyncIterator[
+        BatchResult[Union[str, dict, SearchRequest], KnowledgeboxSearchResults]
+    ]:
+        """
+        Run many search queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `search`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        async for result in self._run_many(
+            self.search, queries, concurrency, ordered, kwargs["ndb"]
+        ):
+            yield result
+
+    @kb
+    async def ask_many(
+        self,
+        *,
+        queries: Iterable[Union[str, dict, AskRequest]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+        **kwargs,
+    ) -> AsyncIterator[BatchResult[Union[str, dict, AskRequest], AskAnswer]]:
+        """
+        Run many ask queries concurrently, sharing one client.
+
+        :param queries: queries, as accepted by `ask`.
+        :param concurrency: maximum number of queries in flight.
+        :param ordered: yield results in the order of `queries`. Otherwise,
+            they are yielded as soon as they complete.
+        :return: one result per query. Failed queries have `error` set.
+        """
+        async for result in self._run_many(
+            self.ask, queries, concurrency, ordered, kwargs["ndb"]
+        ):
+            yield result
+
+    @kb
+    async def iter_catalog(
+        self,
+        *,
+        query: Union[str, dict, CatalogRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[Resource]:
+        """
+        Iterate over all the resources matching a catalog query, fetching the
+        next page in the background while the current one is consumed.
+
+        :param query: query, as accepted by `catalog`. Its `page_number` is
+            the first page and its `page_size` the size of the pages.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        req = _to_request(CatalogRequest, query, filters, kwargs)
+
+        def fetch(page_number: int):
+            return self.catalog(
+                query=req.model_copy(update={"page_number": page_number}), ndb=ndb
+            )
+
+        async for page in async_prefetch_pages(
+            fetch, req.page_number, next_catalog_page
+        ):
+            for resource in page.resources.values():
+                yield resource
+
+    @kb
+    async def iter_find(
+        self,
+        *,
+        query: Union[str, dict, FindRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[FindParagraph]:
+        """
+        Iterate over all the paragraphs matching a find query, by pages of
+        `top_k` paragraphs. The next page is fetched in the background while
+        the current one is consumed.
+
+        :param query: query, as accepted by `find`.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        req = _to_request(FindRequest, query, filters, kwargs)
+
+        def fetch(search_after: Optional[str]):
+            return self.find(
+                query=req.model_copy(update={"search_after": search_after}), ndb=ndb
+            )
+
+        async for page in async_prefetch_pages(
+            fetch, req.search_after, _next_find_page
+        ):
+            for paragraph in _find_paragraphs(page):
+                yield paragraph
+
+    @kb
+    async def iter_search(
+        self,
+        *,
+        query: Union[str, dict, SearchRequest] = "",
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[Paragraph]:
+        """
+        Iterate over the paragraphs matching a search query.
+
+        `/search` is not paginated: this yields its `top_k` paragraphs. Use
+        `iter_find` to go through all the matching paragraphs.
+
+        :param query: query, as accepted by `search`.
+        """
+        ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        req = _to_request(SearchRequest, query, filters, kwargs)
+        page = await self.search(query=req, ndb=ndb)
+        if page.paragraphs is not None:
+            for paragraph in page.paragraphs.results:
+                yield paragraph
+
+    async def find_federated(
+        self,
+        *,
+        kbids: Iterable[str],
+        query: Union[str, dict, FindRequest] = "",
+        top_k: int = 20,
+        timeout: float = FEDERATED_TIMEOUT_S,
+        normalization: Union[str, ScoreNormalization] = ScoreNormalization.MINMAX,
+        filters: Optional[Union[List[str], List[Filter]]] = None,
+        **kwargs,
+    ) -> FederatedFindResults:
+        """
+        Run a find query on many KBs concurrently, and merge their best
+        `top_k` paragraphs.
+
+        Scores of different KBs are not comparable, so they are normalized
+        per KB before being merged. KBs that fail, or do not answer within
+        `timeout` seconds, are reported in `errors`, and the results of the
+        other KBs are returned.
+
+        :param kbids: KBs to query, out of the configured ones. The clients of
+            the last queried KBs are kept and reused by the next calls.
+        :param query: query, as accepted by `find`. It is sent to every KB.
+        :param top_k: number of merged paragraphs. Each KB is asked for as
+            many paragraphs.
+        :param timeout: seconds to wait for the KBs to answer.
+        :param normalization: `minmax`, `rank` or `none`. See
+            `ScoreNormalization`.
+        """
+        req = _to_request(FindRequest, query, filters, kwargs)
+        req = req.model_copy(update={"top_k": top_k})
+        results: Dict[str, KnowledgeboxFindResults] = {}
+        errors: Dict[str, BaseException] = {}
+        clients: Dict[str, AsyncNucliaDBClient] = {}
+        for kbid in dict.fromkeys(kbids):
+            try:
+                clients[kbid] = await self._client(kbid)
+            except Exception as exc:
+                errors[kbid] = exc
+
+        async def find(client: AsyncNucliaDBClient):
+            # Late KBs are cancelled
+            return await asyncio.wait_for(self.find(query=req, ndb=client), timeout)
+
+        answers = await asyncio.gather(
+            *(find(client) for client in clients.values()), return_exceptions=True
+        )
+        for kbid, answer in zip(clients, answers):
+            if isinstance(answer, asyncio.TimeoutError):
+                errors[kbid] = TimeoutError(f"KB {kbid} timed out")
+            elif isinstance(answer, BaseException):
+                errors[kbid] = answer
+            else:
+                results[kbid] = answer
+
+        return merge_results(results, errors, top_k, ScoreNormalization(normalization))
+
+    async def _client(self, kbid: str) -> AsyncNucliaDBClient:
+        client = self._clients.get(kbid)
+        if client is not None:
+            self._clients.move_to_end(kbid)
+            return client
+        client = self._clients[kbid] = await get_async_client(kbid)
+        while len(self._clients) > FEDERATED_MAX_CLIENTS:
+            self._clients.popitem(last=False)
+        return client
+
+    def _run_many(
+        self,
+        method: Callable[..., Awaitable[Any]],
+        queries: Iterable[Any],
+        concurrency: int,
+        ordered: bool,
+        ndb: AsyncNucliaDBClient,
+    ) -> AsyncIterator[BatchResult]:
+        @backoff.on_exception(
+            backoff.expo,
+            RATE_LIMIT_ERRORS,
+            jitter=backoff.full_jitter,
+            max_tries=QUERY_MAX_TRIES,
+            factor=QUERY_RETRY_FACTOR,
+        )
+        async def run(query):
+            return await method(query=query, ndb=ndb)
+
+        return async_run_batch(run, queries, concurrency=concurrency, ordered=ordered)
@@ -6,11 +6,12 @@ import os
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from uuid import uuid4
 
 import aiofiles
 import backoff
+import httpx
 import requests
 from nucliadb_models.resource import Resource
 from nucliadb_models.text import TextFormat
@@ -23,6 +24,8 @@ from nuclia.decorators import kb
 from nuclia.exceptions import DuplicateError, GettingRemoteFileError, RateLimitError
 from nuclia.lib.conversations import Conversation
 from nuclia.lib.kb import AsyncNucliaDBClient, NucliaDBClient
+from nuclia.lib.kb_config import KB_CONFIGS, KBConfig
+from nuclia.lib.slugs import SLUG_CACHE
 from nuclia.lib.utils import build_httpx_async_client
 from nuclia.sdk.auth import AsyncNucliaAuth, NucliaAuth
 from nuclia.sdk.logger import logger
@@ -32,6 +35,51 @@ MB = 1024 * 1024
 CHUNK_SIZE = 5 * MB
 
 
+def _resolved(
+    config: KBConfig, extract_strategy: Optional[str], split_strategy: Optional[str]
+) -> Tuple[Optional[str], Optional[str]]:
+    if extract_strategy is not None:
+        extract_strategy = (
+            config.extract_strategy_id(extract_strategy) or extract_strategy
+        )
+    if split_strategy is not None:
+        split_strategy = config.split_strategy_id(split_strategy) or split_strategy
+    return extract_strategy, split_strategy
+
+
+def _strategy_ids(
+    ndb: NucliaDBClient, extract_strategy: Optional[str], split_strategy: Optional[str]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Ids of strategies given by id or by name, from the KB configuration snapshot"""
+    if extract_strategy is None and split_strategy is None:
+        return (extract_strategy, split_strategy)
+    try:
+        config = KB_CONFIGS.get_or_load(ndb)
+    except Exception:
+        logger.warning(
+            "Unable to load the KB configuration, strategies are sent as given"
+        )
+        return (extract_strategy, split_strategy)
+    return _resolved(config, extract_strategy, split_strategy)
+
+
+async def _async_strategy_ids(
+    ndb: AsyncNucliaDBClient,
+    extract_strategy: Optional[str],
+    split_strategy: Optional[str],
+) -> Tuple[Optional[str], Optional[str]]:
+    if extract_strategy is None and split_strategy is None:
+        return (extract_strategy, split_strategy)
+    try:
+        config = await KB_CONFIGS.aget_or_load(ndb)
+    except Exception:
+        logger.warning(
+            "Unable to load the KB configuration, strategies are sent as given"
+        )
+        return (extract_strategy, split_strategy)
+    return _resolved(config, extract_strategy, split_strategy)
+
+
 class NucliaUpload:
     """
     Create or update resource content in a Nuclia KnowledgeBox.
@@ -49,6 +97,8 @@ class NucliaUpload:
     - `origin`: Origin metadata.
         See https://docs.rag.progress.cloud/docs/api#tag/Resources/operation/Create_Resource_kb__kbid__resources_post
     - `extra`: user-defined metadata.
+    - `diff`: when `text`, `link` or `conversation` update an existing resource,
+        only send what differs from it, so unchanged fields are not processed again.
     """
 
     @property
@@ -73,6 +123,9 @@ class NucliaUpload:
     ) -> Optional[str]:
         """Upload a file from filesystem to a Nuclia KnowledgeBox"""
         ndb: NucliaDBClient = kwargs["ndb"]
+        extract_strategy, split_strategy = _strategy_ids(
+            ndb, extract_strategy, split_strategy
+        )
         filename = path.split(os.sep)[-1]
         size = os.path.getsize(path)
         mimetype = mimetype or mimetypes.guess_type(path)[0]
@@ -83,6 +136,7 @@ class NucliaUpload:
         if blanklineSplitter:
             mimetype += "+blankline"
         is_new_resource = False
+        cached = _from_slug_cache(ndb.kbid, rid, kwargs.get("slug"))
         rid, is_new_resource = self._get_or_create_resource(
             rid=rid, icon=mimetype, **kwargs
         )
@@ -93,19 +147,30 @@ class NucliaUpload:
         with open(path, "rb") as upload_file:
             md5_hash.update(upload_file.read())
 
+        upload: Dict[str, Any] = dict(
+            field=field,
+            size=size,
+            filename=filename,
+            content_type=mimetype,
+            md5=md5_hash.hexdigest(),
+            extract_strategy=extract_strategy,
+            split_strategy=split_strategy,
+            language=language,
+        )
         with open(path, "rb") as upload_file:
             try:
-                upload_url = ndb.start_tus_upload(
-                    rid=rid,
-                    field=field,
-                    size=size,
-                    filename=filename,
-                    content_type=mimetype,
-                    md5=md5_hash.hexdigest(),
-                    extract_strategy=extract_strategy,
-                    split_strategy=split_strategy,
-                    language=language,
-                )
+                try:
+                    upload_url = ndb.start_tus_upload(rid=rid, **upload)
+                except Exception as exc:
+                    if not (cached and _resource_gone(exc)):
+                        raise
+                    # The cached resource was deleted: look it up or create
+                    # it again
+                    SLUG_CACHE.forget(ndb.kbid, rid=rid)
+                    rid, is_new_resource = self._get_or_create_resource(
+                        icon=mimetype, **kwargs
+                    )
+                    upload_url = ndb.start_tus_upload(rid=rid, **upload)
 
                 offset = 0
                 for _ in tqdm(range((size // CHUNK_SIZE) + 1)):
@@ -117,6 +182,8 @@ class NucliaUpload:
                 logger.info("Duplicated file")
             except Exception:
                 logger.exception("Error on uploading")
+                # The resource may be stale in the cache
+                SLUG_CACHE.forget(ndb.kbid, rid=rid)
                 if is_new_resource:
                     ndb.ndb.delete_resource(kbid=ndb.kbid, rid=rid)
                 raise
@@ -160,17 +227,9 @@ class NucliaUpload:
             }
         }
 
-        rid, is_new_resource = self._get_or_create_resource(
-            conversations=conversations,
-            **kwargs,
+        return self._create_or_update_resource(
+            {"conversations": conversations}, **kwargs
         )
-        if not is_new_resource:
-            self._update_resource(
-                rid=rid,
-                conversations=conversations,
-                **kwargs,
-            )
-        return rid
 
     @kb
     def text(
@@ -204,24 +263,14 @@ class NucliaUpload:
                 "format": format,
             }
         }
-        extract_strategy = kwargs.get("extract_strategy")
+        extract_strategy, split_strategy = _strategy_ids(
+            kwargs["ndb"], kwargs.get("extract_strategy"), kwargs.get("split_strategy")
+        )
         if extract_strategy is not None:
             texts[field]["extract_strategy"] = extract_strategy
-        split_strategy = kwargs.get("split_strategy")
         if split_strategy is not None:
             texts[field]["split_strategy"] = split_strategy
-        rid, is_new_resource = self._get_or_create_resource(
-            texts=texts,
-            icon=icon,
-            **kwargs,
-        )
-        if not is_new_resource:
-            self._update_resource(
-                rid=rid,
-                texts=texts,
-                **kwargs,
-            )
-        return rid
+        return self._create_or_update_resource({"texts": texts}, icon=icon, **kwargs)
 
     @kb
     def link(
@@ -239,24 +288,16 @@ class NucliaUpload:
                 "css_selector": css_selector,
             }
         }
-        extract_strategy = kwargs.get("extract_strategy")
+        extract_strategy, split_strategy = _strategy_ids(
+            kwargs["ndb"], kwargs.get("extract_strategy"), kwargs.get("split_strategy")
+        )
         if extract_strategy is not None:
             links[field]["extract_strategy"] = extract_strategy
-        split_strategy = kwargs.get("split_strategy")
         if split_strategy is not None:
             links[field]["split_strategy"] = split_strategy
-        kwargs["icon"] = "application/stf-link"
-        rid, is_new_resource = self._get_or_create_resource(
-            links=links,
-            **kwargs,
+        return self._create_or_update_resource(
+            {"links": links, "icon": "application/stf-link"}, **kwargs
         )
-        if not is_new_resource:
-            self._update_resource(
-                rid=rid,
-                links=links,
-                **kwargs,
-            )
-        return rid
 
     @kb
     def remote(
@@ -273,6 +314,9 @@ class NucliaUpload:
     ) -> str:
         """Upload a remote url to a Nuclia KnowledgeBox"""
         ndb: NucliaDBClient = kwargs["ndb"]
+        extract_strategy, split_strategy = _strategy_ids(
+            ndb, extract_strategy, split_strategy
+        )
         with requests.get(origin, stream=True, allow_redirects=True) as r:
             try:
                 r.raise_for_status()
@@ -290,25 +334,39 @@ class NucliaUpload:
                 mimetype += "+aitable"
             if blanklineSplitter:
                 mimetype += "+blankline"
+            cached = _from_slug_cache(ndb.kbid, rid, kwargs.get("slug"))
             rid, is_new_resource = self._get_or_create_resource(
                 rid=rid, icon=mimetype, **kwargs
             )
+            upload: Dict[str, Any] = dict(
+                field=field,
+                size=size,
+                filename=filename,
+                content_type=mimetype,
+                extract_strategy=extract_strategy,
+                split_strategy=split_strategy,
+            )
             try:
-                upload_url = ndb.start_tus_upload(
-                    rid=rid,
-                    field=field,
-                    size=size,
-                    filename=filename,
-                    content_type=mimetype,
-                    extract_strategy=extract_strategy,
-                    split_strategy=split_strategy,
-                )
+                try:
+                    upload_url = ndb.start_tus_upload(rid=rid, **upload)
+                except Exception as exc:
+                    if not (cached and _resource_gone(exc)):
+                        raise
+                    # The cached resource was deleted: look it up or create
+                    # it again
+                    SLUG_CACHE.forget(ndb.kbid, rid=rid)
+                    rid, is_new_resource = self._get_or_create_resource(
+                        icon=mimetype, **kwargs
+                    )
+                    upload_url = ndb.start_tus_upload(rid=rid, **upload)
                 offset = 0
                 for _ in tqdm(range((size // CHUNK_SIZE) + 1)):
                     chunk = r.raw.read(CHUNK_SIZE)
                     offset = ndb.patch_tus_upload(upload_url, chunk, offset)
             except Exception:
                 logger.exception("Error uploading")
+                # The resource may be stale in the cache
+                SLUG_CACHE.forget(ndb.kbid, rid=rid)
                 if is_new_resource:
                     ndb.ndb.delete_resource(kbid=ndb.kbid, rid=rid)
                 raise
@@ -329,6 +387,9 @@ class NucliaUpload:
         slug = kwargs.get("slug")
         need_to_create_resource = slug is None
         if slug:
+            rid = SLUG_CACHE.rid(ndb.kbid, slug)
+            if rid is not None:
+                return (rid, False)
             try:
                 resource: Resource = ndb.ndb.get_resource_by_slug(
                     kbid=ndb.kbid, slug=slug
@@ -336,6 +397,7 @@ class NucliaUpload:
                 rid = resource.id
                 logger.warning(f"Using existing resource: {rid}")
                 need_to_create_resource = False
+                SLUG_CACHE.put(ndb.kbid, rid, slug)
             except exceptions.NotFoundError:
                 need_to_create_resource = True
         else:
@@ -351,11 +413,44 @@ class NucliaUpload:
                     kw[param] = kwargs.get(param)
             resource_created: ResourceCreated = ndb.ndb.create_resource(**kw)
             rid = resource_created.uuid
+            SLUG_CACHE.put(ndb.kbid, rid, slug)
             logger.warning(f"New resource created: {rid}")
 
         assert rid is not None
         return (rid, need_to_create_resource)
 
+    def _create_or_update_resource(
+        self,
+        fields: Dict[str, Any],
+        icon: Optional[str] = None,
+        rid: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """
+        Create the resource with `fields`, or update them if it exists. If
+        the resource found in `SLUG_CACHE` was deleted, it is looked up or
+        created again, once.
+
+        :param icon: icon of the resource, if it is created.
+        """
+        created = dict(fields, icon=icon) if icon else fields
+        cached = _from_slug_cache(kwargs["ndb"].kbid, rid, kwargs.get("slug"))
+        rid, is_new_resource = self._get_or_create_resource(
+            rid=rid, **created, **kwargs
+        )
+        if is_new_resource:
+            return rid
+        try:
+            self._update_resource(rid=rid, **fields, **kwargs)
+        except exceptions.NotFoundError:
+            if not cached:
+                raise
+            # `_update_resource` forgot the cached resource
+            rid, is_new_resource = self._get_or_create_resource(**created, **kwargs)
+            if not is_new_resource:
+                self._update_resource(rid=rid, **fields, **kwargs)
+        return rid
+
     @backoff.on_exception(
         backoff.expo,
         RateLimitError,
@@ -364,7 +459,12 @@ class NucliaUpload:
         factor=10,
     )
     def _update_resource(self, rid: str, **kwargs):
-        return NucliaResource().update(rid=rid, **kwargs)
+        try:
+            return NucliaResource().update(rid=rid, **kwargs)
+        except exceptions.NotFoundError:
+            # The resource may be stale in the cache
+            SLUG_CACHE.forget(kwargs["ndb"].kbid, rid=rid)
+            raise
 
 
 class AsyncNucliaUpload:
@@ -384,6 +484,8 @@ class AsyncNucliaUpload:
     - `origin`: Origin metadata.
         See https://docs.rag.progress.cloud/docs/api#tag/Resources/operation/Create_Resource_kb__kbid__resources_post
     - `extra`: user-defined metadata.
+    - `diff`: when `text`, `link` or `conversation` update an existing resource,
+        only send what differs from it, so unchanged fields are not processed again.
     """
 
     @property
@@ -408,6 +510,9 @@ class AsyncNucliaUpload:
     ) -> str:
         """Upload a file from filesystem to a Nuclia KnowledgeBox"""
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        extract_strategy, split_strategy = await _async_strategy_ids(
+            ndb, extract_strategy, split_strategy
+        )
         filename = path.split(os.sep)[-1]
         size = os.path.getsize(path)
         mimetype = mimetype or mimetypes.guess_type(path)[0]
@@ -417,6 +522,7 @@ class AsyncNucliaUpload:
             mimetype += "+aitable"
         if blanklineSplitter:
             mimetype += "+blankline"
+        cached = _from_slug_cache(ndb.kbid, rid, kwargs.get("slug"))
         rid, is_new_resource = await self._get_or_create_resource(
             rid=rid, icon=mimetype, **kwargs
         )
@@ -427,19 +533,30 @@ class AsyncNucliaUpload:
         async with aiofiles.open(path, "rb") as upload_file:
             md5_hash.update(await upload_file.read())
 
+        upload: Dict[str, Any] = dict(
+            field=field,
+            size=size,
+            filename=filename,
+            content_type=mimetype,
+            md5=md5_hash.hexdigest(),
+            extract_strategy=extract_strategy,
+            split_strategy=split_strategy,
+            language=language,
+        )
         async with aiofiles.open(path, "rb") as upload_file:
             try:
-                upload_url = await ndb.start_tus_upload(
-                    rid=rid,
-                    field=field,
-                    size=size,
-                    filename=filename,
-                    content_type=mimetype,
-                    md5=md5_hash.hexdigest(),
-                    extract_strategy=extract_strategy,
-                    split_strategy=split_strategy,
-                    language=language,
-                )
+                try:
+                    upload_url = await ndb.start_tus_upload(rid=rid, **upload)
+                except Exception as exc:
+                    if not (cached and _resource_gone(exc)):
+                        raise
+                    # The cached resource was deleted: look it up or create
+                    # it again
+                    SLUG_CACHE.forget(ndb.kbid, rid=rid)
+                    rid, is_new_resource = await self._get_or_create_resource(
+                        icon=mimetype, **kwargs
+                    )
+                    upload_url = await ndb.start_tus_upload(rid=rid, **upload)
                 offset = 0
                 for _ in tqdm(range((size // CHUNK_SIZE) + 1)):
                     chunk = await upload_file.read(CHUNK_SIZE)
@@ -448,6 +565,8 @@ class AsyncNucliaUpload:
                     )
             except Exception:
                 logger.exception("Error on uploading")
+                # The resource may be stale in the cache
+                SLUG_CACHE.forget(ndb.kbid, rid=rid)
                 if is_new_resource:
                     await ndb.ndb.delete_resource(kbid=ndb.kbid, rid=rid)
                 raise
@@ -491,17 +610,9 @@ class AsyncNucliaUpload:
             }
         }
 
-        rid, is_new_resource = await self._get_or_create_resource(
-            conversations=conversations,
-            **kwargs,
+        return await self._create_or_update_resource(
+            {"conversations": conversations}, **kwargs
         )
-        if not is_new_resource:
-            await self._update_resource(
-                rid=rid,
-                conversations=conversations,
-                **kwargs,
-            )
-        return rid
 
     @kb
     async def text(
@@ -535,24 +646,16 @@ class AsyncNucliaUpload:
                 "format": format,
             }
         }
-        extract_strategy = kwargs.get("extract_strategy")
+        extract_strategy, split_strategy = await _async_strategy_ids(
+            kwargs["ndb"], kwargs.get("extract_strategy"), kwargs.get("split_strategy")
+        )
         if extract_strategy is not None:
             texts[field]["extract_strategy"] = extract_strategy
-        split_strategy = kwargs.get("split_strategy")
         if split_strategy is not None:
             texts[field]["split_strategy"] = split_strategy
-        rid, is_new_resource = await self._get_or_create_resource(
-            texts=texts,
-            icon=icon,
-            **kwargs,
+        return await self._create_or_update_resource(
+            {"texts": texts}, icon=icon, **kwargs
         )
-        if not is_new_resource:
-            await self._update_resource(
-                rid=rid,
-                texts=texts,
-                **kwargs,
-            )
-        return rid
 
     @kb
     async def link(
@@ -568,24 +671,16 @@ class AsyncNucliaUpload:
                 "uri": uri,
             }
         }
-        extract_strategy = kwargs.get("extract_strategy")
+        extract_strategy, split_strategy = await _async_strategy_ids(
+            kwargs["ndb"], kwargs.get("extract_strategy"), kwargs.get("split_strategy")
+        )
         if extract_strategy is not None:
             links[field]["extract_strategy"] = extract_strategy
-        split_strategy = kwargs.get("split_strategy")
         if split_strategy is not None:
             links[field]["split_strategy"] = split_strategy
-        kwargs["icon"] = "application/stf-link"
-        rid, is_new_resource = await self._get_or_create_resource(
-            links=links,
-            **kwargs,
+        return await self._create_or_update_resource(
+            {"links": links, "icon": "application/stf-link"}, **kwargs
         )
-        if not is_new_resource:
-            await self._update_resource(
-                rid=rid,
-                links=links,
-                **kwargs,
-            )
-        return rid
 
     @kb
     async def remote(
@@ -602,6 +697,9 @@ class AsyncNucliaUpload:
     ) -> str:
         """Upload a remote url to a Nuclia KnowledgeBox"""
         ndb: AsyncNucliaDBClient = kwargs["ndb"]
+        extract_strategy, split_strategy = await _async_strategy_ids(
+            ndb, extract_strategy, split_strategy
+        )
         client = build_httpx_async_client()
         async with client.stream("GET", origin, follow_redirects=True) as r:
             filename = origin.split(os.sep)[-1]
@@ -614,19 +712,31 @@ class AsyncNucliaUpload:
                 mimetype += "+aitable"
             if blanklineSplitter:
                 mimetype += "+blankline"
+            cached = _from_slug_cache(ndb.kbid, rid, kwargs.get("slug"))
             rid, is_new_resource = await self._get_or_create_resource(
                 rid=rid, icon=mimetype, **kwargs
             )
+            upload: Dict[str, Any] = dict(
+                field=field,
+                size=size,
+                filename=filename,
+                content_type=mimetype,
+                extract_strategy=extract_strategy,
+                split_strategy=split_strategy,
+            )
             try:
-                upload_url = await ndb.start_tus_upload(
-                    rid=rid,
-                    field=field,
-                    size=size,
-                    filename=filename,
-                    content_type=mimetype,
-                    extract_strategy=extract_strategy,
-                    split_strategy=split_strategy,
-                )
+                try:
+                    upload_url = await ndb.start_tus_upload(rid=rid, **upload)
+                except Exception as exc:
+                    if not (cached and _resource_gone(exc)):
+                        raise
+                    # The cached resource was deleted: look it up or create
+                    # it again
+                    SLUG_CACHE.forget(ndb.kbid, rid=rid)
+                    rid, is_new_resource = await self._get_or_create_resource(
+                        icon=mimetype, **kwargs
+                    )
+                    upload_url = await ndb.start_tus_upload(rid=rid, **upload)
                 offset = 0
                 with tqdm(total=(size // CHUNK_SIZE) + 1) as p_bar:
                     async for chunk in r.aiter_raw(CHUNK_SIZE):
@@ -635,6 +745,8 @@ class AsyncNucliaUpload:
 
             except Exception:
                 logger.exception("Error on uploading")
+                # The resource may be stale in the cache
+                SLUG_CACHE.forget(ndb.kbid, rid=rid)
                 if is_new_resource:
                     await ndb.ndb.delete_resource(kbid=ndb.kbid, rid=rid)
                 raise
@@ -648,6 +760,9 @@ class AsyncNucliaUpload:
         slug = kwargs.get("slug")
         need_to_create_resource = slug is None
         if slug:
+            rid = SLUG_CACHE.rid(ndb.kbid, slug)
+            if rid is not None:
+                return (rid, False)
             try:
                 resource: Resource = await ndb.ndb.get_resource_by_slug(
                     kbid=ndb.kbid, slug=slug
@@ -655,6 +770,7 @@ class AsyncNucliaUpload:
                 rid = resource.id
                 logger.warning(f"Using existing resource: {rid}")
                 need_to_create_resource = False
+                SLUG_CACHE.put(ndb.kbid, rid, slug)
             except exceptions.NotFoundError:
                 need_to_create_resource = True
         else:
@@ -670,10 +786,63 @@ class AsyncNucliaUpload:
                     kw[param] = kwargs.get(param)
             resource_created: ResourceCreated = await ndb.ndb.create_resource(**kw)
             rid = resource_created.uuid
+            SLUG_CACHE.put(ndb.kbid, rid, slug)
             logger.warning(f"New resource created: {rid}")
 
         assert rid is not None
         return (rid, need_to_create_resource)
 
+    async def _create_or_update_resource(
+        self,
+        fields: Dict[str, Any],
+        icon: Optional[str] = None,
+        rid: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        """
+        Create the resource with `fields`, or update them if it exists. If
+        the resource found in `SLUG_CACHE` was deleted, it is looked up or
+        created again, once.
+
+        :param icon: icon of the resource, if it is created.
+        """
+        created = dict(fields, icon=icon) if icon else fields
+        cached = _from_slug_cache(kwargs["ndb"].kbid, rid, kwargs.get("slug"))
+        rid, is_new_resource = await self._get_or_create_resource(
+            rid=rid, **created, **kwargs
+        )
+        if is_new_resource:
+            return rid
+        try:
+            await self._update_resource(rid=rid, **fields, **kwargs)
+        except exceptions.NotFoundError:
+            if not cached:
+                raise
+            # `_update_resource` forgot the cached resource
+            rid, is_new_resource = await self._get_or_create_resource(
+                **created, **kwargs
+            )
+            if not is_new_resource:
+                await self._update_resource(rid=rid, **fields, **kwargs)
+        return rid
+
     async def _update_resource(self, rid: str, **kwargs):
-        return await AsyncNucliaResource().update(rid=rid, **kwargs)
+        try:
+            return await AsyncNucliaResource().update(rid=rid, **kwargs)
+        except exceptions.NotFoundError:
+            # The resource may be stale in the cache
+            SLUG_CACHE.forget(kwargs["ndb"].kbid, rid=rid)
+            raise
+
+
+def _from_slug_cache(kbid: str, rid: Optional[str], slug: Optional[str]) -> bool:
+    """Whether `_get_or_create_resource` takes the resource from SLUG_CACHE"""
+    if rid or not slug:
+        return False
+    return SLUG_CACHE.rid(kbid, slug) is not None
+
+
+def _resource_gone(exc: Exception) -> bool:
+    if isinstance(exc, exceptions.NotFoundError):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 404
@@ -274,6 +274,8 @@ async def test_search_query_type_check(
         search.catalog(query=query)
     with pytest.raises(TypeError):
         search.ask(query=query)
+    with pytest.raises(TypeError):
+        list(search.ask_stream(query=query))
     with pytest.raises(TypeError):
         search.ask_json(schema={}, query=query)
     with pytest.raises(TypeError):
@@ -311,6 +313,8 @@ async def test_search_query_validation_errors(
         search.catalog(query=query)
     with pytest.raises(ValidationError):
         search.ask(query=query)
+    with pytest.raises(ValidationError):
+        list(search.ask_stream(query=query))
     with pytest.raises(ValidationError):
         search.ask_json(schema={}, query=query)
     with pytest.raises(ValidationError):
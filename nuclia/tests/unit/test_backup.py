@@ -0,0 +1,105 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from nuclia.sdk.backup import NucliaBackup, _group_by_zone
+
+ACCOUNT_ID = str(uuid.uuid4())
+
+
+def test_create_many_groups_by_zone_and_waits(monkeypatch, tmp_path):
+    monkeypatch.setattr("nuclia.sdk.backup.BACKUP_STATUS_CHECK_INTERVAL_S", 0)
+    kbs = {str(uuid.uuid4()): "europe-1", str(uuid.uuid4()): "aws-us-east-2-1"}
+    created: dict[str, str] = {}
+    list_calls: list[str] = []
+    started = datetime(2026, 1, 1)
+
+    def request(method, path, data=None):
+        if method == "POST":
+            backup_id = str(uuid.uuid4())
+            created[backup_id] = data["kb_id"]
+            return {"id": backup_id}
+        list_calls.append(path)
+        finished = len(list_calls) > len(kbs)
+        return [
+            {
+                "id": backup_id,
+                "account_id": ACCOUNT_ID,
+                "started_at": started.isoformat(),
+                "finished_at": (started + timedelta(seconds=30)).isoformat()
+                if finished
+                else None,
+                "size": 1024 if finished else None,
+                "kb_data": {
+                    "id": kb_id,
+                    "slug": "kb",
+                    "title": "KB",
+                    "created": started.isoformat(),
+                },
+            }
+            for backup_id, kb_id in created.items()
+            if kbs[kb_id] in path
+        ]
+
+    auth = Mock()
+    auth.resolve_zone_endpoint.side_effect = lambda zone: (zone, None)
+    auth._request.side_effect = request
+    monkeypatch.setattr("nuclia.sdk.backup.get_auth", lambda: auth)
+    monkeypatch.setattr("nuclia.decorators.get_auth", lambda: auth)
+
+    manifest_path = tmp_path / "manifest.json"
+    manifest = NucliaBackup().create_many(
+        [{"kb_id": kb_id, "zone": zone} for kb_id, zone in kbs.items()],
+        account_id=ACCOUNT_ID,
+        zone="europe-1",
+        manifest=str(manifest_path),
+    )
+
+    assert auth.resolve_zone_endpoint.call_count == 2
+    assert len(manifest.entries) == 2
+    assert manifest.pending == []
+    assert all(entry.size == 1024 for entry in manifest.entries)
+    assert all(entry.duration == 30 for entry in manifest.entries)
+    # One status check per zone and round
+    assert len(list_calls) == 4
+    written = json.loads(manifest_path.read_text())
+    assert {entry["kb_id"] for entry in written["entries"]} == set(kbs)
+
+
+def test_group_by_zone_validates_items():
+    with pytest.raises(ValueError, match="kb_id is required"):
+        _group_by_zone(["kb1", {"zone": "europe-1"}], "europe-1", "kb_id")
+    with pytest.raises(ValueError, match="zone is required for kb1"):
+        _group_by_zone(["kb1"], None, "kb_id")
+
+
+def test_create_many_timeout(monkeypatch, tmp_path):
+    monkeypatch.setattr("nuclia.sdk.backup.BACKUP_STATUS_CHECK_INTERVAL_S", 0)
+    backup_id = str(uuid.uuid4())
+
+    def request(method, path, data=None):
+        if method == "POST":
+            return {"id": backup_id}
+        return []
+
+    auth = Mock()
+    auth.resolve_zone_endpoint.side_effect = lambda zone: (zone, None)
+    auth._request.side_effect = request
+    monkeypatch.setattr("nuclia.sdk.backup.get_auth", lambda: auth)
+    monkeypatch.setattr("nuclia.decorators.get_auth", lambda: auth)
+
+    manifest_path = tmp_path / "manifest.json"
+    with pytest.raises(TimeoutError, match=backup_id):
+        NucliaBackup().create_many(
+            [str(uuid.uuid4())],
+            account_id=ACCOUNT_ID,
+            zone="europe-1",
+            timeout=0.01,
+            manifest=str(manifest_path),
+        )
+
+    written = json.loads(manifest_path.read_text())
+    assert written["entries"][0]["backup_id"] == backup_id
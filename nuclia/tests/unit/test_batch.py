@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from nuclia.lib.batch import async_run_batch, run_batch
+
+
+def test_run_batch_keeps_order_and_captures_errors():
+    def func(value: int) -> int:
+        if value == 3:
+            raise ValueError("boom")
+        time.sleep(0.01 * (5 - value))
+        return value * 2
+
+    results = list(run_batch(func, range(5), concurrency=3))
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.value for r in results if r.ok] == [0, 2, 4, 8]
+    assert isinstance(results[3].error, ValueError)
+
+
+def test_run_batch_unordered_yields_as_completed():
+    def func(value: int) -> int:
+        time.sleep(0.05 if value == 0 else 0)
+        return value
+
+    results = list(run_batch(func, range(4), concurrency=4, ordered=False))
+
+    assert sorted(r.value for r in results) == [0, 1, 2, 3]
+    assert results[-1].value == 0
+
+
+def test_run_batch_bounds_concurrency():
+    running = []
+    peak = []
+
+    def func(value: int) -> int:
+        running.append(value)
+        peak.append(len(running))
+        time.sleep(0.01)
+        running.remove(value)
+        return value
+
+    list(run_batch(func, range(20), concurrency=3))
+
+    assert max(peak) <= 3
+
+
+async def test_async_run_batch():
+    async def func(value: int) -> int:
+        await asyncio.sleep(0.01 * (5 - value))
+        if value == 1:
+            raise ValueError("boom")
+        return value
+
+    results = [r async for r in async_run_batch(func, range(5), concurrency=2)]
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert not results[1].ok
+    assert [r.value for r in results if r.ok] == [0, 2, 3, 4]
+
+    unordered = [
+        r async for r in async_run_batch(func, range(5), concurrency=5, ordered=False)
+    ]
+    assert [r.index for r in unordered] == [4, 3, 2, 1, 0]
+
+
+async def test_async_run_batch_async_items():
+    async def items():
+        for value in range(5):
+            yield value
+
+    async def func(value: int) -> int:
+        return value * 2
+
+    results = [r async for r in async_run_batch(func, items(), concurrency=2)]
+
+    assert [r.value for r in results] == [0, 2, 4, 6, 8]
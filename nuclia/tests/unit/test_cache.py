@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, Mock
+
+from nucliadb_models.search import CatalogRequest, CatalogResponse, FindRequest
+
+from nuclia.lib import cache as cache_module
+from nuclia.lib.cache import (
+    AsyncCacheInvalidator,
+    CacheInvalidator,
+    QueryCache,
+    request_hash,
+)
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+
+def written(rid: str, seqid: int = 1) -> str:
+    return json.dumps(
+        {"type": "resource_written", "data": {"resource_uuid": rid, "seqid": seqid}}
+    )
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        yield from self.lines
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_request_hash_is_canonical():
+    first = FindRequest.model_validate({"query": "q", "top_k": 5})
+    second = FindRequest.model_validate({"top_k": 5, "query": "q"})
+    assert request_hash("find", first) == request_hash("find", second)
+    assert request_hash("find", first) != request_hash("search", first)
+    assert request_hash("find", first) != request_hash(
+        "find", FindRequest(query="q", top_k=6)
+    )
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.put(("kb", "a"), 1)
+    cache.put(("kb", "b"), 2)
+    assert cache.get(("kb", "a")) == (True, 1)
+    cache.put(("kb", "c"), 3)
+
+    assert cache.get(("kb", "b")) == (False, None)
+    assert cache.get(("kb", "a")) == (True, 1)
+    assert cache.metrics.evictions == 1
+    assert cache.metrics.entries == 2
+
+
+def test_size_bound():
+    cache = QueryCache(max_bytes=2 * cache_module._size_of(CatalogRequest()))
+    for index in range(3):
+        cache.put(("kb", str(index)), CatalogRequest())
+
+    assert cache.metrics.entries == 2
+    assert cache.metrics.size <= cache.max_bytes
+
+
+def test_size_estimate():
+    text = "x" * 100
+    assert cache_module._size_of(text) == 100
+    assert cache_module._size_of([text] * 1000) == 100_000
+    assert cache_module._size_of({"a": text}) == 101
+    assert cache_module._size_of(CatalogRequest(query=text)) > 100
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = QueryCache(ttl=10)
+    cache.put(("kb", "a"), 1)
+    now[0] += 11
+
+    assert cache.get(("kb", "a")) == (False, None)
+    assert cache.metrics.expirations == 1
+
+
+def test_invalidate_on_notification():
+    cache = QueryCache()
+    cache.put(("kb1", "a"), 1)
+    cache.put(("kb2", "a"), 2)
+
+    cache.on_notification("kb1", "resource_processed")
+    assert cache.metrics.entries == 2
+    cache.on_notification("kb1", "resource_written")
+    assert cache.get(("kb1", "a")) == (False, None)
+    assert cache.get(("kb2", "a")) == (True, 2)
+
+
+def test_results_fetched_before_invalidation_are_not_stored():
+    cache = QueryCache()
+    request = FindRequest(query="q")
+
+    def call():
+        cache.invalidate("kbid")
+        return "stale"
+
+    assert cache.get_or_call("kbid", "find", request, call) == "stale"
+    assert cache.metrics.entries == 0
+
+    # Invalidating another KB does not prevent storing
+    def other_kb():
+        cache.invalidate("other")
+        return "fresh"
+
+    cache.get_or_call("kbid", "find", request, other_kb)
+    assert cache.get_or_call("kbid", "find", request, call) == "fresh"
+
+
+def test_find_is_cached():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.find.return_value = "results"
+    search = NucliaSearch(cache=QueryCache())
+
+    assert search.find(query="q", ndb=ndb) == "results"
+    assert search.find(query="q", ndb=ndb) == "results"
+    search.find(query="other", ndb=ndb)
+
+    assert ndb.ndb.find.call_count == 2
+    metrics = search.cache.metrics
+    assert (metrics.hits, metrics.misses) == (1, 2)
+    assert metrics.hit_ratio == 1 / 3
+
+
+def test_find_without_cache():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    search = NucliaSearch()
+    search.find(query="q", ndb=ndb)
+    search.find(query="q", ndb=ndb)
+    assert ndb.ndb.find.call_count == 2
+
+
+def test_cache_invalidator():
+    cache = QueryCache()
+    cache.put(("kbid", "a"), 1)
+    stream = FakeStream([written("rid")])
+    consumed = threading.Event()
+
+    def connect():
+        if consumed.is_set():
+            raise ConnectionError("closed")
+        consumed.set()
+        return stream
+
+    invalidator = CacheInvalidator(cache, "kbid", connect)
+    invalidator.start()
+    assert consumed.wait(timeout=5)
+    invalidator.stop()
+
+    assert cache.get(("kbid", "a")) == (False, None)
+    assert stream.closed
+
+
+async def test_async_invalidation_on_changes():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.catalog = AsyncMock(return_value=CatalogResponse())
+    changes = asyncio.Event()
+
+    streams = [FakeStream([written("rid")])]
+
+    async def notifications():
+        await changes.wait()
+        if not streams:
+            await asyncio.Event().wait()
+        return streams.pop()
+
+    ndb.notifications = notifications
+    search = AsyncNucliaSearch(cache=QueryCache())
+    invalidator = await search.invalidate_cache_on_changes(ndb=ndb)
+
+    await search.catalog(query="q", ndb=ndb)
+    await search.catalog(query="q", ndb=ndb)
+    assert ndb.ndb.catalog.call_count == 1
+
+    changes.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    await search.catalog(query="q", ndb=ndb)
+    assert ndb.ndb.catalog.call_count == 2
+    await invalidator.stop()
+    assert isinstance(invalidator, AsyncCacheInvalidator)
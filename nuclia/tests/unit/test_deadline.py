@@ -0,0 +1,104 @@
+import asyncio
+from typing import Dict
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from nucliadb_models.search import CatalogResponse
+
+from nuclia import decorators
+from nuclia.exceptions import NucliaTimeoutError
+from nuclia.sdk.search import AsyncNucliaSearch
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    return ndb
+
+
+async def test_find_deadline_cancels_the_request():
+    cancelled = asyncio.Event()
+
+    async def find(req, kbid):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    ndb = ndb_mock()
+    ndb.ndb.find = find
+
+    with pytest.raises(NucliaTimeoutError, match="find"):
+        await AsyncNucliaSearch().find(query="q", ndb=ndb, deadline=0.05)
+    assert cancelled.is_set()
+
+
+async def test_deadline_includes_client_construction(monkeypatch):
+    auth = Mock()
+    auth._config.get_default_kb.return_value = "kbid"
+
+    async def get_async_client(kbid):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(decorators, "get_async_auth", lambda: auth)
+    monkeypatch.setattr(decorators, "get_async_client", get_async_client)
+
+    with pytest.raises(NucliaTimeoutError):
+        await AsyncNucliaSearch().search(query="q", deadline=0.05)
+
+
+async def test_without_deadline():
+    ndb = ndb_mock()
+    results = CatalogResponse()
+    ndb.ndb.catalog = AsyncMock(return_value=results)
+    assert await AsyncNucliaSearch().catalog(query="q", ndb=ndb) is results
+
+
+class StreamResponse:
+    def __init__(self, lines, delay: float = 0):
+        self.lines = lines
+        self.delay = delay
+        self.closed = False
+        self.headers: Dict[str, str] = {}
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            await asyncio.sleep(self.delay)
+            yield line
+
+    async def aclose(self):
+        self.closed = True
+
+
+ANSWER = '{"item": {"type": "answer", "text": "hi"}}'
+
+
+async def test_ask_stream_closes_response_when_abandoned():
+    response = StreamResponse([ANSWER] * 3)
+    ndb = ndb_mock()
+    ndb.ask = AsyncMock(return_value=response)
+
+    stream = AsyncNucliaSearch().ask_stream(query="q", ndb=ndb)
+    async for item in stream:
+        assert item.item.text == "hi"
+        break
+    await stream.aclose()
+
+    assert response.closed
+
+
+async def test_ask_stream_deadline():
+    response = StreamResponse([ANSWER] * 10, delay=0.03)
+    ndb = ndb_mock()
+    ndb.ask = AsyncMock(return_value=response)
+    items = []
+
+    with pytest.raises(NucliaTimeoutError):
+        async for item in AsyncNucliaSearch().ask_stream(
+            query="q", ndb=ndb, deadline=0.1
+        ):
+            items.append(item)
+
+    assert 0 < len(items) < 10
+    assert response.closed
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import re
+from typing import List, Optional
+
+import httpx
+import pytest
+
+from nuclia.exceptions import DownloadError
+from nuclia.lib import download as download_module
+from nuclia.lib.download import async_download, download, segment_ranges
+
+CONTENT = bytes(range(256)) * 400
+MD5 = hashlib.md5(CONTENT).hexdigest()
+
+
+def serve(headers, ranges: bool = True):
+    """Status and body of a GET of CONTENT"""
+    match = re.match(r"bytes=(\d+)-(\d*)", headers.get("Range", ""))
+    if not match or not ranges:
+        return 200, CONTENT
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else len(CONTENT) - 1
+    if start >= len(CONTENT):
+        return 416, b""
+    return 206, CONTENT[start : end + 1]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: bytes, fail_after: Optional[int]):
+        self.status_code = status_code
+        self.body = body
+        self.fail_after = fail_after
+        self.text = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise ConnectionError("connection lost")
+            yield self.body[start : start + chunk_size]
+
+
+class FakeSession:
+    def __init__(self, ranges: bool = True, fail_after: Optional[int] = None):
+        self.ranges = ranges
+        self.fail_after = fail_after
+        self.requests: List[Optional[str]] = []
+
+    def get(self, url, headers, stream):
+        self.requests.append(headers.get("Range"))
+        status_code, body = serve(headers, self.ranges)
+        fail_after, self.fail_after = self.fail_after, None
+        return FakeResponse(status_code, body, fail_after)
+
+
+def test_segment_ranges():
+    size = 40 * 1024 * 1024
+    assert segment_ranges(size, 1) == [(0, size - 1)]
+    assert segment_ranges(size, 4) == [
+        (0, size // 2 - 1),
+        (size // 2, size - 1),
+    ]
+
+
+def test_download_resumes_part_file(tmp_path):
+    output = str(tmp_path / "file.bin")
+    session = FakeSession(fail_after=4096)
+
+    with pytest.raises(ConnectionError):
+        download(session, "url", output, chunk_size=1024)
+    assert os.path.getsize(output + ".part") == 4096
+    assert not os.path.exists(output)
+
+    download(session, "url", output, size=len(CONTENT), md5=MD5, chunk_size=1024)
+
+    assert session.requests == [None, "bytes=4096-"]
+    assert open(output, "rb").read() == CONTENT
+    assert not os.path.exists(output + ".part")
+
+
+def test_download_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_module, "MIN_SEGMENT_SIZE", 10_000)
+    output = str(tmp_path / "file.bin")
+    session = FakeSession()
+
+    download(session, "url", output, size=len(CONTENT), md5=MD5, segments=4)
+
+    assert sorted(session.requests) == [
+        "bytes=0-25599",
+        "bytes=25600-51199",
+        "bytes=51200-76799",
+        "bytes=76800-102399",
+    ]
+    assert open(output, "rb").read() == CONTENT
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+def test_download_without_range_support(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_module, "MIN_SEGMENT_SIZE", 10_000)
+    output = str(tmp_path / "file.bin")
+
+    download(FakeSession(ranges=False), "url", output, size=len(CONTENT), segments=4)
+
+    assert open(output, "rb").read() == CONTENT
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+def test_download_verifies_md5(tmp_path):
+    output = str(tmp_path / "file.bin")
+    with pytest.raises(DownloadError, match="md5"):
+        download(FakeSession(), "url", output, md5="0" * 32)
+    assert os.listdir(tmp_path) == []
+
+
+async def test_async_download_resumes_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_module, "MIN_SEGMENT_SIZE", 10_000)
+    output = str(tmp_path / "file.bin")
+    # First segment half downloaded by a previous call
+    with open(output + ".part0", "wb") as part:
+        part.write(CONTENT[:20_000])
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.headers.get("Range"))
+        status_code, body = serve(request.headers)
+        return httpx.Response(status_code, content=body)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await async_download(
+            client,
+            "http://nuclia/file",
+            output,
+            size=len(CONTENT),
+            md5=MD5,
+            segments=2,
+        )
+
+    assert sorted(requested) == ["bytes=20000-51199", "bytes=51200-102399"]
+    assert open(output, "rb").read() == CONTENT
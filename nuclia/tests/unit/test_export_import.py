@@ -1,9 +1,17 @@
+import os
 from unittest.mock import Mock
 
+import httpx
 import pytest
-from nucliadb_models.export_import import Status
+from nucliadb_models.export_import import CreateImportResponse, Status
+from nucliadb_sdk import exceptions
 
-from nuclia.sdk.export_import import wait_for_task_to_finish
+from nuclia.sdk.export_import import (
+    AsyncReadAheadReader,
+    NucliaImports,
+    ReadAheadReader,
+    wait_for_task_to_finish,
+)
 
 
 class FakeStatusResponse:
@@ -40,3 +48,83 @@ def ndb(ndb_sdk):
 def test_wait_for_task_to_finish(ndb):
     wait_for_task_to_finish(ndb, "export", "foo")
     wait_for_task_to_finish(ndb, "import", "foo")
+
+
+def test_read_ahead_reader(tmp_path):
+    path = tmp_path / "export"
+    data = os.urandom(10_000)
+    path.write_bytes(data)
+
+    with ReadAheadReader(str(path), chunk_size=1024, prefetch=2) as reader:
+        chunks = list(reader.chunks())
+
+    assert b"".join(chunks) == data
+    assert len(chunks) == 10
+    assert reader.bytes_read == len(data)
+    assert reader.throughput > 0
+
+
+async def test_async_read_ahead_reader(tmp_path):
+    path = tmp_path / "export"
+    data = os.urandom(10_000)
+    path.write_bytes(data)
+
+    async with AsyncReadAheadReader(str(path), chunk_size=1024, prefetch=2) as reader:
+        chunks = [chunk async for chunk in reader.chunks()]
+
+    assert b"".join(chunks) == data
+    assert reader.bytes_read == len(data)
+
+
+def test_import_retries_from_the_beginning(tmp_path, ndb, monkeypatch):
+    monkeypatch.setattr("nuclia.sdk.export_import.IMPORT_RETRY_FACTOR", 0)
+    path = tmp_path / "export"
+    data = os.urandom(5_000)
+    path.write_bytes(data)
+    uploaded = []
+
+    def start_import(kbid, content):
+        if not uploaded:
+            uploaded.append(next(content))
+            raise httpx.WriteError("connection reset")
+        uploaded.append(b"".join(content))
+        return CreateImportResponse(import_id="import-id")
+
+    ndb.ndb.start_import = Mock(side_effect=start_import)
+
+    response = NucliaImports().start(path=str(path), ndb=ndb)
+
+    assert response.import_id == "import-id"
+    assert uploaded[1] == data
+
+
+@pytest.mark.parametrize(
+    "error,sent,tries",
+    [
+        (httpx.ReadTimeout("timeout"), True, 1),
+        (httpx.ReadTimeout("timeout"), False, 1),
+        (httpx.ConnectError("refused"), False, 3),
+        (httpx.WriteError("reset"), True, 1),
+        (
+            exceptions.UnknownError("Unknown error connecting to API: 503: down"),
+            False,
+            1,
+        ),
+        (exceptions.RateLimitError("slow down"), False, 1),
+    ],
+)
+def test_import_retriable_errors(tmp_path, ndb, monkeypatch, error, sent, tries):
+    monkeypatch.setattr("nuclia.sdk.export_import.IMPORT_RETRY_FACTOR", 0)
+    path = tmp_path / "export"
+    path.write_bytes(os.urandom(5_000))
+
+    def start_import(kbid, content):
+        if sent:
+            b"".join(content)
+        raise error
+
+    ndb.ndb.start_import = Mock(side_effect=start_import)
+
+    with pytest.raises(type(error)):
+        NucliaImports().start(path=str(path), ndb=ndb)
+    assert ndb.ndb.start_import.call_count == tries
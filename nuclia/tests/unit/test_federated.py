@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from nucliadb_models.search import KnowledgeboxFindResults
+
+from nuclia.exceptions import KBNotAvailable
+from nuclia.lib.federated import ScoreNormalization, kb_paragraphs, merge_top_k
+from nuclia.sdk import search as search_module
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+
+def find_results(scores) -> KnowledgeboxFindResults:
+    return KnowledgeboxFindResults.model_validate(
+        {
+            "resources": {
+                "rid": {
+                    "id": "rid",
+                    "fields": {
+                        "/a/title": {
+                            "paragraphs": {
+                                pid: {
+                                    "score": score,
+                                    "score_type": "BM25",
+                                    "order": order,
+                                    "text": pid,
+                                    "id": pid,
+                                }
+                                for order, (pid, score) in enumerate(scores)
+                            }
+                        }
+                    },
+                }
+            }
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "normalization,expected",
+    [
+        (ScoreNormalization.MINMAX, {"a": 1.0, "b": 0.5, "c": 0.0}),
+        (ScoreNormalization.RANK, {"a": 1 / 61, "b": 1 / 62, "c": 1 / 63}),
+        (ScoreNormalization.NONE, {"a": 30.0, "b": 20.0, "c": 10.0}),
+    ],
+)
+def test_normalization(normalization, expected):
+    results = find_results([("a", 30.0), ("b", 20.0), ("c", 10.0)])
+    paragraphs = kb_paragraphs("kb", results, normalization)
+    assert {p.paragraph.id: p.score for p in paragraphs} == pytest.approx(expected)
+
+
+def test_merge_top_k():
+    first = kb_paragraphs("kb1", find_results([("a", 9.0), ("b", 5.0), ("c", 1.0)]))
+    second = kb_paragraphs("kb2", find_results([("d", 0.8), ("e", 0.1)]))
+    merged = merge_top_k([first, second], 3)
+    assert [(p.kbid, p.paragraph.id) for p in merged] == [
+        ("kb1", "a"),
+        ("kb2", "d"),
+        ("kb1", "b"),
+    ]
+
+
+def test_merge_single_result_kb():
+    single = kb_paragraphs("kb1", find_results([("a", 42.0)]))
+    many = kb_paragraphs("kb2", find_results([("b", 9.0), ("c", 6.0), ("d", 1.0)]))
+
+    assert single[0].score == 0.5
+    merged = merge_top_k([single, many], 4)
+    assert [(p.kbid, p.paragraph.id) for p in merged] == [
+        ("kb2", "b"),
+        ("kb2", "c"),
+        ("kb1", "a"),
+        ("kb2", "d"),
+    ]
+
+
+def kb_client(kbid: str, find) -> Mock:
+    client = Mock()
+    client.kbid = kbid
+    client.ndb.find.side_effect = find
+    return client
+
+
+def test_find_federated_returns_partial_results(monkeypatch):
+    release = threading.Event()
+
+    def slow_find(req, kbid):
+        release.wait(timeout=5)
+        return find_results([("late", 1.0)])
+
+    def failing_find(req, kbid):
+        raise ValueError("boom")
+
+    clients = {
+        "kb1": kb_client("kb1", lambda req, kbid: find_results([("a", 2.0)])),
+        "kb2": kb_client("kb2", slow_find),
+        "kb3": kb_client("kb3", failing_find),
+    }
+
+    def get_client(kbid):
+        if kbid not in clients:
+            raise KBNotAvailable(kbid)
+        return clients[kbid]
+
+    monkeypatch.setattr(search_module, "get_client", Mock(side_effect=get_client))
+    search = NucliaSearch()
+
+    start = time.monotonic()
+    results = search.find_federated(
+        kbids=["kb1", "kb2", "kb3", "kb4"], query="q", top_k=5, timeout=0.2
+    )
+    release.set()
+
+    assert time.monotonic() - start < 2
+    assert [p.paragraph.id for p in results.paragraphs] == ["a"]
+    assert list(results.results) == ["kb1"]
+    assert isinstance(results.errors["kb2"], TimeoutError)
+    assert isinstance(results.errors["kb3"], ValueError)
+    assert isinstance(results.errors["kb4"], KBNotAvailable)
+    assert clients["kb1"].ndb.find.call_args.args[0].top_k == 5
+
+    # Clients are reused by the next calls
+    search.find_federated(kbids=["kb1"], query="q")
+    assert search_module.get_client.call_count == 4
+
+
+async def test_async_find_federated_runs_concurrently(monkeypatch):
+    def client(kbid: str, delay: float, scores) -> Mock:
+        async def find(req, kbid):
+            await asyncio.sleep(delay)
+            return find_results(scores)
+
+        return kb_client(kbid, find)
+
+    clients = {
+        "kb1": client("kb1", 0.1, [("a", 3.0), ("b", 1.0)]),
+        "kb2": client("kb2", 0.1, [("c", 0.9), ("d", 0.6), ("e", 0.3)]),
+        "kb3": client("kb3", 10, [("late", 1.0)]),
+    }
+
+    async def get_async_client(kbid):
+        return clients[kbid]
+
+    monkeypatch.setattr(search_module, "get_async_client", get_async_client)
+
+    start = time.monotonic()
+    results = await AsyncNucliaSearch().find_federated(
+        kbids=clients, query="q", top_k=3, timeout=0.5
+    )
+
+    assert time.monotonic() - start < 1
+    assert [(p.kbid, p.paragraph.id) for p in results.paragraphs] == [
+        ("kb1", "a"),
+        ("kb2", "c"),
+        ("kb2", "d"),
+    ]
+    assert set(results.results) == {"kb1", "kb2"}
+    assert isinstance(results.errors["kb3"], TimeoutError)
+
+
+def test_find_federated_keeps_the_last_clients(monkeypatch):
+    monkeypatch.setattr(search_module, "FEDERATED_MAX_CLIENTS", 2)
+    get_client = Mock(
+        side_effect=lambda kbid: kb_client(
+            kbid, lambda req, kbid: find_results([("a", 1.0)])
+        )
+    )
+    monkeypatch.setattr(search_module, "get_client", get_client)
+    search = NucliaSearch()
+
+    search.find_federated(kbids=["kb1", "kb2"], query="q")
+    executor = search._executor
+    search.find_federated(kbids=["kb1", "kb3"], query="q")
+    assert list(search._clients) == ["kb1", "kb3"]
+    search.find_federated(kbids=["kb2"], query="q")
+
+    assert [call.args[0] for call in get_client.call_args_list] == [
+        "kb1",
+        "kb2",
+        "kb3",
+        "kb2",
+    ]
+    # All the calls share the same threads
+    assert search._executor is executor
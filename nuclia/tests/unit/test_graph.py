@@ -0,0 +1,135 @@
+from unittest.mock import Mock
+
+from nucliadb_models.graph.responses import GraphSearchResponse
+from nucliadb_models.metadata import Relation
+
+from nuclia.lib.graph import Direction, Edge, GraphIndex, Node, path_edges
+from nuclia.sdk.kb import NucliaKB
+
+ALICE = Node("Alice", group="People")
+BOB = Node("Bob", group="People")
+CAROL = Node("Carol", group="People")
+TOULOUSE = Node("Toulouse", group="City")
+CHEESE = Node("Cheese", group="Food")
+
+
+def edge(source: Node, label: str, destination: Node) -> Edge:
+    return Edge(source, label, "ENTITY", destination)
+
+
+def build() -> GraphIndex:
+    index = GraphIndex()
+    index.replace(
+        "rid1",
+        [
+            edge(ALICE, "is friend of", BOB),
+            edge(ALICE, "lives in", TOULOUSE),
+            edge(BOB, "eat", CHEESE),
+        ],
+    )
+    index.replace("rid2", [edge(CAROL, "lives in", TOULOUSE)])
+    return index
+
+
+def test_neighbours():
+    index = build()
+    assert index.neighbours("Alice") == {BOB: 1, TOULOUSE: 1}
+    assert index.neighbours(ALICE, depth=2) == {
+        BOB: 1,
+        TOULOUSE: 1,
+        CHEESE: 2,
+        CAROL: 2,
+    }
+    assert index.neighbours("Alice", depth=2, direction=Direction.OUT) == {
+        BOB: 1,
+        TOULOUSE: 1,
+        CHEESE: 2,
+    }
+    assert index.neighbours("Toulouse", depth=3, labels=["lives in"]) == {
+        ALICE: 1,
+        CAROL: 1,
+    }
+    assert index.neighbours("Nobody") == {}
+
+
+def test_shortest_path():
+    index = build()
+    assert index.shortest_path("Carol", "Cheese") == [
+        edge(CAROL, "lives in", TOULOUSE),
+        edge(ALICE, "lives in", TOULOUSE),
+        edge(ALICE, "is friend of", BOB),
+        edge(BOB, "eat", CHEESE),
+    ]
+    assert index.shortest_path("Carol", "Cheese", direction=Direction.OUT) is None
+    assert index.shortest_path("Carol", "Cheese", max_depth=3) is None
+    assert index.shortest_path("Alice", "Alice") == []
+
+
+def test_incremental_refresh():
+    index = build()
+    index.add([edge(BOB, "eat", CHEESE)], source="search")
+    assert index.edge_count == 4
+
+    index.replace("rid1", [edge(ALICE, "lives in", TOULOUSE)])
+    # Still in the index through the other source
+    assert index.edges("Bob") == [edge(BOB, "eat", CHEESE)]
+    assert index.neighbours("Alice") == {TOULOUSE: 1}
+
+    index.remove("search")
+    assert index.edges("Bob") == []
+    assert index.edge_count == 2
+    assert index.edges("Toulouse", direction=Direction.IN) == [
+        edge(ALICE, "lives in", TOULOUSE),
+        edge(CAROL, "lives in", TOULOUSE),
+    ]
+
+
+def test_path_edges():
+    response = GraphSearchResponse.model_validate(
+        {
+            "paths": [
+                {
+                    "source": {"value": "Alice", "type": "entity", "group": "People"},
+                    "relation": {"label": "lives in", "type": "ENTITY"},
+                    "destination": {
+                        "value": "Toulouse",
+                        "type": "entity",
+                        "group": "City",
+                    },
+                    "metadata": None,
+                }
+            ]
+        }
+    )
+    assert list(path_edges(response.paths)) == [edge(ALICE, "lives in", TOULOUSE)]
+
+
+def test_index_graph():
+    resource = Mock()
+    resource.id = "rid"
+    resource.usermetadata.relations = [
+        Relation.model_validate(
+            {
+                "relation": "ENTITY",
+                "label": "lives in",
+                "from": {"value": "Alice", "type": "entity", "group": "People"},
+                "to": {"value": "Toulouse", "type": "entity", "group": "City"},
+            }
+        ),
+        Relation.model_validate(
+            {
+                "relation": "ABOUT",
+                "to": {"value": "Cheese", "type": "entity", "group": "Food"},
+            }
+        ),
+    ]
+    kb = NucliaKB()
+    kb.resource = Mock()
+    kb.resource.get.return_value = resource
+
+    index = kb.index_graph(uid="rid", ndb=Mock())
+
+    assert index.edges(Node("rid", "resource")) == [
+        Edge(Node("rid", "resource"), "", "ABOUT", CHEESE)
+    ]
+    assert index.neighbours("Toulouse") == {ALICE: 1}
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from nuclia.lib.hedging import HedgingPolicy
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+
+def slow_then_fast(slow: threading.Event):
+    """First call blocks until `slow` is set, the next ones answer at once"""
+    calls: List[int] = []
+    lock = threading.Lock()
+
+    def func():
+        with lock:
+            calls.append(len(calls))
+            index = len(calls) - 1
+        if index == 0:
+            slow.wait(timeout=5)
+            return "primary"
+        return "hedge"
+
+    return func, calls
+
+
+def test_hedge_wins():
+    slow = threading.Event()
+    func, calls = slow_then_fast(slow)
+    policy = HedgingPolicy(budget=1, initial_delay=0.01)
+    discarded = []
+
+    assert policy.call(func, discard=discarded.append) == "hedge"
+    slow.set()
+
+    metrics = policy.metrics
+    assert len(calls) == 2
+    assert (metrics.requests, metrics.hedged, metrics.hedge_wins) == (1, 1, 1)
+    assert metrics.hedge_rate == 1
+    for _ in range(50):
+        if discarded:
+            break
+        time.sleep(0.01)
+    assert discarded == ["primary"]
+
+
+def test_fast_requests_are_not_hedged():
+    policy = HedgingPolicy(budget=1, initial_delay=1)
+    assert policy.call(lambda: "result") == "result"
+    assert policy.metrics.hedged == 0
+
+
+def test_hedge_budget():
+    slow = threading.Event()
+    func, calls = slow_then_fast(slow)
+    policy = HedgingPolicy(budget=0.5, initial_delay=0.01)
+    threading.Timer(0.1, slow.set).start()
+
+    assert policy.call(func) == "primary"
+
+    metrics = policy.metrics
+    assert len(calls) == 1
+    assert (metrics.hedged, metrics.budget_exhausted) == (0, 1)
+
+
+def test_hedge_burst_is_capped():
+    policy = HedgingPolicy(budget=1, initial_delay=1)
+    for _ in range(20):
+        policy.call(lambda: "result")
+    assert policy._tokens == 2
+
+
+def test_busy_workers_skip_hedging():
+    slow = threading.Event()
+    func, calls = slow_then_fast(slow)
+    policy = HedgingPolicy(budget=1, initial_delay=0.01, max_workers=1)
+    threading.Timer(0.1, slow.set).start()
+
+    # The only worker runs the original request: it is not hedged
+    assert policy.call(func) == "primary"
+    assert len(calls) == 1
+    assert policy.metrics.hedged == 0
+
+    # While it is busy, requests run in the calling thread
+    for _ in range(50):
+        if policy._busy_workers == 0:
+            break
+        time.sleep(0.01)
+    blocked = threading.Event()
+    policy._submit(lambda: blocked.wait(timeout=5))
+    assert policy.call(lambda: threading.current_thread()) is (
+        threading.current_thread()
+    )
+    blocked.set()
+    assert policy.metrics.workers_exhausted == 2
+
+
+def test_both_failing_raise_the_original_error():
+    errors = iter([ValueError("primary"), ValueError("hedge")])
+
+    def func():
+        error = next(errors)
+        time.sleep(0.05)
+        raise error
+
+    policy = HedgingPolicy(budget=1, initial_delay=0.01)
+    with pytest.raises(ValueError, match="primary"):
+        policy.call(func)
+
+
+def test_delay_follows_the_observed_latencies():
+    policy = HedgingPolicy(percentile=90, min_samples=10, window=100)
+    for latency in range(100):
+        policy._record(latency / 100)
+    assert policy.metrics.delay == pytest.approx(0.9, abs=0.05)
+
+
+async def test_async_loser_is_cancelled():
+    cancelled = asyncio.Event()
+    calls = []
+
+    async def func():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return len(calls)
+
+    policy = HedgingPolicy(budget=1, initial_delay=0.01)
+
+    assert await policy.acall(func) == 2
+    assert cancelled.is_set()
+    assert policy.metrics.hedge_wins == 1
+
+
+def test_search_find_is_hedged():
+    slow = threading.Event()
+    func, _ = slow_then_fast(slow)
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.find.side_effect = lambda req, kbid: func()
+    search = NucliaSearch(hedging=HedgingPolicy(budget=1, initial_delay=0.01))
+
+    assert search.find(query="q", ndb=ndb) == "hedge"
+    slow.set()
+    assert search.hedging.metrics.hedge_wins == 1
+
+
+async def test_async_search_find_is_not_hedged_when_fast():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+
+    async def find(req, kbid):
+        return "results"
+
+    ndb.ndb.find = find
+    search = AsyncNucliaSearch(hedging=HedgingPolicy(budget=1, initial_delay=1))
+
+    assert await search.find(query="q", ndb=ndb) == "results"
+    assert search.hedging.metrics.requests == 1
+    assert search.hedging.metrics.hedged == 0
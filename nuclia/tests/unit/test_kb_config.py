@@ -0,0 +1,114 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from nucliadb_models.kv_schemas import KBKVSchemas
+from nucliadb_models.labels import KnowledgeBoxLabels, LabelSet
+from nucliadb_models.writer import ResourceCreated
+
+from nuclia.lib import kb_config as kb_config_module
+from nuclia.lib.kb_config import KB_CONFIGS, KBConfigCache
+from nuclia.lib.labels import LABELSETS
+from nuclia.sdk.kb import AsyncNucliaKB, NucliaKB
+from nuclia.sdk.split_strategy import NucliaSplitStrategy
+from nuclia.sdk.upload import NucliaUpload
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    KB_CONFIGS.invalidate()
+    LABELSETS.invalidate()
+    yield
+    KB_CONFIGS.invalidate()
+    LABELSETS.invalidate()
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.get_labelsets.return_value = KnowledgeBoxLabels(
+        uuid="kbid", labelsets={"topic": LabelSet(title="Topic")}
+    )
+    ndb.list_extract_strategies.return_value.json.return_value = {
+        "e1": {"name": "tables"}
+    }
+    ndb.list_split_strategies.return_value.json.return_value = {
+        "s1": {"name": "paragraphs"}
+    }
+    ndb.ndb.list_kv_schemas.return_value = KBKVSchemas()
+    ndb.ndb.get_configuration.return_value = {"semantic_model": "en"}
+    return ndb
+
+
+def test_snapshot_is_loaded_once():
+    ndb = ndb_mock()
+    nkb = NucliaKB()
+
+    config = nkb.configuration_snapshot(ndb=ndb)
+    assert nkb.configuration_snapshot(ndb=ndb) is config
+
+    assert config.extract_strategy_id("tables") == "e1"
+    assert config.extract_strategy_id("e1") == "e1"
+    assert config.split_strategy_id("unknown") is None
+    assert config.configuration == {"semantic_model": "en"}
+    assert LABELSETS.get("kbid", "topic") is not None
+    assert ndb.ndb.get_configuration.call_count == 1
+
+    nkb.configuration_snapshot(refresh=True, ndb=ndb)
+    assert ndb.ndb.get_configuration.call_count == 2
+
+
+def test_snapshot_expires_and_is_invalidated(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(kb_config_module.time, "monotonic", lambda: now[0])
+    cache = KBConfigCache(ttl=10)
+    ndb = ndb_mock()
+
+    config = cache.get_or_load(ndb)
+    now[0] += 11
+    assert cache.get_or_load(ndb) is not config
+
+    # A snapshot loaded before an invalidation is not kept
+    generation = cache._generation
+    cache.invalidate("kbid")
+    cache.put(config, now[0], generation)
+    assert cache.get("kbid") is None
+
+
+def test_writes_invalidate_snapshot():
+    ndb = ndb_mock()
+    NucliaKB().configuration_snapshot(ndb=ndb)
+
+    NucliaSplitStrategy().delete(id="s1", ndb=ndb)
+
+    assert KB_CONFIGS.get("kbid") is None
+
+
+def test_upload_resolves_strategy_names(tmp_path):
+    path = tmp_path / "body.txt"
+    path.write_text("Hello")
+    ndb = ndb_mock()
+    ndb.ndb.create_resource.return_value = ResourceCreated(uuid="rid", seqid=1)
+    upload = NucliaUpload()
+
+    for _ in range(2):
+        upload.text(path=str(path), extract_strategy="tables", ndb=ndb)
+
+    texts = ndb.ndb.create_resource.call_args.kwargs["texts"]
+    assert next(iter(texts.values()))["extract_strategy"] == "e1"
+    assert ndb.list_extract_strategies.call_count == 1
+
+
+async def test_async_snapshot():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb = AsyncMock()
+    ndb.ndb.get_labelsets.return_value = KnowledgeBoxLabels(uuid="kbid")
+    ndb.ndb.list_kv_schemas.return_value = KBKVSchemas()
+    strategies = Mock()
+    strategies.json.return_value = {"s1": {"name": "paragraphs"}}
+    ndb.list_extract_strategies = AsyncMock(return_value=Mock())
+    ndb.list_split_strategies = AsyncMock(return_value=strategies)
+
+    config = await AsyncNucliaKB().configuration_snapshot(ndb=ndb)
+
+    assert config.split_strategy_id("paragraphs") == "s1"
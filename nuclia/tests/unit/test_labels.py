@@ -0,0 +1,119 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from nucliadb_models.labels import Label, LabelSet, LabelSetKind
+from nucliadb_models.resource import Resource
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.lib.labels import LABELSETS, group_assignments, merge_classifications
+from nuclia.sdk.kb import AsyncNucliaKB, NucliaKB
+
+RID1 = "a" * 32
+RID2 = "b" * 32
+
+
+@pytest.fixture(autouse=True)
+def empty_labelset_cache():
+    LABELSETS.invalidate()
+    yield
+    LABELSETS.invalidate()
+
+
+def resources() -> dict:
+    return {
+        RID1: Resource.model_validate(
+            {
+                "id": RID1,
+                "usermetadata": {
+                    "classifications": [{"labelset": "topic", "label": "cars"}],
+                    "relations": [
+                        {
+                            "relation": "ABOUT",
+                            "to": {"type": "entity", "value": "Tesla", "group": "ORG"},
+                        }
+                    ],
+                },
+            }
+        ),
+        RID2: Resource(id=RID2),
+    }
+
+
+def test_merge_classifications():
+    current = resources()[RID1].usermetadata
+    assert merge_classifications(current, [("topic", "cars")]) is None
+
+    merged = merge_classifications(current, [("topic", "cars"), ("topic", "ev")])
+    assert merged is not None
+    assert [c.label for c in merged.classifications] == ["cars", "ev"]
+    assert merged.relations == current.relations
+
+
+def test_group_assignments():
+    assert group_assignments(
+        [("r1", "topic", "a"), ("r2", "topic", "b"), ("r1", "topic", "a")]
+    ) == {"r1": [("topic", "a")], "r2": [("topic", "b")]}
+
+
+def test_add_labels_uses_cached_labelset():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.get_labelset.return_value = LabelSet(labels=[Label(title="cars")])
+    nkb = NucliaKB()
+
+    nkb.add_labels(labelset="topic", labels=["ev"], ndb=ndb)
+    nkb.add_labels(labelset="topic", labels=["cars", "ev"], ndb=ndb)
+    nkb.add_label(labelset="topic", label="ev", ndb=ndb)
+
+    assert ndb.ndb.get_labelset.call_count == 1
+    assert ndb.ndb.set_labelset.call_count == 1
+
+    nkb.del_labelset(labelset="topic", ndb=ndb)
+    nkb.add_labels(labelset="topic", labels=["ev"], ndb=ndb)
+    assert ndb.ndb.get_labelset.call_count == 2
+
+
+def test_label_resources():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.get_resource_by_id.side_effect = lambda kbid, rid, query_params: (
+        resources()[rid]
+    )
+    ndb.ndb.get_resource_by_slug.side_effect = exceptions.NotFoundError()
+    ndb.ndb.get_labelset.side_effect = exceptions.NotFoundError()
+
+    result = NucliaKB().label_resources(
+        assignments=[
+            (RID1, "topic", "cars"),
+            (RID2, "topic", "cars"),
+            (RID2, "topic", "ev"),
+            ("missing", "topic", "cars"),
+        ],
+        labelset_kind=LabelSetKind.RESOURCES,
+        ndb=ndb,
+    )
+
+    assert (result.resources, result.labelled, result.unchanged) == (3, 1, 1)
+    assert isinstance(result.errors["missing"], exceptions.NotFoundError)
+    ndb.ndb.update_resource.assert_called_once()
+    update = ndb.ndb.update_resource.call_args.kwargs
+    assert update["rid"] == RID2
+    assert [c.label for c in update["usermetadata"].classifications] == ["cars", "ev"]
+    labelset = ndb.ndb.set_labelset.call_args.kwargs["content"]
+    assert [label.title for label in labelset.labels] == ["cars", "ev"]
+
+
+async def test_async_label_resources():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb = AsyncMock()
+    ndb.ndb.get_resource_by_id.side_effect = lambda kbid, rid, query_params: (
+        resources()[rid]
+    )
+
+    result = await AsyncNucliaKB().label_resources(
+        assignments=[(RID1, "topic", "ev")], ndb=ndb
+    )
+
+    assert result.labelled == 1
+    ndb.ndb.update_resource.assert_awaited_once()
@@ -0,0 +1,203 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Dict, List
+from unittest.mock import Mock
+
+from nucliadb_models.resource import Resource
+from nucliadb_sdk import exceptions
+
+from nuclia.lib.batch import BatchResult
+from nuclia.lib.mirror import Mirror, MirrorState
+from nuclia.sdk.kb import AsyncNucliaKB, NucliaKB
+
+MODIFIED = datetime(2024, 1, 1)
+
+
+def file_resource(rid: str, files: Dict[str, bytes], md5: bool = True) -> Resource:
+    return Resource.model_validate(
+        {
+            "id": rid,
+            "modified": MODIFIED,
+            "data": {
+                "files": {
+                    field_id: {
+                        "value": {
+                            "file": {
+                                "uri": f"/kb/kbid/resource/{rid}/file/{field_id}",
+                                "size": len(content),
+                                "md5": hashlib.md5(content).hexdigest()
+                                if md5
+                                else None,
+                            }
+                        }
+                    }
+                    for field_id, content in files.items()
+                }
+            },
+        }
+    )
+
+
+class FakeKB:
+    """Resources of a KB, with the file fields they hold"""
+
+    def __init__(self, contents: Dict[str, Dict[str, bytes]], md5: bool = True):
+        self.contents = contents
+        self.md5 = md5
+        self.versions = {rid: 1 for rid in contents}
+        self.fetched: List[str] = []
+        self.downloads: List[str] = []
+        self.fail: List[str] = []
+
+    def catalog(self) -> List[Resource]:
+        return [
+            Resource(id=rid, modified=MODIFIED, last_seqid=self.versions[rid])
+            for rid in self.contents
+        ]
+
+    def get(self, rid: str) -> Resource:
+        self.fetched.append(rid)
+        return file_resource(rid, self.contents[rid], self.md5)
+
+    def download(self, resource: Resource, file_id: str, output: str):
+        self.downloads.append(f"{resource.id}/{file_id}")
+        if file_id in self.fail:
+            raise ConnectionError("connection lost")
+        with open(output, "wb") as file:
+            file.write(self.contents[resource.id][file_id])
+
+
+def sync_kb(fake: FakeKB) -> NucliaKB:
+    kb = NucliaKB()
+    kb.search = Mock()
+    kb.search.iter_catalog.side_effect = lambda **kwargs: iter(fake.catalog())
+    kb.resource.get = Mock(side_effect=lambda rid, **kwargs: fake.get(rid))
+    kb.resource.download_file = Mock(
+        side_effect=lambda resource, file_id, output, ndb: fake.download(
+            resource, file_id, output
+        )
+    )
+    return kb
+
+
+RID1 = "a" * 32
+RID2 = "b" * 32
+
+
+def test_mirror(tmp_path):
+    fake = FakeKB(
+        {
+            RID1: {"doc": b"document", "copy": b"same"},
+            RID2: {"copy": b"same"},
+            "c" * 32: {},
+        }
+    )
+    kb = sync_kb(fake)
+    path = str(tmp_path)
+
+    result = kb.mirror(path=path, ndb=Mock())
+
+    assert result.resources == 3
+    assert result.downloaded + result.skipped == 3
+    assert result.errors == {}
+    md5 = hashlib.md5(b"document").hexdigest()
+    with open(os.path.join(path, "objects", md5[:2], md5), "rb") as file:
+        assert file.read() == b"document"
+    state = MirrorState(path)
+    assert sorted((f.rid, f.field_id, f.md5) for f in state.files()) == [
+        (RID1, "copy", hashlib.md5(b"same").hexdigest()),
+        (RID1, "doc", md5),
+        (RID2, "copy", hashlib.md5(b"same").hexdigest()),
+    ]
+    state.close()
+
+    # Nothing changed: no resource is fetched again
+    fake.fetched.clear()
+    result = kb.mirror(path=path, ndb=Mock())
+    assert result.unchanged == 3
+    assert fake.fetched == []
+
+    # Modified resources are fetched, but their files are only downloaded
+    # if their content changed
+    fake.versions[RID1] = 2
+    fake.versions[RID2] = 2
+    fake.contents[RID2] = {"copy": b"same", "new": b"new content"}
+    fake.downloads.clear()
+    result = kb.mirror(path=path, ndb=Mock())
+    assert sorted(fake.fetched) == [RID1, RID2]
+    assert fake.downloads == [f"{RID2}/new"]
+    assert (result.unchanged, result.skipped, result.downloaded) == (1, 3, 1)
+
+
+def test_mirror_retries_failed_resources(tmp_path):
+    fake = FakeKB({RID1: {"ok": b"ok", "ko": b"ko"}, RID2: {"file": b"file"}})
+    fake.fail = ["ko"]
+    kb = sync_kb(fake)
+    path = str(tmp_path)
+
+    result = kb.mirror(path=path, ndb=Mock())
+
+    assert list(result.errors) == [f"{RID1}/ko"]
+    fake.fail = []
+    fake.fetched.clear()
+    fake.downloads.clear()
+    result = kb.mirror(path=path, ndb=Mock())
+    assert fake.fetched == [RID1]
+    assert fake.downloads == [f"{RID1}/ko"]
+    assert result.errors == {}
+
+
+def test_mirror_records_missing_resources(tmp_path):
+    mirror = Mirror(str(tmp_path))
+
+    assert mirror.fetched(BatchResult(index=0, item=RID1, value=None)) == []
+
+    assert isinstance(mirror.result.errors[RID1], exceptions.NotFoundError)
+    mirror.state.close()
+
+
+def test_mirror_forgets_deleted_resources(tmp_path):
+    fake = FakeKB({RID1: {"file": b"file"}, RID2: {"file": b"other"}})
+    kb = sync_kb(fake)
+    path = str(tmp_path)
+    kb.mirror(path=path, ndb=Mock())
+
+    del fake.contents[RID2]
+    result = kb.mirror(path=path, ndb=Mock())
+
+    assert result.removed == 1
+    state = MirrorState(path)
+    assert [f.rid for f in state.files()] == [RID1]
+    state.close()
+    # Stored objects are kept
+    md5 = hashlib.md5(b"other").hexdigest()
+    assert os.path.exists(os.path.join(path, "objects", md5[:2], md5))
+
+
+async def test_async_mirror_without_md5(tmp_path):
+    fake = FakeKB({RID1: {"file": b"file"}}, md5=False)
+    kb = AsyncNucliaKB()
+    kb.search = Mock()
+
+    async def iter_catalog(**kwargs):
+        for resource in fake.catalog():
+            yield resource
+
+    async def get(rid, **kwargs):
+        return fake.get(rid)
+
+    async def download_file(resource, file_id, output, ndb):
+        fake.download(resource, file_id, output)
+
+    kb.search.iter_catalog = iter_catalog
+    kb.resource.get = get  # type: ignore
+    kb.resource.download_file = download_file  # type: ignore
+    path = str(tmp_path)
+
+    result = await kb.mirror(path=path, ndb=Mock())
+
+    assert result.downloaded == 1
+    md5 = hashlib.md5(b"file").hexdigest()
+    assert os.path.exists(os.path.join(path, "objects", md5[:2], md5))
+    assert os.listdir(os.path.join(path, "objects", "incoming")) == []
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from nuclia_models.predict.generative_responses import (
+    GenerativeChunk,
+    TextGenerativeResponse,
+)
+from nucliadb_models import Notification
+from nucliadb_models.search import AskResponseItem
+from pydantic import ValidationError
+
+from nuclia.lib.ndjson import NDJSONDecoder, decode_raw
+
+ASK_LINES = [
+    {"item": {"type": "answer", "text": "Hello"}},
+    {"item": {"type": "status", "status": "success", "code": "0"}},
+    {"item": {"type": "citations", "citations": {"rid": [[0, 1]]}}},
+]
+
+
+@pytest.mark.parametrize("line", ASK_LINES)
+def test_decode_discriminated_union(line):
+    raw = json.dumps(line)
+    decoded = NDJSONDecoder(AskResponseItem).decode(raw)
+    assert decoded == AskResponseItem.model_validate_json(raw)
+    assert decoded.item.type == line["item"]["type"]
+
+
+def test_decode_generative_chunk():
+    chunk = GenerativeChunk(chunk=TextGenerativeResponse(text="Hello"))
+    decoded = NDJSONDecoder(GenerativeChunk).decode(chunk.model_dump_json().encode())
+    assert decoded == chunk
+
+
+def test_type_adapters_are_cached():
+    assert NDJSONDecoder(Notification)._adapter is NDJSONDecoder(Notification)._adapter
+
+
+def test_decode_plain_model():
+    line = '{"type": "resource_written", "data": {"resource_uuid": "rid"}}'
+    decoded = NDJSONDecoder(Notification).decode(line)
+    assert decoded == Notification.model_validate_json(line)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "not json",
+        '{"item": {"type": "unknown"}}',
+        '{"item": {"type": "answer"}}',
+        '{"other": 1}',
+    ],
+)
+def test_decode_invalid_lines(line):
+    with pytest.raises(ValidationError):
+        NDJSONDecoder(AskResponseItem).decode(line)
+
+
+def test_decode_raw():
+    assert decode_raw(b"") is None
+    assert decode_raw("  ") is None
+    assert decode_raw('{"type": "x", "data": 1}') == {"type": "x", "data": 1}
+
+
+async def test_iter_skips_blank_lines():
+    lines = ["", json.dumps(ASK_LINES[0]), b"\n", json.dumps(ASK_LINES[1])]
+    decoder = NDJSONDecoder(AskResponseItem)
+
+    assert [item.item.type for item in decoder.iter(lines)] == ["answer", "status"]
+
+    async def alines():
+        for line in lines:
+            yield line
+
+    assert [item.item.type async for item in decoder.aiter(alines())] == [
+        "answer",
+        "status",
+    ]
@@ -0,0 +1,240 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import pytest
+from nucliadb_models import Notification
+from nucliadb_models.metadata import ResourceProcessingStatus
+from nucliadb_models.search import CatalogResponse
+
+from nuclia.lib.notifications import (
+    NotificationsService,
+    OverflowPolicy,
+    ProcessingWaiters,
+    WaitCondition,
+)
+from nuclia.sdk.kb import AsyncNucliaKB, NucliaKB
+
+RID_1 = "a" * 32
+RID_2 = "b" * 32
+
+
+def processed(rid: str, errors: bool = False, seqid: int = 1) -> str:
+    return json.dumps(
+        {
+            "type": "resource_processed",
+            "data": {
+                "resource_uuid": rid,
+                "resource_title": "title",
+                "seqid": seqid,
+                "ingestion_succeeded": True,
+                "processing_errors": errors,
+            },
+        }
+    )
+
+
+def indexed(rid: str, seqid: int = 1) -> str:
+    return json.dumps(
+        {
+            "type": "resource_indexed",
+            "data": {"resource_uuid": rid, "resource_title": "title", "seqid": seqid},
+        }
+    )
+
+
+def catalog(**statuses: str) -> CatalogResponse:
+    return CatalogResponse.model_validate(
+        {
+            "resources": {
+                rid: {"id": rid, "metadata": {"status": status}}
+                for rid, status in statuses.items()
+            }
+        }
+    )
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        yield from self.lines
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_wait_processed_from_notifications():
+    stream = FakeStream(["", processed(RID_1), processed(RID_2, errors=True)])
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.notifications.return_value = stream
+    ndb.ndb.catalog.return_value = catalog()
+
+    result = NucliaKB().wait_processed(
+        rids=[RID_1, RID_2], timeout=5, until="processed", ndb=ndb
+    )
+
+    assert result == {
+        RID_1: ResourceProcessingStatus.PROCESSED,
+        RID_2: ResourceProcessingStatus.ERROR,
+    }
+    # At most the initial status check was done
+    assert ndb.ndb.catalog.call_count <= 1
+    assert stream.closed
+
+
+def test_wait_indexed():
+    waiters = ProcessingWaiters([RID_1, RID_2])
+    # Indexed when written, before being processed
+    waiters.on_line(indexed(RID_1, seqid=1))
+    waiters.on_line(processed(RID_1, seqid=2))
+    waiters.on_line(processed(RID_2, errors=True, seqid=3))
+    assert waiters.pending == {RID_1}
+    assert waiters.statuses[RID_2] == ResourceProcessingStatus.ERROR
+
+    waiters.on_line(indexed(RID_1, seqid=2))
+    assert waiters.done
+    assert waiters.statuses[RID_1] == ResourceProcessingStatus.PROCESSED
+
+    # In any order
+    waiters = ProcessingWaiters([RID_1])
+    waiters.on_line(indexed(RID_1, seqid=2))
+    waiters.on_line(processed(RID_1, seqid=2))
+    assert waiters.done
+
+
+def test_status_checks_filter_by_indexed_status():
+    [processed_request] = ProcessingWaiters(
+        [RID_1], until=WaitCondition.PROCESSED
+    ).status_requests()
+    [indexed_request] = ProcessingWaiters([RID_1]).status_requests()
+
+    assert processed_request.filter_expression.resource.prop == "resource"
+    status_filter = indexed_request.filter_expression.resource.operands[1]
+    assert [op.status for op in status_filter.operands] == ["PROCESSED", "ERROR"]
+
+
+def test_wait_processed_falls_back_to_status_checks(monkeypatch):
+    monkeypatch.setattr("nuclia.sdk.kb.STATUS_CHECK_INTERVAL_S", 0)
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.notifications.return_value = FakeStream([processed(RID_1), indexed(RID_1)])
+    ndb.ndb.catalog.side_effect = [
+        catalog(),
+        catalog(**{RID_2: "PENDING"}),
+        catalog(**{RID_2: "PROCESSED"}),
+    ]
+
+    result = NucliaKB().wait_processed(rids=[RID_1, RID_2], timeout=5, ndb=ndb)
+
+    assert result[RID_1] == ResourceProcessingStatus.PROCESSED
+    assert result[RID_2] == ResourceProcessingStatus.PROCESSED
+
+
+async def test_async_wait_processed_timeout():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.notifications = AsyncMock(
+        return_value=FakeStream([processed(RID_1), indexed(RID_1)])
+    )
+    ndb.ndb.catalog = AsyncMock(return_value=catalog(**{RID_2: "PENDING"}))
+
+    result = await AsyncNucliaKB().wait_processed(
+        rids=[RID_1, RID_2], timeout=0.1, ndb=ndb
+    )
+
+    assert result[RID_1] == ResourceProcessingStatus.PROCESSED
+    assert result[RID_2] == ResourceProcessingStatus.PENDING
+
+
+async def test_notifications_service_reconnects_and_dedupes():
+    outcomes = [
+        FakeStream([processed(RID_1)]),
+        httpx.ConnectError("boom"),
+        FakeStream([processed(RID_1), processed(RID_2)]),
+    ]
+
+    async def connect():
+        if not outcomes:
+            await asyncio.Event().wait()
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    service = NotificationsService(connect, max_delay=0)
+    subscription = service.subscribe()
+    async with service:
+        received = [await subscription.get(), await subscription.get()]
+
+    assert [n.data["resource_uuid"] for n in received] == [RID_1, RID_2]
+    assert service.metrics.duplicates == 1
+    assert service.metrics.connections == 2
+    assert service.metrics.reconnects >= 2
+    with pytest.raises(StopAsyncIteration):
+        await subscription.get()
+
+
+async def test_notifications_service_gives_up():
+    connect = AsyncMock(side_effect=httpx.ConnectError("boom"))
+    service = NotificationsService(connect, max_tries=2, max_delay=0)
+    subscription = service.subscribe()
+    service.start()
+    with pytest.raises(httpx.ConnectError):
+        async for _ in subscription:
+            pass
+    assert connect.call_count == 2
+
+
+def notification(rid: str, seqid: int = 1) -> Notification:
+    return Notification.model_validate_json(processed(rid, seqid=seqid))
+
+
+async def test_subscription_overflow_drop():
+    subscription = NotificationsService(AsyncMock()).subscribe(maxsize=2)
+    for seqid in range(3):
+        await subscription.put(notification(RID_1, seqid), 0)
+
+    assert subscription.metrics.dropped == 1
+    assert subscription.metrics.queued == 2
+    assert (await subscription.get()).data["seqid"] == 1
+
+
+async def test_subscription_overflow_coalesce():
+    subscription = NotificationsService(AsyncMock()).subscribe(
+        maxsize=2, overflow=OverflowPolicy.COALESCE
+    )
+    await subscription.put(notification(RID_1, 1), 0)
+    await subscription.put(notification(RID_2, 1), 0)
+    await subscription.put(notification(RID_1, 2), 0)
+
+    assert subscription.metrics.coalesced == 1
+    assert subscription.metrics.dropped == 0
+    first = await subscription.get()
+    assert (first.data["resource_uuid"], first.data["seqid"]) == (RID_1, 2)
+
+
+async def test_subscription_overflow_block():
+    subscription = NotificationsService(AsyncMock()).subscribe(
+        maxsize=1, overflow="block"
+    )
+    await subscription.put(notification(RID_1), 0)
+    blocked = asyncio.create_task(subscription.put(notification(RID_2), 0))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    assert (await subscription.get()).data["resource_uuid"] == RID_1
+    await asyncio.wait_for(blocked, 1)
+    assert (await subscription.get()).data["resource_uuid"] == RID_2
+    assert subscription.metrics.dropped == 0
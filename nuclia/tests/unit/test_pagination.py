@@ -0,0 +1,127 @@
+import threading
+from unittest.mock import AsyncMock, Mock
+
+from nucliadb_models.search import CatalogResponse, KnowledgeboxFindResults
+
+from nuclia.lib.pagination import prefetch_pages
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+
+def catalog_page(page_number: int, rids, next_page: bool) -> CatalogResponse:
+    return CatalogResponse.model_validate(
+        {
+            "resources": {rid: {"id": rid} for rid in rids},
+            "fulltext": {
+                "results": [],
+                "facets": {},
+                "query": "",
+                "total": 0,
+                "page_number": page_number,
+                "page_size": len(rids),
+                "next_page": next_page,
+                "min_score": 0.0,
+            },
+        }
+    )
+
+
+def find_page(paragraphs, search_after=None) -> KnowledgeboxFindResults:
+    return KnowledgeboxFindResults.model_validate(
+        {
+            "resources": {
+                "rid": {
+                    "id": "rid",
+                    "fields": {
+                        "/a/title": {
+                            "paragraphs": {
+                                pid: {
+                                    "score": 1.0,
+                                    "score_type": "BM25",
+                                    "order": order,
+                                    "text": pid,
+                                    "id": pid,
+                                }
+                                for pid, order in paragraphs
+                            }
+                        }
+                    },
+                }
+            },
+            "search_after": search_after,
+        }
+    )
+
+
+def test_prefetch_fetches_next_page_while_consuming():
+    fetched = {0: threading.Event(), 1: threading.Event()}
+
+    def fetch(cursor):
+        fetched[cursor].set()
+        return cursor
+
+    pages = prefetch_pages(fetch, 0, lambda cursor, page: 1 if cursor == 0 else None)
+    assert next(pages) == 0
+    # The second page is requested before the consumer asks for it
+    assert fetched[1].wait(timeout=5)
+    assert list(pages) == [1]
+
+
+def test_prefetch_stops_when_closed():
+    calls = []
+
+    def fetch(cursor):
+        calls.append(cursor)
+        return cursor
+
+    pages = prefetch_pages(fetch, 0, lambda cursor, page: cursor + 1)
+    assert next(pages) == 0
+    pages.close()
+    assert len(calls) <= 2
+
+
+def test_iter_catalog():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.catalog.side_effect = [
+        catalog_page(0, ["r1", "r2"], next_page=True),
+        catalog_page(1, ["r3"], next_page=False),
+    ]
+
+    resources = NucliaSearch().iter_catalog(query="q", page_size=2, ndb=ndb)
+
+    assert [resource.id for resource in resources] == ["r1", "r2", "r3"]
+    requests = [call.args[0] for call in ndb.ndb.catalog.call_args_list]
+    assert [request.page_number for request in requests] == [0, 1]
+    assert all(request.page_size == 2 for request in requests)
+
+
+def test_iter_find_follows_search_after():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.find.side_effect = [
+        find_page([("p2", 1), ("p1", 0)], search_after="token"),
+        find_page([("p3", 0)]),
+    ]
+
+    paragraphs = NucliaSearch().iter_find(query="q", ndb=ndb)
+
+    assert [paragraph.id for paragraph in paragraphs] == ["p1", "p2", "p3"]
+    requests = [call.args[0] for call in ndb.ndb.find.call_args_list]
+    assert [request.search_after for request in requests] == [None, "token"]
+
+
+async def test_async_iter_catalog():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.catalog = AsyncMock(
+        side_effect=[
+            catalog_page(0, ["r1"], next_page=True),
+            catalog_page(1, ["r2"], next_page=False),
+        ]
+    )
+
+    resources = [
+        resource.id async for resource in AsyncNucliaSearch().iter_catalog(ndb=ndb)
+    ]
+
+    assert resources == ["r1", "r2"]
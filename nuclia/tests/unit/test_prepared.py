@@ -0,0 +1,163 @@
+import json
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import pytest
+from nucliadb_models.search import AskRequest, Filter, FindRequest
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+
+from nuclia.lib.cache import QueryCache
+from nuclia.lib.prepared import QueryTemplate
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+STATIC = {
+    "features": ["keyword", "semantic"],
+    "show": ["basic", "values"],
+    "min_score": {"bm25": 0.5},
+}
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"query": "text", "top_k": 5, "filters": ["/l/a/b"]},
+        {"query": "text", "filters": [Filter(any=["/l/a/b", "/l/a/c"])]},
+        {},
+    ],
+)
+def test_template_body_matches_request(values):
+    template = QueryTemplate(FindRequest, STATIC)
+
+    request, body = template.bind(**values)
+
+    expected = FindRequest.model_validate({**STATIC, **values})
+    assert request == expected
+    assert json.loads(body) == json.loads(
+        expected.model_dump_json(by_alias=True, exclude_unset=True)
+    )
+
+
+def test_template_validates_bound_fields():
+    template = QueryTemplate(FindRequest, STATIC)
+    with pytest.raises(ValidationError):
+        template.bind(query="text", top_k=1000)
+    with pytest.raises(TypeError):
+        template.bind(query="text", show=["basic"])
+    with pytest.raises(ValueError):
+        QueryTemplate(FindRequest, {"query": "static"})
+
+
+class Paged(BaseModel):
+    query: str = ""
+    top_k: int = 10
+    max_results: int = 100
+
+    @model_validator(mode="after")
+    def top_k_within_max_results(self):
+        if self.top_k > self.max_results:
+            raise ValueError("top_k is over max_results")
+        return self
+
+
+def test_template_runs_model_validators():
+    template = QueryTemplate(Paged, {"max_results": 20})
+
+    request, body = template.bind(query="text", top_k=20)
+    assert json.loads(body) == {"max_results": 20, "query": "text", "top_k": 20}
+    with pytest.raises(ValidationError, match="over max_results"):
+        template.bind(query="text", top_k=21)
+
+
+class Rewriting(BaseModel):
+    query: str = ""
+    top_k: int = 10
+    page_size: int = 20
+
+    @model_validator(mode="after")
+    def page_fits_top_k(self):
+        self.page_size = min(self.page_size, self.top_k)
+        return self
+
+
+class Stripping(Rewriting):
+    @field_validator("query")
+    @classmethod
+    def strip(cls, value):
+        return value.strip()
+
+
+def test_template_body_follows_rewritten_static_fields():
+    template = QueryTemplate(Rewriting, {"page_size": 20})
+    # The after validator already rewrote page_size with the default top_k
+    assert template._validators is None
+
+    request, body = template.bind(query="text", top_k=5)
+    assert request.page_size == 5
+    assert json.loads(body) == {"page_size": 5, "query": "text", "top_k": 5}
+    # The static request is left as it was
+    _, body = template.bind(query="text", top_k=50)
+    assert json.loads(body) == {"page_size": 20, "query": "text", "top_k": 50}
+
+
+def test_template_with_bound_field_validators():
+    template = QueryTemplate(Stripping, {"page_size": 20})
+    assert template._validators is None
+
+    request, body = template.bind(query=" text ", top_k=5)
+    assert (request.query, request.page_size) == ("text", 5)
+    assert json.loads(body) == {"page_size": 5, "query": "text", "top_k": 5}
+
+
+def test_template_required_fields():
+    template = QueryTemplate(AskRequest, {"rag_strategies": [{"name": "hierarchy"}]})
+    with pytest.raises(TypeError):
+        template.bind()
+    _, body = template.bind(query="question")
+    assert json.loads(body) == {
+        "rag_strategies": [{"name": "hierarchy"}],
+        "query": "question",
+    }
+
+
+def test_prepared_find():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.query.return_value = httpx.Response(200, json={"resources": {}})
+    search = NucliaSearch(cache=QueryCache())
+    find = search.prepare("find", **STATIC)
+
+    find(query="first", ndb=ndb)
+    find(query="first", ndb=ndb)
+    results = find(query="second", top_k=3, ndb=ndb)
+
+    assert results.resources == {}
+    assert ndb.query.call_count == 2
+    path, body = ndb.query.call_args.args
+    assert path == "/find"
+    assert json.loads(body)["query"] == "second"
+    assert json.loads(body)["top_k"] == 3
+
+
+async def test_async_prepared_ask():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.query = AsyncMock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "answer": "42",
+                "learning_id": "id",
+                "status": "success",
+                "retrieval_results": {"resources": {}},
+            },
+        )
+    )
+    ask = AsyncNucliaSearch().prepare("ask", citations=True)
+
+    answer = await ask(query="question", ndb=ndb)
+
+    assert answer.answer == b"42"
+    path, body = ndb.query.call_args.args
+    assert path == "/ask"
+    assert json.loads(body) == {"citations": True, "query": "question"}
+    assert ndb.query.call_args.kwargs["extra_headers"]["X-Synchronous"] == "true"
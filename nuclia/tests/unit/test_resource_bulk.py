@@ -0,0 +1,150 @@
+import os
+from typing import Dict, List
+from unittest.mock import Mock
+
+import pytest
+from nucliadb_models.search import CatalogResponse
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+
+RIDS = [f"{index:032x}" for index in range(5)]
+
+
+def catalog_page(rids: List[str], next_page: bool) -> CatalogResponse:
+    return CatalogResponse.model_validate(
+        {
+            "resources": {rid: {"id": rid} for rid in rids},
+            "fulltext": {
+                "results": [],
+                "facets": {},
+                "total": len(RIDS),
+                "page_number": 0,
+                "page_size": 2,
+                "next_page": next_page,
+                "min_score": 0,
+            },
+        }
+    )
+
+
+def ndb_mock(rids: List[str]) -> Mock:
+    """Client whose catalog lists `rids`, by pages of 2"""
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.requests = []
+
+    def catalog(req, kbid):
+        ndb.requests.append(req)
+        start = req.page_number * 2
+        return catalog_page(rids[start : start + 2], start + 2 < len(rids))
+
+    ndb.ndb.catalog.side_effect = catalog
+    return ndb
+
+
+def test_delete_many():
+    ndb = ndb_mock(RIDS)
+
+    result = NucliaResource().delete_many(
+        query={"query": "", "range_creation_end": "2020-01-01T00:00:00"},
+        concurrency=2,
+        progress=False,
+        ndb=ndb,
+    )
+
+    assert (result.matched, result.done, result.errors) == (5, 5, {})
+    deleted = [call.kwargs["rid"] for call in ndb.ndb.delete_resource.call_args_list]
+    assert sorted(deleted) == RIDS
+    assert ndb.requests[0].range_creation_end.year == 2020
+    assert ndb.requests[0].show == []
+
+
+def test_delete_many_dry_run():
+    ndb = ndb_mock(RIDS)
+
+    result = NucliaResource().delete_many(all=True, dry_run=True, ndb=ndb)
+
+    assert (result.matched, result.done, result.dry_run) == (5, 0, True)
+    ndb.ndb.delete_resource.assert_not_called()
+
+
+def test_bulk_needs_a_selective_query():
+    ndb = ndb_mock(RIDS)
+
+    for query in ("", {"page_size": 10, "sort": {"field": "created"}}):
+        with pytest.raises(ValueError, match="all=True"):
+            NucliaResource().delete_many(query=query, progress=False, ndb=ndb)
+    ndb.ndb.catalog.assert_not_called()
+
+    result = NucliaResource().reprocess_many(
+        filters=["/classification.labels/topic/cars"], progress=False, ndb=ndb
+    )
+    assert result.done == 5
+
+
+def test_reprocess_many_resumes_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "reprocess.jsonl")
+    ndb = ndb_mock(RIDS)
+    calls: Dict[str, int] = {}
+
+    def reprocess(kbid, rid):
+        calls[rid] = calls.get(rid, 0) + 1
+        if rid == RIDS[3] and calls[rid] == 1:
+            raise exceptions.UnknownError("boom")
+
+    ndb.ndb.reprocess_resource.side_effect = reprocess
+
+    result = NucliaResource().reprocess_many(
+        all=True, checkpoint=checkpoint, progress=False, ndb=ndb
+    )
+
+    assert list(result.errors) == [RIDS[3]]
+    assert os.path.exists(checkpoint)
+
+    # The resources are not listed again, and only the failed one is retried
+    ndb.requests.clear()
+    result = NucliaResource().reprocess_many(
+        all=True, checkpoint=checkpoint, progress=False, ndb=ndb
+    )
+
+    assert ndb.requests == []
+    assert (result.matched, result.done, result.errors) == (5, 5, {})
+    assert calls == {rid: 2 if rid == RIDS[3] else 1 for rid in RIDS}
+    assert not os.path.exists(checkpoint)
+
+
+def test_checkpoint_of_another_operation(tmp_path):
+    checkpoint = str(tmp_path / "bulk.jsonl")
+    ndb = ndb_mock(RIDS)
+    ndb.ndb.reprocess_resource.side_effect = exceptions.UnknownError("boom")
+    NucliaResource().reprocess_many(
+        all=True, checkpoint=checkpoint, progress=False, ndb=ndb
+    )
+
+    with pytest.raises(ValueError, match="reprocess"):
+        NucliaResource().delete_many(
+            all=True, checkpoint=checkpoint, progress=False, ndb=ndb
+        )
+
+
+async def test_async_delete_many_ignores_deleted():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    deleted = []
+
+    async def catalog(req, kbid):
+        return catalog_page(RIDS, False)
+
+    async def delete_resource(kbid, rid):
+        if rid == RIDS[0]:
+            raise exceptions.NotFoundError(rid)
+        deleted.append(rid)
+
+    ndb.ndb.catalog = catalog
+    ndb.ndb.delete_resource = delete_resource
+
+    result = await AsyncNucliaResource().delete_many(all=True, progress=False, ndb=ndb)
+
+    assert (result.matched, result.done, result.errors) == (5, 5, {})
+    assert sorted(deleted) == RIDS[1:]
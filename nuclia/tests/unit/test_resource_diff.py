@@ -0,0 +1,150 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from nucliadb_models.resource import Resource
+from nucliadb_models.text import TextFormat
+
+from nuclia.lib.diff import differs, resource_changes
+from nuclia.lib.slugs import SLUG_CACHE
+from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+from nuclia.sdk.upload import NucliaUpload
+
+RID = "a" * 32
+
+
+@pytest.fixture(autouse=True)
+def empty_slug_cache():
+    SLUG_CACHE.invalidate()
+    yield
+    SLUG_CACHE.invalidate()
+
+
+def current() -> Resource:
+    return Resource.model_validate(
+        {
+            "id": RID,
+            "slug": "doc",
+            "title": "Title",
+            "icon": "text/plain",
+            "usermetadata": {
+                "classifications": [{"labelset": "topics", "label": "cars"}]
+            },
+            "origin": {"url": "https://example.com", "tags": ["a"]},
+            "data": {
+                "texts": {
+                    "body": {"value": {"body": "Hello", "format": "PLAIN", "md5": "x"}},
+                    "other": {"value": {"body": "Other", "format": "PLAIN"}},
+                }
+            },
+        }
+    )
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.get_resource_by_id.return_value = current()
+    return ndb
+
+
+def test_differs():
+    assert not differs({"a": 1}, {"a": 1, "b": 2})
+    assert differs({"a": 1, "b": 2}, {"a": 1})
+    assert not differs({"a": [{"x": 1}]}, {"a": [{"x": 1, "y": 2}]})
+    assert differs({"a": [1]}, {"a": [1, 2]})
+    assert differs({"a": 1}, None)
+
+
+def test_resource_changes():
+    changes = resource_changes(
+        current(),
+        {
+            "title": "Title",
+            "icon": "text/plain",
+            "texts": {
+                "body": {"body": "Hello", "format": TextFormat.PLAIN},
+                "other": {"body": "Changed", "format": "PLAIN"},
+                "new": {"body": "New"},
+            },
+            "usermetadata": {
+                "classifications": [{"labelset": "topics", "label": "cars"}]
+            },
+            "origin": {"tags": ["a", "b"]},
+            "wait_for_commit": True,
+        },
+    )
+
+    assert changes == {
+        "texts": {
+            "other": {"body": "Changed", "format": "PLAIN"},
+            "new": {"body": "New"},
+        },
+        "origin": {"tags": ["a", "b"]},
+    }
+
+
+def test_update_with_diff():
+    ndb = ndb_mock()
+    resource = NucliaResource()
+
+    resource.update(
+        rid=RID,
+        slug="doc",
+        diff=True,
+        title="Title",
+        texts={"body": {"body": "Hello", "format": "PLAIN"}},
+        wait_for_commit=False,
+        ndb=ndb,
+    )
+    ndb.ndb.update_resource.assert_not_called()
+
+    resource.update(
+        rid=RID,
+        diff=True,
+        title="New title",
+        texts={"body": {"body": "Hello", "format": "PLAIN"}},
+        wait_for_commit=False,
+        ndb=ndb,
+    )
+    ndb.ndb.update_resource.assert_called_once_with(
+        kbid="kbid", rid=RID, title="New title", wait_for_commit=False
+    )
+
+
+def test_update_with_diff_renames():
+    ndb = ndb_mock()
+
+    NucliaResource().update(rid=RID, slug="renamed", diff=True, title="Title", ndb=ndb)
+
+    ndb.ndb.update_resource.assert_called_once_with(
+        kbid="kbid", rid=RID, slug="renamed"
+    )
+
+
+def test_upload_text_with_diff(tmp_path):
+    path = tmp_path / "body.txt"
+    path.write_text("Hello")
+    ndb = ndb_mock()
+    SLUG_CACHE.put("kbid", RID, "doc")
+
+    rid = NucliaUpload().text(
+        path=str(path), slug="doc", field="body", diff=True, ndb=ndb
+    )
+
+    assert rid == RID
+    ndb.ndb.update_resource.assert_not_called()
+
+
+async def test_async_update_with_snapshot():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb = AsyncMock()
+
+    await AsyncNucliaResource().update(
+        slug="doc",
+        diff=True,
+        resource=current(),
+        texts={"body": {"body": "Bye", "format": "PLAIN"}},
+        ndb=ndb,
+    )
+    ndb.ndb.update_resource_by_slug.assert_called_once()
@@ -0,0 +1,104 @@
+import threading
+from typing import List
+from unittest.mock import Mock
+
+from nucliadb_models.resource import Resource
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+
+RID = "a" * 32
+SLUG_LIKE_RID = "b" * 32
+
+
+def ndb_mock(resources) -> Mock:
+    """Client whose resources are indexed by id and by slug `slug-<id>`"""
+    ndb = Mock()
+    ndb.kbid = "kbid"
+
+    def by_id(kbid, rid, query_params):
+        if rid not in resources:
+            raise exceptions.NotFoundError(rid)
+        return Resource(id=rid)
+
+    def by_slug(kbid, slug, query_params):
+        for rid, resource_slug in resources.items():
+            if resource_slug == slug:
+                return Resource(id=rid, slug=slug)
+        raise exceptions.NotFoundError(slug)
+
+    ndb.ndb.get_resource_by_id.side_effect = by_id
+    ndb.ndb.get_resource_by_slug.side_effect = by_slug
+    return ndb
+
+
+def test_get_many():
+    ndb = ndb_mock({RID: "my-slug", "c" * 32: SLUG_LIKE_RID})
+    results = list(
+        NucliaResource().get_many(
+            ids_or_slugs=[RID, "my-slug", "missing", SLUG_LIKE_RID],
+            show=["values"],
+            extracted=["text"],
+            ndb=ndb,
+        )
+    )
+
+    assert [r.item for r in results] == [RID, "my-slug", "missing", SLUG_LIKE_RID]
+    assert results[0].value.id == RID
+    assert results[1].value.id == RID
+    assert isinstance(results[2].error, exceptions.NotFoundError)
+    # Looks like an id, but is a slug
+    assert results[3].value.id == "c" * 32
+    assert ndb.ndb.get_resource_by_id.call_args.kwargs["query_params"] == {
+        "show": ["values", "basic"],
+        "extracted": ["text"],
+    }
+
+
+def test_get_many_bounds_concurrency():
+    lock = threading.Lock()
+    running: List[int] = []
+    peak: List[int] = []
+    ndb = Mock()
+    ndb.kbid = "kbid"
+
+    def by_slug(kbid, slug, query_params):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+        return Resource(id=slug)
+
+    ndb.ndb.get_resource_by_slug.side_effect = by_slug
+    slugs = (f"slug-{index}" for index in range(20))
+
+    results = NucliaResource().get_many(ids_or_slugs=slugs, concurrency=3, ndb=ndb)
+
+    assert [r.value.id for r in results] == [f"slug-{index}" for index in range(20)]
+    assert max(peak) <= 3
+
+
+async def test_async_get_many():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+
+    async def by_id(kbid, rid, query_params):
+        return Resource(id=rid)
+
+    async def by_slug(kbid, slug, query_params):
+        raise exceptions.NotFoundError(slug)
+
+    ndb.ndb.get_resource_by_id = by_id
+    ndb.ndb.get_resource_by_slug = by_slug
+
+    results = [
+        result
+        async for result in AsyncNucliaResource().get_many(
+            ids_or_slugs=[RID, "missing"], ndb=ndb
+        )
+    ]
+
+    assert results[0].value.id == RID
+    assert isinstance(results[1].error, exceptions.NotFoundError)
@@ -0,0 +1,102 @@
+import json
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+from nucliadb_models.extracted import ExtractedText
+from nucliadb_models.resource import Resource
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.lib.views import ResourceView
+from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+
+RID = "a" * 32
+
+CONTENT = json.dumps(
+    {
+        "id": RID,
+        "slug": "doc",
+        "title": "Doc",
+        "metadata": {"status": "PROCESSED"},
+        "data": {
+            "files": {
+                "pdf": {
+                    "value": {"file": {"uri": "/file"}},
+                    "extracted": {"text": {"text": "Hello", "split_text": {}}},
+                }
+            }
+        },
+    }
+).encode()
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.session.get.return_value = httpx.Response(200, content=CONTENT)
+    return ndb
+
+
+def test_view_is_parsed_lazily():
+    view = ResourceView(CONTENT)
+    assert view._parsed is None
+
+    assert view.id == RID
+    assert view.get("data", "files", "pdf", "value", "file", "uri") == "/file"
+    assert view.get("data", "texts", "missing", default={}) == {}
+    assert view.field("files", "pdf")["extracted"]["text"]["text"] == "Hello"
+
+    text = view.extracted_text("files", "pdf")
+    assert isinstance(text, ExtractedText)
+    assert text.text == "Hello"
+    assert view.extracted_text("files", "pdf") is text
+    assert view.extracted_text("texts", "missing") is None
+
+    resource = view.materialize()
+    assert isinstance(resource, Resource)
+    assert resource.data.files["pdf"].extracted.text.text == "Hello"
+    assert json.loads(view.json(indent=2))["slug"] == "doc"
+
+
+def test_get_raw():
+    ndb = ndb_mock()
+
+    view = NucliaResource().get(
+        rid=RID, show=["values", "extracted"], extracted=["text"], raw=True, ndb=ndb
+    )
+
+    assert isinstance(view, ResourceView)
+    assert view.title == "Doc"
+    ndb.ndb.get_resource_by_id.assert_not_called()
+    url = ndb.ndb.session.get.call_args.args[0]
+    params = ndb.ndb.session.get.call_args.kwargs["params"]
+    assert url == f"v1/kb/kbid/resource/{RID}"
+    assert params == {"show": ["values", "extracted", "basic"], "extracted": ["text"]}
+
+
+def test_get_many_raw_falls_back_to_slug():
+    ndb = ndb_mock()
+    not_found = httpx.Response(404)
+    found = httpx.Response(200, content=CONTENT)
+    ndb.ndb.session.get.side_effect = [not_found, found]
+
+    def check_response(response):
+        if response.status_code == 404:
+            raise exceptions.NotFoundError()
+        return response
+
+    ndb.ndb._check_response.side_effect = check_response
+
+    results = list(NucliaResource().get_many(ids_or_slugs=[RID], raw=True, ndb=ndb))
+
+    assert results[0].value.slug == "doc"
+    assert ndb.ndb.session.get.call_args.args[0] == f"v1/kb/kbid/slug/{RID}"
+
+
+async def test_async_get_raw():
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.session.get = AsyncMock(return_value=httpx.Response(200, content=CONTENT))
+
+    view = await AsyncNucliaResource().get(slug="doc", raw=True, ndb=ndb)
+
+    assert view.extracted_text("files", "pdf").text == "Hello"
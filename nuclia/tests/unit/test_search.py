@@ -0,0 +1,101 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+from nucliadb_sdk import exceptions
+
+from nuclia.lib.utils import serialize
+from nuclia.sdk.search import AsyncNucliaSearch, NucliaSearch
+
+
+def answer(text: str) -> bytes:
+    return json.dumps({"item": {"type": "answer", "text": text}}).encode()
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+
+def test_ask_stream_yields_items_as_they_arrive():
+    stream = FakeStream([answer("Hello"), b"", answer(" world")])
+    ndb = Mock()
+    ndb.ask.return_value = stream
+
+    items = NucliaSearch().ask_stream(query="question", ndb=ndb)
+
+    # The request is only sent once the generator is consumed
+    assert next(items).item.text == "Hello"
+    assert ndb.ask.call_count == 1
+    assert [item.item.text for item in items] == [" world"]
+    assert stream.closed
+    request = ndb.ask.call_args.args[0]
+    assert request.query == "question"
+    assert ndb.ask.call_args.kwargs["extra_headers"] == {"X-Show-Consumption": "false"}
+
+
+def test_serialize_prints_answer_tokens(capsys):
+    ndb = Mock()
+    ndb.ask.return_value = FakeStream([answer("Hello"), answer(" world")])
+
+    serialize(NucliaSearch().ask_stream(query="question", ndb=ndb))
+
+    assert capsys.readouterr().out == "Hello world\n"
+
+
+def test_find_many_captures_errors_per_query():
+    def find(req, kbid):
+        if req.query == "boom":
+            raise ValueError("boom")
+        return f"results for {req.query}"
+
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.find.side_effect = find
+
+    results = list(
+        NucliaSearch().find_many(queries=["a", "boom", "c"], concurrency=2, ndb=ndb)
+    )
+
+    assert [r.item for r in results] == ["a", "boom", "c"]
+    assert [r.value for r in results] == ["results for a", None, "results for c"]
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_search_many_retries_rate_limited_queries(monkeypatch):
+    monkeypatch.setattr("nuclia.sdk.search.QUERY_RETRY_FACTOR", 0)
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.search.side_effect = [exceptions.RateLimitError("slow down"), "results"]
+
+    (result,) = NucliaSearch().search_many(queries=["a"], ndb=ndb)
+
+    assert result.ok
+    assert result.value == "results"
+    assert ndb.ndb.search.call_count == 2
+
+
+async def test_async_find_many_unordered():
+    async def find(req, kbid):
+        await asyncio.sleep(0.05 if req.query == "slow" else 0)
+        return req.query
+
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.ndb.find = AsyncMock(side_effect=find)
+
+    results = [
+        result.value
+        async for result in AsyncNucliaSearch().find_many(
+            queries=["slow", "fast"], ordered=False, ndb=ndb
+        )
+    ]
+
+    assert results == ["fast", "slow"]
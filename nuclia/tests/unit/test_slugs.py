@@ -0,0 +1,190 @@
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import pytest
+from nucliadb_models.resource import Resource
+from nucliadb_models.search import CatalogResponse
+from nucliadb_models.writer import ResourceCreated
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.lib import slugs as slugs_module
+from nuclia.lib.slugs import SLUG_CACHE, SlugCache
+from nuclia.sdk.memory.utils import _ensure_global_entries_resource
+from nuclia.sdk.resource import NucliaResource
+from nuclia.sdk.search import NucliaSearch
+from nuclia.sdk.upload import AsyncNucliaUpload, NucliaUpload
+
+
+@pytest.fixture(autouse=True)
+def empty_slug_cache():
+    SLUG_CACHE.invalidate()
+    yield
+    SLUG_CACHE.invalidate()
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    return ndb
+
+
+def test_lru_eviction():
+    cache = SlugCache(max_entries=2)
+    cache.put("kb", "rid1", "slug1")
+    cache.put("kb", "rid2", "slug2")
+    assert cache.rid("kb", "slug1") == "rid1"
+    cache.put("kb", "rid3", "slug3")
+
+    assert cache.rid("kb", "slug2") is None
+    assert cache.rid("kb", "slug1") == "rid1"
+    assert cache.metrics.evictions == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(slugs_module.time, "monotonic", lambda: now[0])
+    cache = SlugCache(ttl=10)
+    cache.put("kb", "rid", "slug")
+    now[0] += 11
+
+    assert cache.rid("kb", "slug") is None
+
+
+def test_slug_change_and_forget():
+    cache = SlugCache()
+    cache.put("kb", "rid", "old")
+    cache.put("kb", "rid", "new")
+    assert cache.rid("kb", "old") is None
+    assert cache.rid("kb", "new") == "rid"
+
+    cache.put("other-kb", "rid", "new")
+    cache.forget("kb", rid="rid")
+    assert cache.rid("kb", "new") is None
+    assert cache.rid("other-kb", "new") == "rid"
+
+
+def test_forget_on_notification():
+    cache = SlugCache()
+    cache.put("kb", "rid1", "slug1")
+    cache.put("kb", "rid2", "slug2")
+
+    cache.on_notification(
+        "kb", "resource_written", {"resource_uuid": "rid1", "operation": "created"}
+    )
+    cache.on_notification("kb", "resource_indexed", {"resource_uuid": "rid2"})
+    assert cache.metrics.entries == 2
+    cache.on_notification(
+        "kb", "resource_written", {"resource_uuid": "rid1", "operation": "deleted"}
+    )
+    assert cache.rid("kb", "slug1") is None
+    assert cache.rid("kb", "slug2") == "rid2"
+
+
+def test_upload_reuses_known_resources():
+    ndb = ndb_mock()
+    ndb.ndb.get_resource_by_slug.side_effect = exceptions.NotFoundError()
+    ndb.ndb.create_resource.return_value = ResourceCreated(uuid="rid", seqid=1)
+
+    assert NucliaUpload._get_or_create_resource(slug="doc", ndb=ndb) == ("rid", True)
+    assert NucliaUpload._get_or_create_resource(slug="doc", ndb=ndb) == ("rid", False)
+    assert ndb.ndb.get_resource_by_slug.call_count == 1
+    assert ndb.ndb.create_resource.call_count == 1
+
+
+def test_upload_recreates_deleted_cached_resource(tmp_path):
+    path = tmp_path / "body.txt"
+    path.write_text("Hello")
+    ndb = ndb_mock()
+    SLUG_CACHE.put("kbid", "deleted", "doc")
+    ndb.ndb.update_resource.side_effect = exceptions.NotFoundError()
+    ndb.ndb.get_resource_by_slug.side_effect = exceptions.NotFoundError()
+    ndb.ndb.create_resource.return_value = ResourceCreated(uuid="rid", seqid=1)
+
+    assert NucliaUpload().text(path=str(path), slug="doc", ndb=ndb) == "rid"
+    assert ndb.ndb.update_resource.call_count == 1
+    assert ndb.ndb.create_resource.call_args.kwargs["icon"] == "text/plain"
+    assert SLUG_CACHE.rid("kbid", "doc") == "rid"
+
+    # Resources that are not cached are not looked up again
+    with pytest.raises(exceptions.NotFoundError):
+        NucliaUpload().text(path=str(path), rid="gone", ndb=ndb)
+    assert ndb.ndb.create_resource.call_count == 1
+
+
+def test_file_upload_recreates_deleted_cached_resource(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF")
+    ndb = ndb_mock()
+    SLUG_CACHE.put("kbid", "deleted", "doc")
+    response = httpx.Response(404, request=httpx.Request("POST", "http://kb"))
+
+    def start_tus_upload(rid, **kwargs):
+        if rid == "deleted":
+            raise httpx.HTTPStatusError(
+                "gone", request=response.request, response=response
+            )
+        return "upload-url"
+
+    ndb.start_tus_upload.side_effect = start_tus_upload
+    ndb.patch_tus_upload.return_value = 4
+    ndb.ndb.get_resource_by_slug.return_value = Resource(id="rid", slug="doc")
+
+    assert NucliaUpload().file(path=str(path), slug="doc", ndb=ndb) == "rid"
+    assert ndb.start_tus_upload.call_count == 2
+    ndb.ndb.delete_resource.assert_not_called()
+
+
+async def test_async_upload_recreates_deleted_cached_resource(tmp_path):
+    path = tmp_path / "body.txt"
+    path.write_text("Hello")
+    ndb = ndb_mock()
+    ndb.ndb = AsyncMock()
+    SLUG_CACHE.put("kbid", "deleted", "doc")
+    ndb.ndb.update_resource.side_effect = [exceptions.NotFoundError(), None]
+    ndb.ndb.get_resource_by_slug.return_value = Resource(id="rid", slug="doc")
+
+    rid = await AsyncNucliaUpload().text(path=str(path), slug="doc", ndb=ndb)
+
+    assert rid == "rid"
+    assert [c.kwargs["rid"] for c in ndb.ndb.update_resource.call_args_list] == [
+        "deleted",
+        "rid",
+    ]
+
+
+def test_resource_get_exists_and_delete():
+    ndb = ndb_mock()
+    ndb.ndb.get_resource_by_id.return_value = Resource(id="rid", slug="doc")
+    resource = NucliaResource()
+
+    resource.get(rid="rid", ndb=ndb)
+    assert resource.exists(slug="doc", ndb=ndb)
+    ndb.ndb.session.head.assert_not_called()
+
+    resource.delete(slug="doc", ndb=ndb)
+    assert SLUG_CACHE.rid("kbid", "doc") is None
+
+
+def test_catalog_fills_cache():
+    ndb = ndb_mock()
+    ndb.ndb.catalog.return_value = CatalogResponse.model_validate(
+        {"resources": {"rid": {"id": "rid", "slug": "doc"}}}
+    )
+
+    NucliaSearch().catalog(query="", ndb=ndb)
+
+    assert SLUG_CACHE.rid("kbid", "doc") == "rid"
+
+
+def test_memory_global_entries_resource_is_checked_once():
+    ndb = Mock(spec_set=["kbid", "ndb"])
+    ndb.kbid = "kbid"
+    ndb.ndb = Mock()
+    ndb.ndb.get_resource_by_slug.side_effect = exceptions.NotFoundError()
+    ndb.ndb.create_resource.return_value = ResourceCreated(uuid="rid", seqid=1)
+
+    slug = _ensure_global_entries_resource(ndb, "bob")
+    assert _ensure_global_entries_resource(ndb, "bob") == slug
+
+    assert ndb.ndb.get_resource_by_slug.call_count == 1
+    assert ndb.ndb.create_resource.call_count == 1
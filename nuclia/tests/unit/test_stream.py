@@ -0,0 +1,80 @@
+import pytest
+from nuclia_models.predict.generative_responses import (
+    GenerativeChunk,
+    JSONGenerativeResponse,
+    ReasoningGenerativeResponse,
+    StatusGenerativeResponse,
+    TextGenerativeResponse,
+)
+from nucliadb_models.search import AskResponseItem
+
+from nuclia.lib.stream import GenerativeAssembler, StreamAssembler, TextBuffer
+from nuclia.sdk.search import AskAnswerAssembler
+
+
+def test_text_buffer():
+    buffer = TextBuffer()
+    assert not buffer
+    assert buffer.getvalue() == ""
+    assert buffer.getvalue_or_none() is None
+    for text in ("a", "b", "c"):
+        buffer.append(text)
+    assert buffer.getvalue() == "abc"
+    buffer.append("d")
+    assert buffer.getvalue() == "abcd"
+
+
+def test_generative_assembler():
+    chunks = [
+        GenerativeChunk(chunk=ReasoningGenerativeResponse(text="Let me ")),
+        GenerativeChunk(chunk=ReasoningGenerativeResponse(text="think")),
+        GenerativeChunk(chunk=TextGenerativeResponse(text="Hello")),
+        GenerativeChunk(chunk=TextGenerativeResponse(text=" world")),
+        GenerativeChunk(chunk=JSONGenerativeResponse(object={"a": 1})),
+        GenerativeChunk(chunk=StatusGenerativeResponse(code="0")),
+    ]
+
+    result = GenerativeAssembler().consume(chunks)
+
+    assert result.answer == "Hello world"
+    assert result.reasoning == "Let me think"
+    assert result.object == {"a": 1}
+    assert result.code == "0"
+
+
+def test_generative_assembler_without_reasoning():
+    result = GenerativeAssembler().consume([])
+    assert result.answer == ""
+    assert result.reasoning is None
+
+
+async def test_ask_answer_assembler():
+    lines = [
+        {"type": "answer", "text": "Hello"},
+        {"type": "answer", "text": " wörld"},
+        {"type": "status", "status": "success", "code": "0"},
+        {"type": "error", "error": "boom"},
+        {"type": "citations", "citations": {"rid": [[0, 1]]}},
+    ]
+
+    async def stream():
+        for line in lines:
+            yield AskResponseItem.model_validate({"item": line}).item
+
+    result = await AskAnswerAssembler(learning_id="lid").aconsume(stream())
+
+    assert result.answer == "Hello wörld".encode()
+    assert result.reasoning is None
+    assert result.learning_id == "lid"
+    assert result.status == "success"
+    assert result.error_details == "boom"
+    assert result.citations == {"rid": [[0, 1]]}
+
+
+def test_stream_assembler_requires_key_and_result():
+    class Keyed(StreamAssembler):
+        def key(self, item):
+            return item
+
+    with pytest.raises(TypeError):
+        Keyed()  # type: ignore[abstract]
@@ -0,0 +1,122 @@
+from unittest.mock import Mock
+
+import pytest
+from nucliadb_models.resource import Resource
+from nucliadb_sdk.v2 import exceptions
+
+from nuclia.config import EphemeralToken
+from nuclia.lib import tokens as tokens_module
+from nuclia.lib.tokens import EPHEMERAL_TOKENS, EphemeralTokenCache
+from nuclia.sdk import resource as resource_module
+from nuclia.sdk.resource import AsyncNucliaResource, NucliaResource
+
+RID = "a" * 32
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    EPHEMERAL_TOKENS.invalidate()
+    yield
+    EPHEMERAL_TOKENS.invalidate()
+
+
+def file_resource(rid: str, slug: str) -> Resource:
+    return Resource.model_validate(
+        {
+            "id": rid,
+            "slug": slug,
+            "data": {
+                "files": {
+                    "file": {
+                        "value": {"file": {"uri": f"/kb/kbid/resource/{rid}/file"}}
+                    }
+                }
+            },
+        }
+    )
+
+
+def ndb_mock() -> Mock:
+    ndb = Mock()
+    ndb.kbid = "kbid"
+    ndb.region = "europe-1"
+    ndb.url = "https://europe-1.nuclia.cloud/api/v1/kb/kbid"
+    return ndb
+
+
+def test_token_reused_while_ttl_is_left(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tokens_module.time, "monotonic", lambda: now[0])
+    cache = EphemeralTokenCache(extra_ttl=60, margin=2)
+    created = []
+
+    def create(kbid, ttl):
+        created.append(ttl)
+        return EphemeralToken(token=f"token-{len(created)}")
+
+    assert cache.get_or_create("kbid", 600, create) == "token-1"
+    assert created == [660]
+    # 600 - 2 seconds are still left
+    now[0] += 61
+    assert cache.get_or_create("kbid", 600, create) == "token-1"
+    # Another ttl gets its own token
+    assert cache.get_or_create("kbid", 10, create) == "token-2"
+    now[0] += 2
+    assert cache.get_or_create("kbid", 600, create) == "token-3"
+    # Tokens with the server default ttl are never reused
+    assert cache.get_or_create("kbid", None, create) == "token-4"
+    assert cache.get_or_create("kbid", None, create) == "token-5"
+    assert created[-2:] == [None, None]
+
+
+def test_temporal_download_urls(monkeypatch):
+    auth = Mock()
+    auth.create_ephemeral_token.return_value = EphemeralToken(token="token")
+    monkeypatch.setattr(resource_module, "get_auth", lambda: auth)
+    ndb = ndb_mock()
+
+    def by_id(kbid, rid, query_params):
+        return file_resource(rid, "slug")
+
+    def by_slug(kbid, slug, query_params):
+        raise exceptions.NotFoundError(slug)
+
+    ndb.ndb.get_resource_by_id.side_effect = by_id
+    ndb.ndb.get_resource_by_slug.side_effect = by_slug
+
+    results = NucliaResource().temporal_download_urls(
+        files=[(RID, "file"), (RID, "missing"), ("unknown", "file")],
+        ttl=60,
+        ndb=ndb,
+    )
+
+    assert results[0].value.endswith(f"/kb/kbid/resource/{RID}/file?eph-token=token")
+    assert isinstance(results[1].error, ValueError)
+    assert isinstance(results[2].error, exceptions.NotFoundError)
+    assert ndb.ndb.get_resource_by_id.call_count == 1
+    assert auth.create_ephemeral_token.call_count == 1
+
+    NucliaResource().temporal_download_url(rid=RID, file_id="file", ttl=60, ndb=ndb)
+    assert auth.create_ephemeral_token.call_count == 1
+
+
+async def test_async_temporal_download_urls(monkeypatch):
+    auth = Mock()
+
+    async def create_ephemeral_token(kbid, ttl):
+        return EphemeralToken(token="token")
+
+    auth.create_ephemeral_token = create_ephemeral_token
+    monkeypatch.setattr(resource_module, "get_async_auth", lambda: auth)
+    ndb = ndb_mock()
+
+    async def by_slug(kbid, slug, query_params):
+        return file_resource(RID, slug)
+
+    ndb.ndb.get_resource_by_slug = by_slug
+
+    results = await AsyncNucliaResource().temporal_download_urls(
+        files=[("doc", "file")], ndb=ndb
+    )
+
+    assert results[0].value.endswith("/file?eph-token=token")